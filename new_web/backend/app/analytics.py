@@ -0,0 +1,519 @@
+# backend/app/analytics.py
+"""
+Аналитика продаж для /api/analytics: выручка по дням и категориям, топ
+товаров, средний чек, конверсия корзина -> заказ.
+
+Запросы не ходят по orders/order_items (десятки миллионов строк), а читают
+сводные таблицы (models.SalesDaily, OrdersDaily, UserActivityDaily):
+строка на (день, товар), на день, на (день, пользователь). Сводки
+пополняются инкрементально: refresh() берет заказы с id больше водяного
+знака (analytics_state) пачками по ANALYTICS_REFRESH_BATCH и прибавляет
+их агрегаты через INSERT ... SELECT ... ON CONFLICT DO UPDATE. Водяной знак
+сдвигается в той же транзакции сравнением со старым значением, поэтому
+несколько воркеров не посчитают одни и те же заказы дважды. Заказы моложе
+ANALYTICS_REFRESH_LAG секунд ждут следующего прохода: меньший id, чья
+транзакция еще не закоммичена, не окажется позади водяного знака.
+main.py запускает refresh() каждые ANALYTICS_REFRESH_INTERVAL секунд в
+воркере с фоновыми задачами (BACKGROUND_JOBS), вручную - POST /api/analytics/refresh или
+    python -m app.analytics [rebuild]
+
+Данные отстают от заказов не больше чем на интервал обновления.
+
+Самые тяжелые отчеты за произвольный диапазон дат (категории, топ,
+конверсия) при установленном NumPy считаются по снимку сводок в памяти
+(SummaryColumns): колонки отсортированы по дню, диапазон - два
+searchsorted, группировка - bincount. Без NumPy или с ANALYTICS_ENGINE=sql -
+GROUP BY по сводным таблицам.
+"""
+import importlib.util
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import event, select, update, delete, func, case, true, false, type_coerce, BigInteger, Date
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import FunctionElement
+from . import models
+from .database import SessionLocal
+from .cache import TTLCache
+from .log import get_logger
+from .money import from_kopecks, to_decimal
+
+# numpy - необязательная зависимость. Импорт (~100 мс) - при первой загрузке снимка
+# (refresh_columns), а не вместе с модулем: модуль подключает и роутер корзины
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+np = None
+
+ANALYTICS_REFRESH_INTERVAL = float(os.getenv("ANALYTICS_REFRESH_INTERVAL", "60"))  # 0 - не запускать
+ANALYTICS_REFRESH_BATCH = int(os.getenv("ANALYTICS_REFRESH_BATCH", "50000"))  # заказов на транзакцию
+ANALYTICS_REFRESH_LAG = float(os.getenv("ANALYTICS_REFRESH_LAG", "10"))
+# columnar - снимок в NumPy (по умолчанию, если пакет установлен), sql - GROUP BY в БД
+ANALYTICS_ENGINE = os.getenv("ANALYTICS_ENGINE", "columnar" if HAS_NUMPY else "sql").lower()
+if ANALYTICS_ENGINE == "columnar" and not HAS_NUMPY:
+    raise RuntimeError("ANALYTICS_ENGINE=columnar, но пакет numpy не установлен")
+
+STATE_KEY = "orders"
+_UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+log = get_logger(__name__)
+
+
+class _utc_date(FunctionElement):
+    """День timestamp в UTC - тот же, что у отметки корзины (cart_activity_stmt)."""
+    type = Date()
+    inherit_cache = True
+
+
+@compiles(_utc_date)
+def _compile_utc_date(element, compiler, **kw):
+    # SQLite: CURRENT_TIMESTAMP уже UTC, date() дает 'YYYY-MM-DD'
+    return "date(%s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(_utc_date, "postgresql")
+def _compile_utc_date_pg(element, compiler, **kw):
+    # Без timezone() день считался бы в часовом поясе сессии БД
+    return "date(timezone('UTC', %s))" % compiler.process(element.clauses, **kw)
+
+
+def _day(column):
+    return _utc_date(column)
+
+
+def watermark(db):
+    """id последнего заказа, учтенного в сводках."""
+    value = db.scalar(select(models.AnalyticsState.value).where(models.AnalyticsState.name == STATE_KEY))
+    return value or 0
+
+
+# --- Пополнение сводок ------------------------------------------------------
+
+def _ensure_state(db):
+    insert = _UPSERT_DIALECTS[db.bind.dialect.name]
+    db.execute(insert(models.AnalyticsState).values(name=STATE_KEY, value=0).on_conflict_do_nothing())
+
+
+def _next_batch(db, old, cutoff):
+    """Верхняя граница следующей пачки (old, upper] или None, если учитывать нечего."""
+    order = models.Order
+    ids = (
+        select(order.id, order.created_at)
+        .where(order.id > old)
+        .order_by(order.id)
+        .limit(ANALYTICS_REFRESH_BATCH)
+        .subquery()
+    )
+    # Пачка обрывается перед первым слишком свежим заказом: только непрерывный диапазон id
+    upper, fresh = db.execute(
+        select(func.max(ids.c.id), func.min(case((ids.c.created_at > cutoff, ids.c.id))))
+    ).one()
+    if fresh is not None:
+        upper = fresh - 1
+    return upper if upper is not None and upper > old else None
+
+
+def _sales_upsert(insert, old, upper):
+    order, item, product = models.Order, models.OrderItem, models.Product
+    day = _day(order.created_at)
+    rows = (
+        select(
+            day,
+            item.product_id,
+            func.coalesce(func.max(product.category), ""),
+            func.sum(item.quantity),
+            func.sum(item.price * item.quantity),
+            func.count(),
+        )
+        .select_from(item)
+        .join(order, order.id == item.order_id)
+        .outerjoin(product, product.id == item.product_id)
+        .where(order.id > old, order.id <= upper)
+        .group_by(day, item.product_id)
+    )
+    table = models.SalesDaily
+    stmt = insert(table).from_select(["day", "product_id", "category", "quantity", "revenue", "lines"], rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.day, table.product_id],
+        set_={
+            "category": stmt.excluded.category,
+            "quantity": table.quantity + stmt.excluded.quantity,
+            "revenue": table.revenue + stmt.excluded.revenue,
+            "lines": table.lines + stmt.excluded.lines,
+        },
+    )
+
+
+def _orders_upsert(insert, old, upper):
+    order = models.Order
+    day = _day(order.created_at)
+    rows = (
+        select(day, func.count(), func.sum(order.total_amount))
+        .where(order.id > old, order.id <= upper)
+        .group_by(day)
+    )
+    table = models.OrdersDaily
+    stmt = insert(table).from_select(["day", "orders", "revenue"], rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.day],
+        set_={"orders": table.orders + stmt.excluded.orders, "revenue": table.revenue + stmt.excluded.revenue},
+    )
+
+
+def _buyers_upsert(insert, old, upper):
+    order = models.Order
+    day = _day(order.created_at)
+    rows = (
+        select(day, order.user_id, false(), true())
+        .where(order.id > old, order.id <= upper)
+        .group_by(day, order.user_id)
+    )
+    table = models.UserActivityDaily
+    stmt = insert(table).from_select(["day", "user_id", "carted", "ordered"], rows)
+    return stmt.on_conflict_do_update(index_elements=[table.day, table.user_id], set_={"ordered": True})
+
+
+def _refresh_batch(db, cutoff):
+    """Учитывает одну пачку заказов; возвращает новый водяной знак или None."""
+    _ensure_state(db)
+    old = watermark(db)
+    upper = _next_batch(db, old, cutoff)
+    if upper is None:
+        db.rollback()
+        return None
+    state = models.AnalyticsState
+    # Сдвиг водяного знака первым: параллельный refresh ждет эту строку и,
+    # увидев другое значение, откатывается, не дублируя пачку
+    claimed = db.execute(
+        update(state).where(state.name == STATE_KEY, state.value == old).values(value=upper)
+    ).rowcount
+    if not claimed:
+        db.rollback()
+        return None
+    insert = _UPSERT_DIALECTS[db.bind.dialect.name]
+    for stmt in (_sales_upsert(insert, old, upper), _orders_upsert(insert, old, upper), _buyers_upsert(insert, old, upper)):
+        db.execute(stmt)
+    db.commit()
+    return upper
+
+
+def refresh(db, lag=None):
+    """Доводит сводки до текущих заказов; возвращает {"watermark", "batches", "seconds"}."""
+    lag = ANALYTICS_REFRESH_LAG if lag is None else lag
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=lag)
+    if db.bind.dialect.name == "sqlite":
+        cutoff = cutoff.replace(tzinfo=None)  # CURRENT_TIMESTAMP в SQLite - UTC без пояса
+    started = time.perf_counter()
+    batches, mark = 0, None
+    while True:
+        upper = _refresh_batch(db, cutoff)
+        if upper is None:
+            break
+        batches, mark = batches + 1, upper
+    report = {"watermark": mark if mark is not None else watermark(db), "batches": batches,
+              "seconds": round(time.perf_counter() - started, 3)}
+    if batches:
+        log.info("analytics.refreshed", **report)
+    return report
+
+
+def rebuild(db):
+    """Пересчитывает сводки заказов с нуля (отметки корзины из заказов не восстановить - они остаются)."""
+    activity = models.UserActivityDaily
+    db.execute(delete(models.SalesDaily))
+    db.execute(delete(models.OrdersDaily))
+    db.execute(update(activity).values(ordered=False))
+    db.execute(delete(activity).where(activity.carted == False))  # noqa: E712
+    db.execute(delete(models.AnalyticsState).where(models.AnalyticsState.name == STATE_KEY))
+    db.commit()
+    return refresh(db)
+
+
+# Отметка "пользователь сегодня клал товар в корзину" пишется один раз за день на процесс
+_carted_today = TTLCache(maxsize=100_000, ttl=3600)
+_PENDING_MARKS = "analytics.carted_today"  # ключ session.info: отметки еще не закоммиченной транзакции
+
+
+def cart_activity_stmt(session, user_id):
+    """INSERT отметки корзины для транзакции сессии роутера cart или None, если она уже записана."""
+    dialect_name = session.bind.dialect.name
+    # День считается здесь и передается в INSERT: ключ кэша и строка сводки - один и тот же день (UTC, как _day)
+    key = (datetime.now(timezone.utc).date(), user_id)
+    if _carted_today.get(key) or dialect_name not in _UPSERT_DIALECTS:
+        return None
+    # В _carted_today - только после commit (_remember_carted): после отката следующая транзакция запишет отметку снова
+    session.info.setdefault(_PENDING_MARKS, set()).add(key)
+    table = models.UserActivityDaily
+    stmt = _UPSERT_DIALECTS[dialect_name](table).values(day=key[0], user_id=user_id, carted=True, ordered=False)
+    return stmt.on_conflict_do_update(index_elements=[table.day, table.user_id], set_={"carted": True})
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_carted(session):
+    for key in session.info.pop(_PENDING_MARKS, ()):
+        _carted_today.set(key, True)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_carted(session, previous_transaction):
+    session.info.pop(_PENDING_MARKS, None)
+
+
+# --- Снимок сводок в памяти -------------------------------------------------
+
+def _import_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+
+def _fetch_columns(db, stmt, columns, chunk_size=100_000):
+    """
+    Результат запроса -> массивы NumPy, по одному на колонку; columns - пары
+    (dtype, преобразование значения или None). Курсор читается пачками.
+    """
+    parts = []
+    # Core-соединение сессии: строки без ORM-обработки, она заметна на миллионах строк
+    result = db.connection().execute(stmt.execution_options(stream_results=True))
+    for rows in result.partitions(chunk_size):
+        parts.append([
+            np.fromiter(values if convert is None else map(convert, values), dtype, len(rows))
+            for values, (dtype, convert) in zip(zip(*rows), columns)
+        ])
+    if not parts:
+        return [np.empty(0, dtype) for dtype, _ in columns]
+    return [np.concatenate(column) for column in zip(*parts)]
+
+
+class SummaryColumns:
+    """
+    analytics_sales_daily и analytics_user_activity в колонках NumPy,
+    отсортированных по дню: диапазон дат - срез [lo:hi] через searchsorted.
+    """
+
+    def __init__(self, mark, sales, categories, activity):
+        self.watermark = mark
+        # дни (date.toordinal()), товары, индексы в categories, штуки, копейки
+        self.days, self.product_ids, self.category_codes, self.quantity, self.revenue = sales
+        self.categories = categories
+        # дни, пользователи, клал в корзину, оформил заказ
+        self.activity_days, self.user_ids, self.carted, self.ordered = activity
+
+    @classmethod
+    def load(cls, db, mark):
+        sales, activity = models.SalesDaily, models.UserActivityDaily
+        codes = {}
+        sales_columns = _fetch_columns(
+            db,
+            select(sales.day, sales.product_id, sales.category, sales.quantity, type_coerce(sales.revenue, BigInteger))
+            .order_by(sales.day),
+            [(np.int32, date.toordinal), (np.int32, None), (np.int32, lambda c: codes.setdefault(c, len(codes))),
+             (np.int64, None), (np.int64, None)],
+        )
+        activity_columns = _fetch_columns(
+            db,
+            select(activity.day, activity.user_id, activity.carted, activity.ordered).order_by(activity.day),
+            [(np.int32, date.toordinal), (np.int32, None), (np.bool_, None), (np.bool_, None)],
+        )
+        return cls(mark, sales_columns, list(codes), activity_columns)
+
+    def __len__(self):
+        return len(self.days)
+
+    @staticmethod
+    def _range(days, start, end):
+        return (int(np.searchsorted(days, start.toordinal(), "left")),
+                int(np.searchsorted(days, end.toordinal(), "right")))
+
+    @staticmethod
+    def _sum_by(keys, values, size):
+        # bincount суммирует во float64: копейки точны до 2^53 (~9 * 10^13 рублей)
+        return np.rint(np.bincount(keys, weights=values, minlength=size)).astype(np.int64)
+
+    def by_category(self, start, end):
+        lo, hi = self._range(self.days, start, end)
+        size = len(self.categories)
+        codes = self.category_codes[lo:hi]
+        revenue = self._sum_by(codes, self.revenue[lo:hi], size)
+        quantity = self._sum_by(codes, self.quantity[lo:hi], size)
+        present = np.flatnonzero(np.bincount(codes, minlength=size))
+        return [(self.categories[i], int(quantity[i]), int(revenue[i])) for i in present]
+
+    def top_products(self, start, end, limit, by):
+        lo, hi = self._range(self.days, start, end)
+        if lo == hi:
+            return []
+        products = self.product_ids[lo:hi]
+        size = int(products.max()) + 1
+        revenue = self._sum_by(products, self.revenue[lo:hi], size)
+        quantity = self._sum_by(products, self.quantity[lo:hi], size)
+        key = revenue if by == "revenue" else quantity
+        sold = np.flatnonzero(np.bincount(products, minlength=size))
+        if len(sold) > limit:
+            # Кандидаты - все, кто не хуже limit-го; равные на границе решает id, как ORDER BY в SQL
+            threshold = np.partition(key[sold], len(sold) - limit)[len(sold) - limit]
+            sold = sold[key[sold] >= threshold]
+        sold = sold[np.lexsort((sold, -key[sold]))][:limit]
+        return [(int(i), int(quantity[i]), int(revenue[i])) for i in sold]
+
+    def conversion(self, start, end):
+        lo, hi = self._range(self.activity_days, start, end)
+        if lo == hi:
+            return 0, 0
+        users = self.user_ids[lo:hi]
+        size = int(users.max()) + 1
+        # Отметки по дням сворачиваются в "было хоть раз за период" по пользователю
+        carted = np.bincount(users, weights=self.carted[lo:hi], minlength=size) > 0
+        ordered = np.bincount(users, weights=self.ordered[lo:hi], minlength=size) > 0
+        return int(carted.sum()), int((carted & ordered).sum())
+
+
+_columns = None
+_columns_lock = threading.Lock()
+
+
+def refresh_columns(db):
+    """
+    Перечитывает снимок, если сдвинулся водяной знак; True, если снимок обновлен.
+    Отметки корзины между обновлениями попадают в снимок со следующим сдвигом.
+    """
+    global _columns
+    if ANALYTICS_ENGINE != "columnar":
+        return False
+    with _columns_lock:
+        mark = watermark(db)
+        if _columns is not None and _columns.watermark == mark:
+            return False
+        started = time.perf_counter()
+        _import_numpy()
+        _columns = SummaryColumns.load(db, mark)
+    log.info("analytics.columns_loaded", rows=len(_columns), activity_rows=len(_columns.user_ids),
+             watermark=mark, seconds=round(time.perf_counter() - started, 3))
+    return True
+
+
+def columns():
+    """Текущий снимок или None (движок sql или снимок еще не загружен)."""
+    return _columns if ANALYTICS_ENGINE == "columnar" else None
+
+
+# --- Отчеты ------------------------------------------------------------------
+
+def revenue_by_day(db, start, end):
+    table = models.OrdersDaily
+    rows = db.execute(
+        select(table.day, table.orders, table.revenue).where(table.day.between(start, end)).order_by(table.day)
+    ).all()
+    return [{"day": day, "orders": orders, "revenue": revenue} for day, orders, revenue in rows]
+
+
+def revenue_by_category(db, start, end):
+    snapshot = columns()
+    if snapshot is not None:
+        rows = snapshot.by_category(start, end)
+    else:
+        table = models.SalesDaily
+        rows = db.execute(
+            select(table.category, func.sum(table.quantity), type_coerce(func.sum(table.revenue), BigInteger))
+            .where(table.day.between(start, end))
+            .group_by(table.category)
+        ).all()
+    rows = sorted(rows, key=lambda row: (-row[2], row[0]))
+    return [{"category": category, "quantity": int(quantity), "revenue": from_kopecks(revenue)}
+            for category, quantity, revenue in rows]
+
+
+def top_products(db, start, end, limit=10, by="revenue"):
+    snapshot = columns()
+    if snapshot is not None:
+        rows = snapshot.top_products(start, end, limit, by)
+    else:
+        table = models.SalesDaily
+        quantity = func.sum(table.quantity)
+        revenue = type_coerce(func.sum(table.revenue), BigInteger)
+        key = revenue if by == "revenue" else quantity
+        rows = db.execute(
+            select(table.product_id, quantity, revenue)
+            .where(table.day.between(start, end))
+            .group_by(table.product_id)
+            .order_by(key.desc(), table.product_id)
+            .limit(limit)
+        ).all()
+    ids = [row[0] for row in rows]
+    names = dict(db.execute(select(models.Product.id, models.Product.name).where(models.Product.id.in_(ids))).all()) if ids else {}
+    return [{"product_id": product_id, "name": names.get(product_id, ""), "quantity": int(quantity),
+             "revenue": from_kopecks(revenue)} for product_id, quantity, revenue in rows]
+
+
+def average_order_value(db, start, end):
+    table = models.OrdersDaily
+    orders, revenue = db.execute(
+        select(func.coalesce(func.sum(table.orders), 0), type_coerce(func.coalesce(func.sum(table.revenue), 0), BigInteger))
+        .where(table.day.between(start, end))
+    ).one()
+    total = from_kopecks(revenue)
+    return {"start": start, "end": end, "orders": int(orders), "revenue": total,
+            "average": to_decimal(total / orders) if orders else to_decimal(0)}
+
+
+def conversion(db, start, end):
+    """Доля пользователей, клавших товары в корзину за период, которые за период же оформили заказ."""
+    snapshot = columns()
+    if snapshot is not None:
+        carted, converted = snapshot.conversion(start, end)
+    else:
+        carted, converted = _conversion_sql(db, start, end)
+    return {"start": start, "end": end, "cart_users": carted, "ordered_users": converted,
+            "rate": round(converted / carted, 4) if carted else 0.0}
+
+
+def _conversion_sql(db, start, end):
+    table = models.UserActivityDaily
+    users = (
+        select(
+            func.max(case((table.carted, 1), else_=0)).label("carted"),
+            func.max(case((table.ordered, 1), else_=0)).label("ordered"),
+        )
+        .where(table.day.between(start, end))
+        .group_by(table.user_id)
+        .subquery()
+    )
+    carted, converted = db.execute(
+        select(func.coalesce(func.sum(users.c.carted), 0),
+               func.coalesce(func.sum(users.c.carted * users.c.ordered), 0))
+    ).one()
+    return int(carted), int(converted)
+
+
+def run_refresh():
+    """refresh() и перечитывание снимка в собственной сессии: фоновая задача main.py и POST /refresh."""
+    with SessionLocal() as db:
+        report = refresh(db)
+        report["columns_reloaded"] = refresh_columns(db)
+    return report
+
+
+def run_reload_columns():
+    """Только перечитать снимок (воркеры без фоновых задач, см. main.py); True, если обновлен."""
+    with SessionLocal() as db:
+        return refresh_columns(db)
+
+
+def status(db):
+    snapshot = _columns
+    return {
+        "watermark": watermark(db),
+        "engine": ANALYTICS_ENGINE,
+        "columns_watermark": snapshot.watermark if snapshot is not None else None,
+        "columns_rows": len(snapshot) if snapshot is not None else None,
+        "refresh_interval": ANALYTICS_REFRESH_INTERVAL,
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    with SessionLocal() as session:
+        result = rebuild(session) if sys.argv[1:] == ["rebuild"] else refresh(session)
+    print(result)
@@ -1,34 +1,95 @@
 # backend/app/auth.py
+import os
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from . import models
-from .database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, event, inspect
+from sqlalchemy.exc import IntegrityError
+from . import models, schemas, hashing
+from .cache import TTLCache
+from .database import get_db, get_async_db, get_read_db, get_read_async_db, SessionLocal, AsyncSessionLocal, replicas, async_replicas
 
 SECRET_KEY = "your-secret-key"  # В продакшене вынести в .env
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt_sha256"], deprecated="auto")
+pwd_context = hashing.pwd_context
 
+# Сам bcrypt выполняется в пуле hashing (с ограничением очереди и 429 при перегрузке)
 def verify_password(plain_password, hashed_password):
     try:
-        return pwd_context.verify(plain_password, hashed_password)
+        return hashing.verify_password(plain_password, hashed_password)
+    except HTTPException:
+        raise
     except Exception as e:
         # Не логируем plain_password — только ошибку
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Password verification error")
 
 def get_password_hash(password):
     try:
-        return pwd_context.hash(password)
+        return hashing.hash_password(password)
     except ValueError as e:
         # Защита: если вдруг передали очень длинный пароль и произошла ошибка
         # (при bcrypt_sha256 это маловероятно), возвращаем явную ошибку клиенту
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
+# Версии для async-эндпоинтов: ждут пул, не блокируя event loop
+async def verify_password_async(plain_password, hashed_password):
+    try:
+        return await hashing.verify_password_async(plain_password, hashed_password)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Password verification error")
+
+async def get_password_hash_async(password):
+    try:
+        return await hashing.hash_password_async(password)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+# Вход и регистрация: bcrypt идет без соединения с БД. Транзакция поиска закрывается
+# до хэширования, иначе каждый ждущий bcrypt запрос держит соединение пула, и пачка
+# логинов выбирает пул целиком (эндпоинты - async def, БД sync-режима - в потоке)
+_CREDENTIALS = select(models.User.id, models.User.email, models.User.full_name, models.User.hashed_password)
+
+def find_credentials(db: Session, email: str):
+    """Строка (id, email, full_name, hashed_password) или None; соединение сразу возвращается в пул."""
+    row = db.execute(_CREDENTIALS.where(models.User.email == email)).first()
+    db.rollback()
+    return row
+
+async def find_credentials_async(db: AsyncSession, email: str):
+    row = (await db.execute(_CREDENTIALS.where(models.User.email == email))).first()
+    await db.rollback()
+    return row
+
+def create_user(db: Session, email: str, hashed_password: str, full_name: str):
+    """Новый пользователь или None, если email уже занят (в том числе параллельной регистрацией)."""
+    db_user = models.User(email=email, hashed_password=hashed_password, full_name=full_name)
+    db.add(db_user)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
+    db.refresh(db_user)
+    return db_user
+
+async def create_user_async(db: AsyncSession, email: str, hashed_password: str, full_name: str):
+    db_user = models.User(email=email, hashed_password=hashed_password, full_name=full_name)
+    db.add(db_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return None
+    await db.refresh(db_user)
+    return db_user
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -47,28 +108,130 @@ def verify_token(token: str):
         return payload
     except JWTError:
         raise credentials_exception
+
+# Кэш аутентифицированных пользователей по email (sub токена): на горячих путях
+# (корзина, заказы, отзывы) запрос к users не нужен. Кэшируем снимок публичных
+# полей (UserResponse), а не ORM-объект, привязанный к чужой сессии.
+# TTL ограничивает устаревание между воркерами; в своем процессе сбрасываем сразу
+# при любом изменении/удалении пользователя (события ниже).
+principal_cache = TTLCache(
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", "60")),
+)
+
+def remember_principal(user):
+    principal = schemas.UserResponse.model_validate(user)
+    principal_cache.set(user.email, principal)
+    return principal
+
+def invalidate_principal(email):
+    principal_cache.pop(email)
+
+def load_principal(db: Session, email: str):
+    """Пользователь по email из кэша или из БД; None, если такого нет."""
+    principal = principal_cache.get(email)
+    if principal is None:
+        user = db.query(models.User).filter(models.User.email == email).first()
+        if user is not None:
+            principal = remember_principal(user)
+    return principal
+
+async def load_principal_async(db: AsyncSession, email: str):
+    principal = principal_cache.get(email)
+    if principal is None:
+        result = await db.execute(select(models.User).where(models.User.email == email))
+        user = result.scalars().first()
+        if user is not None:
+            principal = remember_principal(user)
+    return principal
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _user_changed(mapper, connection, target):
+    invalidate_principal(target.email)
+    # Если меняли сам email - сбрасываем и старый ключ
+    for old_email in inspect(target).attrs.email.history.deleted or ():
+        invalidate_principal(old_email)
     
 security = HTTPBearer()
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-):
-    credentials_exception = HTTPException(
+# Служебные эндпоинты (/api/analytics, импорт каталога) - только для этих email (через запятую).
+# Регистрация открыта, так что "вошел" еще не значит "свой"; пусто - доступа нет ни у кого.
+ADMIN_EMAILS = {e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
+
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+def _token_email(credentials: HTTPAuthorizationCredentials) -> str:
     try:
         payload = verify_token(credentials.credentials)
         email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except Exception:
-        raise credentials_exception
-    
-    user = db.query(models.User).filter(models.User.email == email).first()
+        raise _credentials_exception()
+    if email is None:
+        raise _credentials_exception()
+    return email
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
+    user = load_principal(db, _token_email(credentials))
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        raise _credentials_exception()
+    return user
+
+# Для эндпоинтов на чтение (история заказов): пользователь ищется через ту же сессию
+# get_read_db, что и данные, - запрос не открывает соединение с primary только ради
+# аутентификации. Только что зарегистрированного пользователя реплика может еще
+# не знать - тогда ищем в primary.
+def get_current_reader(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_read_db)
+):
+    email = _token_email(credentials)
+    user = load_principal(db, email)
+    if user is None and replicas:
+        with SessionLocal() as primary:
+            user = load_principal(primary, email)
+    if user is None:
+        raise _credentials_exception()
+    return user
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Асинхронная версия get_current_user для режима DB_MODE=async."""
+    user = await load_principal_async(db, _token_email(credentials))
+    if user is None:
+        raise _credentials_exception()
+    return user
+
+def _check_admin(user):
+    if user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    return user
+
+def get_current_admin(user: schemas.UserResponse = Depends(get_current_user)):
+    return _check_admin(user)
+
+async def get_current_admin_async(user: schemas.UserResponse = Depends(get_current_user_async)):
+    return _check_admin(user)
+
+async def get_current_reader_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_read_async_db)
+):
+    email = _token_email(credentials)
+    user = await load_principal_async(db, email)
+    if user is None and async_replicas:
+        async with AsyncSessionLocal() as primary:
+            user = await load_principal_async(primary, email)
+    if user is None:
+        raise _credentials_exception()
+    return user
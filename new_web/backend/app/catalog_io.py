@@ -0,0 +1,316 @@
+# backend/app/catalog_io.py
+"""
+Потоковый импорт и экспорт каталога товаров (CSV / NDJSON).
+
+Импорт читает файл построчно и пишет пачками по CATALOG_IMPORT_CHUNK строк,
+каждая пачка - отдельная транзакция, так что файл любого размера не держится
+в памяти, а упавший импорт оставляет в базе уже загруженные пачки:
+- строки с id - upsert по id (обновляются только поля каталога, сводка
+  рейтинга не трогается); в PostgreSQL пачка идет через COPY во временную
+  таблицу и один INSERT ... SELECT ... ON CONFLICT (id) DO UPDATE;
+- строки без id - обычная многострочная вставка;
+- некорректные строки пропускаются, первые CATALOG_IMPORT_MAX_ERRORS ошибок
+  возвращаются в отчете с номерами строк.
+
+Экспорт - генератор кусков текста поверх серверного курсора
+(stream_results + yield_per), подходит для StreamingResponse.
+
+Работает через синхронный engine, в async-режиме вызывается из threadpool.
+Из командной строки (из папки backend):
+    python -m app.catalog_io import products.csv
+    python -m app.catalog_io export products.ndjson --format ndjson
+"""
+import csv
+import io
+import json
+import os
+import time
+from decimal import Decimal
+from sqlalchemy import select, insert, func, text
+from sqlalchemy.dialects import postgresql, sqlite
+from . import models, money
+from .log import get_logger
+
+IMPORT_CHUNK_SIZE = int(os.getenv("CATALOG_IMPORT_CHUNK", "5000"))
+IMPORT_MAX_ERRORS = int(os.getenv("CATALOG_IMPORT_MAX_ERRORS", "100"))
+EXPORT_CHUNK_SIZE = int(os.getenv("CATALOG_EXPORT_CHUNK", "2000"))
+
+FORMATS = ("csv", "ndjson")
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+FIELDS = ("id", "name", "description", "price", "category", "image_url", "in_stock")
+# Поля, которые импорт перезаписывает у существующего товара
+UPDATE_FIELDS = FIELDS[1:]
+
+_UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+_TRUE = {"1", "true", "yes", "y", "да", "t"}
+_FALSE = {"0", "false", "no", "n", "нет", "f"}
+
+log = get_logger(__name__)
+
+
+def detect_format(filename=None, explicit=None):
+    """Формат из явного параметра или расширения файла; ValueError, если не понятно."""
+    fmt = (explicit or "").lower()
+    if not fmt and filename:
+        ext = os.path.splitext(filename)[1].lower().lstrip(".")
+        fmt = {"jsonl": "ndjson", "json": "ndjson"}.get(ext, ext)
+    if not fmt:
+        raise ValueError("Не указан формат: ?format=csv|ndjson или Content-Type text/csv, application/x-ndjson")
+    if fmt not in FORMATS:
+        raise ValueError("Неизвестный формат %r, ожидается csv или ndjson" % fmt)
+    return fmt
+
+
+def iter_records(stream, fmt):
+    """(номер строки, словарь) из текстового потока; битый JSON - (номер, ValueError)."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, ValueError("некорректный JSON: %s" % e)
+            continue
+        yield line_no, record if isinstance(record, dict) else ValueError("ожидается JSON-объект")
+
+
+def _text(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _bool(value):
+    if value is None or value == "":
+        return True
+    if isinstance(value, bool):
+        return value
+    normalized = str(value).strip().lower()
+    if normalized in _TRUE:
+        return True
+    if normalized in _FALSE:
+        return False
+    raise ValueError("in_stock: не булево значение %r" % value)
+
+
+def clean(record):
+    """Приводит запись файла к колонкам products; ValueError с причиной, если строка некорректна."""
+    if isinstance(record, Exception):
+        raise record
+    product_id = _text(record.get("id"))
+    name = _text(record.get("name"))
+    category = _text(record.get("category"))
+    price = _text(record.get("price"))
+    if not name:
+        raise ValueError("name: обязательное поле")
+    if not category:
+        raise ValueError("category: обязательное поле")
+    if price is None:
+        raise ValueError("price: обязательное поле")
+    try:
+        price = Decimal(price.replace(",", "."))
+        exact = price.is_finite() and price == price.quantize(money.CENT)
+    except ArithmeticError:
+        raise ValueError("price: не число %r" % price)
+    if not exact:
+        raise ValueError("price: не больше двух знаков после запятой")
+    if price < 0:
+        raise ValueError("price: должна быть неотрицательной")
+    if product_id is not None:
+        try:
+            product_id = int(product_id)
+        except ValueError:
+            raise ValueError("id: не целое число %r" % product_id)
+        if product_id < 1:
+            raise ValueError("id: должен быть положительным")
+    return {
+        "id": product_id,
+        "name": name,
+        "description": _text(record.get("description")),
+        "price": price,
+        "category": category,
+        "image_url": _text(record.get("image_url")),
+        "in_stock": _bool(record.get("in_stock")),
+    }
+
+
+def _copy_upsert(conn, rows):
+    """PostgreSQL: COPY пачки во временную таблицу и upsert одним запросом."""
+    columns = ", ".join(FIELDS)
+    conn.exec_driver_sql(
+        "CREATE TEMP TABLE IF NOT EXISTS products_import "
+        "(LIKE products INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+    )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        # COPY идет мимо типа Kopecks - цену переводим в копейки сами
+        writer.writerow([money.to_kopecks(row[f]) if f == "price" else row[f] for f in FIELDS])
+    buffer.seek(0)
+    # COPY идет через тот же DBAPI-коннект, т.е. в транзакции пачки
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert("COPY products_import (%s) FROM STDIN WITH (FORMAT csv)" % columns, buffer)
+    finally:
+        cursor.close()
+    conn.exec_driver_sql(
+        "INSERT INTO products (%s) SELECT %s FROM products_import "
+        "ON CONFLICT (id) DO UPDATE SET %s" % (
+            columns, columns, ", ".join("%s = EXCLUDED.%s" % (f, f) for f in UPDATE_FIELDS)
+        )
+    )
+
+
+def _upsert_stmt(dialect_name):
+    stmt = _UPSERT_DIALECTS[dialect_name](models.Product)
+    return stmt.on_conflict_do_update(
+        index_elements=[models.Product.id],
+        set_={field: stmt.excluded[field] for field in UPDATE_FIELDS},
+    )
+
+
+def _uses_copy(conn):
+    return conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2"
+
+
+def write_chunk(conn, rows):
+    """Пишет пачку очищенных строк; возвращает число записанных строк."""
+    # Повтор id внутри пачки - побеждает последняя строка
+    # (ON CONFLICT DO UPDATE не может обновить одну строку дважды)
+    with_id = {row["id"]: row for row in rows if row["id"] is not None}
+    without_id = [{k: v for k, v in row.items() if k != "id"} for row in rows if row["id"] is None]
+    if with_id:
+        upsert_rows = list(with_id.values())
+        if _uses_copy(conn):
+            _copy_upsert(conn, upsert_rows)
+        else:
+            # executemany одного закэшированного запроса: многострочный VALUES
+            # на тысячи строк SQLAlchemy каждый раз компилирует заново
+            conn.execute(_upsert_stmt(conn.dialect.name), upsert_rows)
+    if without_id:
+        conn.execute(insert(models.Product), without_id)
+    return len(with_id) + len(without_id)
+
+
+def sync_sequence(conn):
+    """Явные id в PostgreSQL не двигают последовательность products.id - подтягиваем ее к MAX(id)."""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "SELECT setval(pg_get_serial_sequence('products', 'id'), "
+            "GREATEST((SELECT COALESCE(MAX(id), 0) FROM products), 1))"
+        ))
+
+
+def import_products(engine, stream, fmt, chunk_size=None, progress=None):
+    """
+    Импортирует товары из текстового потока; progress(report) вызывается после каждой пачки.
+    Возвращает отчет: rows, written, skipped, chunks, errors, seconds.
+    """
+    chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+    report = {"rows": 0, "written": 0, "skipped": 0, "chunks": 0, "errors": [], "seconds": 0.0}
+    started = time.perf_counter()
+
+    def flush(chunk):
+        with engine.begin() as conn:
+            report["written"] += write_chunk(conn, chunk)
+        report["chunks"] += 1
+        report["seconds"] = round(time.perf_counter() - started, 3)
+        log.info("catalog.import.progress", rows=report["rows"], written=report["written"],
+                 skipped=report["skipped"], seconds=report["seconds"])
+        if progress is not None:
+            progress(report)
+
+    chunk = []
+    try:
+        for line_no, record in iter_records(stream, fmt):
+            report["rows"] += 1
+            try:
+                chunk.append(clean(record))
+            except ValueError as e:
+                report["skipped"] += 1
+                if len(report["errors"]) < IMPORT_MAX_ERRORS:
+                    report["errors"].append({"line": line_no, "error": str(e)})
+                continue
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+    finally:
+        if report["written"]:
+            with engine.begin() as conn:
+                sync_sequence(conn)
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    log.info("catalog.import.done", rows=report["rows"], written=report["written"],
+             skipped=report["skipped"], chunks=report["chunks"], seconds=report["seconds"])
+    return report
+
+
+def _csv_chunk(rows, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(FIELDS)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def _ndjson_chunk(rows):
+    # price - Decimal: в JSON пишем числом
+    return "".join(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False, default=float) + "\n" for row in rows)
+
+
+def export_products(engine, fmt, chunk_size=None):
+    """Генератор кусков CSV/NDJSON со всем каталогом по возрастанию id."""
+    columns = [getattr(models.Product, field) for field in FIELDS]
+    query = select(*columns).order_by(models.Product.id)
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size or EXPORT_CHUNK_SIZE).execute(query)
+        if fmt == "csv":
+            yield _csv_chunk([], header=True)
+        for partition in result.partitions():
+            yield _csv_chunk(partition) if fmt == "csv" else _ndjson_chunk(partition)
+
+
+def count_products(engine):
+    with engine.connect() as conn:
+        return conn.scalar(select(func.count()).select_from(models.Product))
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    from .database import engine
+
+    parser = argparse.ArgumentParser(prog="python -m app.catalog_io")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("path", help="файл; - для stdin/stdout")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--chunk", type=int, default=None, help="строк в пачке")
+    args = parser.parse_args()
+
+    fmt = detect_format(None if args.path == "-" else args.path, args.format or ("csv" if args.path == "-" else None))
+    if args.command == "import":
+        def show(report):
+            print("строк: %(rows)d, записано: %(written)d, пропущено: %(skipped)d, %(seconds).1f c" % report,
+                  file=sys.stderr)
+
+        source = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8-sig", newline="")
+        with source:
+            result = import_products(engine, source, fmt, args.chunk, show)
+        for error in result["errors"]:
+            print("строка %(line)d: %(error)s" % error, file=sys.stderr)
+        print(json.dumps({k: v for k, v in result.items() if k != "errors"}, ensure_ascii=False))
+    else:
+        target = sys.stdout if args.path == "-" else open(args.path, "w", encoding="utf-8", newline="")
+        with target:
+            for piece in export_products(engine, fmt, args.chunk):
+                target.write(piece)
+        print("Выгружено товаров: %d" % count_products(engine), file=sys.stderr)
@@ -0,0 +1,145 @@
+# backend/app/compression.py
+"""
+Сжатие ответов (brotli или gzip) по Accept-Encoding клиента.
+
+Сжимаются только текстовые ответы (JSON, текст, csv, ndjson) не меньше
+COMPRESSION_MIN_SIZE байт: маленькие ответы от сжатия только теряют в CPU.
+brotli используется, если установлен пакет Brotli, иначе gzip.
+Ответы, которые отдаются частями (StreamingResponse), сжимаются потоково,
+каждый кусок выталкивается клиенту сразу.
+"""
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli - необязательная зависимость
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))  # 4-5: почти как gzip по CPU, но заметно плотнее
+
+_COMPRESSIBLE = ("application/json", "application/x-ndjson", "text/")
+
+
+def _accepted(headers):
+    """Выбирает кодировку по заголовку Accept-Encoding (q=0 означает запрет)."""
+    accept = ""
+    for name, value in headers:
+        if name == b"accept-encoding":
+            accept = value.decode("latin-1").lower()
+            break
+    encodings = {}
+    for part in accept.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            encodings[coding] = q
+    if brotli is not None and encodings.get("br", 0) > 0:
+        return "br"
+    if encodings.get("gzip", encodings.get("*", 0)) > 0:
+        return "gzip"
+    return None
+
+
+def _weak_etag(headers):
+    # Сжатое тело - другое представление: строгий ETag становится слабым
+    return [
+        (k, b"W/" + v if k.lower() == b"etag" and not v.startswith(b"W/") else v)
+        for k, v in headers
+    ]
+
+
+class _Compressor:
+    def __init__(self, encoding):
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.compress = self._obj.process
+            self.flush = self._obj.finish
+            self.sync_flush = self._obj.flush
+        else:
+            # wbits=31 - формат gzip (заголовок + crc)
+            self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self.compress = self._obj.compress
+            self.flush = self._obj.flush
+
+    def sync_flush(self):
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size=COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _accepted(scope["headers"])
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                if message["status"] == 304:
+                    # 304 должен нести тот же ETag, что и сжатый 200 для этого клиента
+                    passthrough = True
+                    message = {**message, "headers": _weak_etag(message["headers"]) + [(b"vary", b"Accept-Encoding")]}
+                    await send(message)
+                    return
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = {k.lower(): v for k, v in start["headers"]}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if (
+                    b"content-encoding" in headers
+                    or not content_type.startswith(_COMPRESSIBLE)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                raw = [(k, v) for k, v in _weak_etag(start["headers"]) if k.lower() != b"content-length"]
+                raw.append((b"content-encoding", encoding.encode()))
+                raw.append((b"vary", b"Accept-Encoding"))
+                if not more_body:
+                    data = compressor.compress(body) + compressor.flush()
+                    raw.append((b"content-length", str(len(data)).encode()))
+                    await send({**start, "headers": raw})
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                await send({**start, "headers": raw})
+
+            # Каждый кусок потока выталкиваем сразу (sync flush), иначе компрессор
+            # копит вывод и клиент не видит первых строк до конца ответа
+            data = compressor.compress(body) + (compressor.sync_flush() if more_body else compressor.flush())
+            if data or not more_body:
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+        if start is not None and compressor is None and not passthrough:
+            # Приложение не отправило ни одного сообщения с телом: отдаем заголовки как есть
+            await send(start)
@@ -1,10 +1,21 @@
 # backend/app/database.py
+import functools
+import itertools
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from contextlib import AsyncExitStack, ExitStack, contextmanager
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from dotenv import load_dotenv
- 
+from . import metrics
+from .log import get_logger
+from .stickiness import is_sticky
+
 load_dotenv()
 
 # Для разработки - замените на ваши реальные данные PostgreSQL
@@ -12,13 +23,329 @@ DATABASE_URL = os.getenv(
     "DATABASE_URL"
 )
 
-engine = create_engine(DATABASE_URL)
+# Режим работы с БД: "sync" (по умолчанию) или "async" (asyncpg / aiosqlite)
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+ASYNC_DB = DB_MODE == "async"
+
+def make_async_url(url: str) -> str:
+    """Переводит синхронный URL в асинхронный драйвер (postgresql -> asyncpg, sqlite -> aiosqlite)."""
+    if url.startswith("postgresql+asyncpg://") or url.startswith("sqlite+aiosqlite://"):
+        return url
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    if url.startswith("postgresql"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    if url.startswith("sqlite"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (make_async_url(DATABASE_URL) if DATABASE_URL else None)
+
+# Настройки пула соединений (на один процесс/воркер)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # секунды, -1 - не пересоздавать
+# pre-ping - лишний SELECT 1 на каждый checkout; включайте, если соединения рвутся
+# снаружи (failover, балансировщик перед БД), от простоя защищает DB_POOL_RECYCLE
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # ожидание свободного соединения
+
+def pool_options(url):
+    """Параметры пула для create_engine; у SQLite свои пулы (NullPool/SingletonThreadPool), им их не передаем."""
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+
+# Запросы дольше порога (мс) пишутся в лог app.sql с текстом и временем
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+sql_log = get_logger("app.sql")
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - context._query_started) * 1000
+    metrics.observe_sql(elapsed_ms)
+    if elapsed_ms >= SLOW_QUERY_MS:
+        sql_log.warning("sql.slow", duration_ms=round(elapsed_ms, 1), statement=statement)
+
+def instrument_sql(engine):
+    """Время каждого SQL-запроса: в метрики, в счетчик текущего HTTP-запроса и в лог медленных."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
+pool_metrics = metrics.instrument_pool("primary", engine)
+instrument_sql(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Асинхронный движок создаем только в режиме DB_MODE=async,
+# чтобы синхронному режиму не требовались asyncpg/aiosqlite
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DB:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL))
+    async_pool_metrics = metrics.instrument_pool("primary_async", async_engine.sync_engine)
+    instrument_sql(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
+# Реплики только для чтения: DATABASE_REPLICA_URLS=url1,url2 (пусто - все идет в primary).
+# Для async-режима - ASYNC_DATABASE_REPLICA_URLS или те же URL с async-драйвером.
+def _url_list(value):
+    return [url.strip() for url in (value or "").split(",") if url.strip()]
+
+DATABASE_REPLICA_URLS = _url_list(os.getenv("DATABASE_REPLICA_URLS"))
+ASYNC_DATABASE_REPLICA_URLS = _url_list(os.getenv("ASYNC_DATABASE_REPLICA_URLS")) or [
+    make_async_url(url) for url in DATABASE_REPLICA_URLS
+]
+# Сколько секунд не посылать запросы на реплику, к которой не удалось подключиться
+DB_REPLICA_RETRY = float(os.getenv("DB_REPLICA_RETRY", "30"))
+log = get_logger(__name__)
+
+class ReplicaSet:
+    """
+    Реплики по кругу (round-robin). Реплика, к которой не удалось подключиться,
+    пропускается DB_REPLICA_RETRY секунд; если живых нет - читаем с primary.
+    """
+
+    def __init__(self, name, engines, pools):
+        self.name = name
+        self.engines = engines  # Engine или AsyncEngine - как у primary в этом режиме
+        self.pools = pools
+        self._turn = itertools.count()
+        self._down_until = [0.0] * len(engines)
+        self._lock = threading.Lock()
+        self.reads = [0] * len(engines)
+        self.primary_reads = 0  # прилипшие клиенты и отказ всех реплик
+        self.failures = 0
+
+    def __bool__(self):
+        return bool(self.engines)
+
+    def pick(self):
+        """Индекс следующей живой реплики или None."""
+        now = time.monotonic()
+        with self._lock:
+            start = next(self._turn)
+            for offset in range(len(self.engines)):
+                index = (start + offset) % len(self.engines)
+                if self._down_until[index] <= now:
+                    return index
+            return None
+
+    def mark_down(self, index, error):
+        with self._lock:
+            self._down_until[index] = time.monotonic() + DB_REPLICA_RETRY
+            self.failures += 1
+        log.warning("db.replica_down", replica="%s_%d" % (self.name, index), retry_in=DB_REPLICA_RETRY, error=error)
+
+    def note_read(self, index):
+        """Учет обслуженного чтения: index реплики или None - primary."""
+        with self._lock:
+            if index is None:
+                self.primary_reads += 1
+            else:
+                self.reads[index] += 1
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "replicas": [
+                    {"pool": pool.name, "reads": reads, "down_for": round(max(0.0, until - now), 1)}
+                    for pool, reads, until in zip(self.pools, self.reads, self._down_until)
+                ],
+                "primary_reads": self.primary_reads,
+                "failures": self.failures,
+            }
+
+    def read_bind(self, primary, sticky):
+        """
+        Синхронный движок для чтения: живая реплика по кругу или primary (клиент
+        прилип, реплик нет или все недоступны). Реплику проверяем подключением:
+        соединение сразу возвращается в пул и тут же достается сессии, а упавшая
+        реплика отсеивается здесь, а не ошибкой посреди запроса.
+        """
+        index = None if sticky else self.pick()
+        while index is not None:
+            bind = getattr(self.engines[index], "sync_engine", self.engines[index])
+            try:
+                bind.connect().close()
+            except OperationalError as e:
+                self.mark_down(index, e)
+                index = self.pick()
+                continue
+            self.note_read(index)
+            return bind
+        if self:
+            self.note_read(None)
+        return primary
+
+def _replica_engines(name, urls, factory):
+    engines, pools = [], []
+    for index, url in enumerate(urls):
+        replica_engine = factory(url, **pool_options(url))
+        sync_engine = getattr(replica_engine, "sync_engine", replica_engine)
+        pools.append(metrics.instrument_pool("%s_%d" % (name, index), sync_engine))
+        instrument_sql(sync_engine)
+        engines.append(replica_engine)
+    return ReplicaSet(name, engines, pools)
+
+replicas = _replica_engines("replica", DATABASE_REPLICA_URLS, create_engine)
+async_replicas = _replica_engines(
+    "replica_async", ASYNC_DATABASE_REPLICA_URLS if ASYNC_DB else [], create_async_engine,
+)
+
+class ReadSession(Session):
+    """
+    Сессия эндпоинтов только на чтение. Источник выбирается при первом обращении
+    к БД (ReplicaSet.read_bind), а не при создании сессии: ответ из кэша, 304 или
+    пользователь из principal_cache не берут соединение ни у реплики, ни у primary.
+    В async-режиме это sync_session_class у AsyncSession.
+    """
+
+    def __init__(self, replica_set=None, primary=None, sticky=False, **kw):
+        super().__init__(**kw)
+        self.replica_set = replica_set
+        self.primary = primary
+        self.sticky = sticky
+        self.read_bind = None
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.read_bind is None:
+            self.read_bind = self.replica_set.read_bind(self.primary, self.sticky)
+        return self.read_bind
+
+ReadSessionLocal = sessionmaker(
+    class_=ReadSession, autocommit=False, autoflush=False, replica_set=replicas, primary=engine,
+)
+AsyncReadSessionLocal = None
+if ASYNC_DB:
+    AsyncReadSessionLocal = async_sessionmaker(
+        class_=AsyncSession, sync_session_class=ReadSession, autoflush=False, expire_on_commit=False,
+        replica_set=async_replicas, primary=async_engine.sync_engine,
+    )
+
+# Сессия ленивая: соединение берется из пула при первом запросе к БД. Ответы из кэша
+# и 304 пул не трогают; ожидание checkout меряет сам пул (metrics.PoolMetrics)
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_read_db(request: Request):
+    """
+    Сессия для эндпоинтов только на чтение (каталог, отзывы, история заказов):
+    реплика по кругу; primary - если реплик нет, все недоступны или клиент
+    только что писал (stickiness.py). Как и get_db, соединение берется при первом запросе.
+    """
+    db = ReadSessionLocal(sticky=is_sticky(request)) if replicas else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_read_async_db(request: Request):
+    """Асинхронная версия get_read_db для DB_MODE=async."""
+    async with (AsyncReadSessionLocal(sticky=is_sticky(request)) if async_replicas else AsyncSessionLocal()) as db:
+        yield db
+
+def read_sessionmaker(request):
+    """Фабрика сессий для потоковых ответов (они открывают сессию сами, уже после эндпоинта)."""
+    if ASYNC_DB:
+        return functools.partial(AsyncReadSessionLocal, sticky=is_sticky(request)) if async_replicas else AsyncSessionLocal
+    return functools.partial(ReadSessionLocal, sticky=is_sticky(request)) if replicas else SessionLocal
+
+# ===== Прогрев и закрытие пулов (app/lifecycle.py, app/main.py) =====
+# Сколько соединений открыть в каждом пуле при старте воркера
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", str(DB_POOL_SIZE)))
+
+def _fill(bind, size):
+    with ExitStack() as stack:
+        for _ in range(size):
+            stack.enter_context(bind.connect())
+    return size
+
+async def _fill_async(bind, size):
+    async with AsyncExitStack() as stack:
+        for _ in range(size):
+            await stack.enter_async_context(bind.connect())
+    return size
+
+def warm_up_pools(size=DB_POOL_WARMUP):
+    """
+    Открывает size соединений в пуле primary и каждой реплики и возвращает их в пул,
+    чтобы первые запросы не ждали подключения. Недоступная реплика исключается,
+    как при чтении. Возвращает число открытых соединений.
+    """
+    opened = _fill(engine, size)
+    for index, bind in enumerate(replicas.engines):
+        try:
+            opened += _fill(bind, size)
+        except OperationalError as e:
+            replicas.mark_down(index, e)
+    return opened
+
+async def warm_up_async_pools(size=DB_POOL_WARMUP):
+    """То же для DB_MODE=async: пулы async-движков (синхронный пул фоновых задач откроется по требованию)."""
+    opened = await _fill_async(async_engine, size)
+    for index, bind in enumerate(async_replicas.engines):
+        try:
+            opened += await _fill_async(bind, size)
+        except OperationalError as e:
+            async_replicas.mark_down(index, e)
+    return opened
+
+def ping():
+    with engine.connect() as conn:
+        conn.exec_driver_sql("SELECT 1")
+
+async def ping_async():
+    async with async_engine.connect() as conn:
+        await conn.exec_driver_sql("SELECT 1")
+
+def dispose_pools():
+    """Закрывает соединения пулов при остановке воркера (БД не видит оборванных соединений)."""
+    for bind in [engine] + replicas.engines:
+        bind.dispose()
+
+async def dispose_async_pools():
+    for bind in [async_engine] + async_replicas.engines:
+        await bind.dispose()
+
+@contextmanager
+def count_queries(bind=None):
+    """
+    Считает SQL-запросы, ушедшие через движок внутри блока (для проверок на N+1):
+
+        with count_queries() as queries:
+            client.get("/api/cart")
+        assert queries["count"] == 2
+    """
+    bind = bind if bind is not None else (async_engine.sync_engine if ASYNC_DB else engine)
+    queries = {"count": 0, "statements": []}
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        queries["count"] += 1
+        queries["statements"].append(statement)
+
+    event.listen(bind, "before_cursor_execute", on_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(bind, "before_cursor_execute", on_execute)
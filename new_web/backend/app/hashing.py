@@ -0,0 +1,142 @@
+# backend/app/hashing.py
+"""
+Хэширование паролей (bcrypt_sha256) в отдельном ограниченном пуле.
+
+bcrypt намеренно медленный, и пачка логинов раньше занимала потоки Starlette,
+которые обслуживают все остальные эндпоинты. Теперь:
+- хэши считаются в своем пуле из PASSWORD_HASH_WORKERS воркеров
+  (PASSWORD_HASH_EXECUTOR=process - процессы, чтобы bcrypt шел параллельно по ядрам);
+- одновременно принимается не больше workers + PASSWORD_HASH_MAX_QUEUE задач,
+  сверх этого сразу 429 с Retry-After, а не очередь без конца;
+- копятся гистограммы времени хэширования и ожидания в очереди.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from .metrics import Histogram
+
+pwd_context = CryptContext(schemes=["bcrypt_sha256"], deprecated="auto")
+
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread").lower()  # thread | process
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "16"))
+
+hash_latency_ms = Histogram()
+queue_wait_ms = Histogram()
+rejected = 0
+
+_executor = None
+_in_flight = 0
+_lock = threading.Lock()
+
+
+def _hash_in_worker(password):
+    started_at = time.time()
+    return pwd_context.hash(password), started_at, time.time()
+
+
+def _verify_in_worker(plain_password, hashed_password):
+    started_at = time.time()
+    return pwd_context.verify(plain_password, hashed_password), started_at, time.time()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                if PASSWORD_HASH_EXECUTOR == "process":
+                    _executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+                else:
+                    _executor = ThreadPoolExecutor(
+                        max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+                    )
+    return _executor
+
+
+def _release(future):
+    global _in_flight
+    with _lock:
+        _in_flight -= 1
+
+
+def _submit(fn, *args):
+    """Ставит задачу в пул или сразу отвечает 429, если очередь заполнена."""
+    global _in_flight, rejected
+    with _lock:
+        if _in_flight >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_QUEUE:
+            rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Сервер перегружен запросами входа, повторите попытку позже",
+                headers={"Retry-After": "1"},
+            )
+        _in_flight += 1
+    try:
+        future = _get_executor().submit(fn, *args)
+    except Exception:
+        _release(None)
+        raise
+    future.add_done_callback(_release)
+    return future
+
+
+def _unpack(result, submitted_at):
+    # Время берем по time.time(): в process-режиме замеры делаются в другом процессе
+    value, started_at, finished_at = result
+    queue_wait_ms.observe(max(0.0, started_at - submitted_at) * 1000)
+    hash_latency_ms.observe((finished_at - started_at) * 1000)
+    return value
+
+
+def hash_password(password):
+    submitted_at = time.time()
+    return _unpack(_submit(_hash_in_worker, password).result(), submitted_at)
+
+
+def verify_password(plain_password, hashed_password):
+    submitted_at = time.time()
+    return _unpack(_submit(_verify_in_worker, plain_password, hashed_password).result(), submitted_at)
+
+
+async def hash_password_async(password):
+    submitted_at = time.time()
+    return _unpack(await asyncio.wrap_future(_submit(_hash_in_worker, password)), submitted_at)
+
+
+async def verify_password_async(plain_password, hashed_password):
+    submitted_at = time.time()
+    future = _submit(_verify_in_worker, plain_password, hashed_password)
+    return _unpack(await asyncio.wrap_future(future), submitted_at)
+
+
+def warm_up():
+    """Поднимает пул заранее (app/main.py): в process-режиме процессы стартуют при запуске воркера, а не на первом логине."""
+    executor = _get_executor()
+    if PASSWORD_HASH_EXECUTOR == "process":
+        for future in [executor.submit(os.getpid) for _ in range(PASSWORD_HASH_WORKERS)]:
+            future.result()
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def snapshot():
+    return {
+        "executor": PASSWORD_HASH_EXECUTOR,
+        "workers": PASSWORD_HASH_WORKERS,
+        "max_queue": PASSWORD_HASH_MAX_QUEUE,
+        "in_flight": _in_flight,
+        "rejected": rejected,
+        "hash_latency_ms": hash_latency_ms.snapshot(),
+        "queue_wait_ms": queue_wait_ms.snapshot(),
+    }
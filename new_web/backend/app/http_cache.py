@@ -0,0 +1,56 @@
+# backend/app/http_cache.py
+"""
+HTTP-кэширование ответов на чтение (каталог, отзывы).
+
+Ответ сериализуется один раз и хранится в in-process кэше вместе со строгим
+ETag (хэш тела) и Last-Modified (момент построения). Повторный запрос
+с совпавшим If-None-Match / If-Modified-Since получает 304 без тела -
+без запроса к БД и без сериализации, пока запись живет в кэше.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+from pydantic_core import to_json
+
+
+class CachedBody:
+    __slots__ = ("body", "etag", "last_modified")
+
+    def __init__(self, body, etag, last_modified):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+def build(payload):
+    """Сериализует payload (pydantic-модели, списки, dict) в JSON и считает ETag."""
+    body = to_json(payload)
+    etag = '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+    return CachedBody(body, etag, datetime.now(timezone.utc).replace(microsecond=0))
+
+
+def _not_modified(request: Request, entry: CachedBody):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match главнее If-Modified-Since (RFC 9110); W/ сравниваем слабо
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or entry.etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return entry.last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def respond(request: Request, entry: CachedBody, max_age: int):
+    headers = {
+        "ETag": entry.etag,
+        "Last-Modified": format_datetime(entry.last_modified, usegmt=True),
+        "Cache-Control": "public, max-age=%d" % max_age,
+    }
+    if _not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
@@ -0,0 +1,230 @@
+# backend/app/lifecycle.py
+"""
+Жизненный цикл воркера: ленивые роутеры, прогрев, готовность и drain.
+
+- Роутеры импортируются при первом запросе к своему префиксу (LazyRouters):
+  процесс, которому нужна пара эндпоинтов (скрипты, TestClient, воркер
+  с SERVER_WARMUP=false), не платит за импорт остальных.
+- Прогрев (SERVER_WARMUP, по умолчанию включен) идет в startup, до того как
+  uvicorn начнет принимать соединения: импорт роутеров, к которым относятся
+  WARMUP_PATHS, открытие соединений пулов БД, GET по WARMUP_PATHS (заполняет
+  кэши каталога и отзывов). Остальные роутеры подгружаются первым запросом
+  (20-100 мс на роутер); чтобы загрузить роутер заранее, добавьте его путь
+  в WARMUP_PATHS - ответ не обязан быть 200.
+- /readyz отвечает 503, пока воркер не прогрет, во время drain и если primary
+  не отвечает за READYZ_DB_TIMEOUT; /healthz - только "процесс жив".
+- drain (см. app/server.py): по SIGTERM воркер SHUTDOWN_DRAIN_DELAY секунд
+  продолжает обслуживать запросы, но /readyz уже 503, а ответы идут с
+  Connection: close - балансировщик успевает убрать воркер, keep-alive
+  клиенты переподключаются к другим.
+- Время старта по фазам - в логе server.ready и в ответе /readyz.
+"""
+import asyncio
+import importlib
+import os
+import time
+from starlette.concurrency import run_in_threadpool
+from .log import get_logger
+
+SERVER_WARMUP = os.getenv("SERVER_WARMUP", "true").lower() in ("1", "true", "yes")
+WARMUP_PATHS = [p.strip() for p in os.getenv("WARMUP_PATHS", "/api/products,/api/reviews").split(",") if p.strip()]
+READYZ_DB_TIMEOUT = float(os.getenv("READYZ_DB_TIMEOUT", "2"))
+
+log = get_logger(__name__)
+
+_import_started = time.perf_counter()
+timings = {}
+ready = False
+draining = False
+in_flight = 0
+
+
+def _process_age():
+    """Секунды с запуска процесса (Linux, /proc), иначе None."""
+    try:
+        with open("/proc/self/stat") as f:
+            started_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - started_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _ms(started):
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def mark_imported():
+    """Вызывается в конце импорта app.main: время интерпретатора+uvicorn и импорта приложения."""
+    timings["import_ms"] = _ms(_import_started)
+    age = _process_age()
+    if age is not None:
+        timings["boot_ms"] = round(max(0.0, age * 1000 - timings["import_ms"]), 1)
+
+
+class LazyRouters:
+    """
+    Роутеры из package.<модуль>, которые подключаются при первом запросе к одному
+    из их префиксов: {модуль: (префиксы путей)}. include(name, module) подключает
+    модуль к приложению. Новый роутер с новым префиксом надо добавить в таблицу -
+    иначе до прогрева (load_all) его пути будут отвечать 404.
+    """
+
+    def __init__(self, package, prefixes, include):
+        self.package = package
+        self.prefixes = prefixes
+        self.include = include
+        self.loaded = set()
+
+    def pending_for(self, path):
+        """Незагруженные роутеры, к префиксам которых относится path (query-строка отбрасывается)."""
+        path = path.partition("?")[0]
+        return [
+            name for name, prefixes in self.prefixes.items()
+            if name not in self.loaded and any(path == p or path.startswith(p + "/") for p in prefixes)
+        ]
+
+    async def load(self, names):
+        for name in names:
+            # Импорт - в потоке, подключение - в event loop: маршруты меняются
+            # там же, где их перебирает роутер Starlette
+            module = await run_in_threadpool(importlib.import_module, "%s.%s" % (self.package, name))
+            if name not in self.loaded:
+                self.loaded.add(name)
+                self.include(name, module)
+
+    async def load_all(self):
+        await self.load([name for name in self.prefixes if name not in self.loaded])
+
+
+class LazyRouterMiddleware:
+    """Подгружает роутер перед первым запросом к его префиксу; для документации - все сразу."""
+
+    def __init__(self, app, routers, load_all_paths=("/openapi.json", "/docs", "/redoc")):
+        self.app = app
+        self.routers = routers
+        self.load_all_paths = set(load_all_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and len(self.routers.loaded) < len(self.routers.prefixes):
+            if scope["path"] in self.load_all_paths:
+                await self.routers.load_all()
+            else:
+                names = self.routers.pending_for(scope["path"])
+                if names:
+                    await self.routers.load(names)
+        await self.app(scope, receive, send)
+
+
+class InFlightMiddleware:
+    """Считает запросы в обработке; во время drain закрывает keep-alive соединения (Connection: close)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global in_flight
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_closing(message):
+            if draining and message["type"] == "http.response.start":
+                message = {**message, "headers": list(message["headers"]) + [(b"connection", b"close")]}
+            await send(message)
+
+        in_flight += 1
+        try:
+            await self.app(scope, receive, send_closing)
+        finally:
+            in_flight -= 1
+
+
+async def _get(app, target):
+    """GET target через весь стек приложения, без сети; возвращает статус ответа."""
+    path, _, query = target.partition("?")
+    status = None
+    request_sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()  # потоковые ответы слушают отключение клиента
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": query.encode(), "headers": [(b"host", b"warmup")],
+        "client": ("127.0.0.1", 0), "server": ("warmup", 80),
+    }
+    try:
+        await app(scope, receive, send)
+    finally:
+        disconnected.set()
+    return status
+
+
+async def warm_up(app, routers, warm_pools):
+    """Прогрев воркера перед приемом соединений; warm_pools() - корутина, открывающая пулы БД."""
+    started = time.perf_counter()
+    names = list(dict.fromkeys(name for target in WARMUP_PATHS for name in routers.pending_for(target)))
+    await routers.load(names)
+    timings["routers"] = names
+    timings["routers_ms"] = _ms(started)
+
+    phase = time.perf_counter()
+    timings["db_connections"] = await warm_pools()
+    timings["pools_ms"] = _ms(phase)
+
+    phase = time.perf_counter()
+    for target in WARMUP_PATHS:
+        # Неудачный прогревочный запрос не мешает старту: воркер просто начнет с холодным кэшем
+        try:
+            status = await _get(app, target)
+        except Exception as e:
+            status = type(e).__name__
+        if not isinstance(status, int) or status >= 500:
+            log.warning("server.warmup_request_failed", path=target, status=status)
+    timings["requests_ms"] = _ms(phase)
+    timings["warmup_ms"] = _ms(started)
+
+
+def mark_ready():
+    global ready
+    ready = True
+    age = _process_age()
+    timings["ready_ms"] = round(age * 1000, 1) if age is not None else _ms(_import_started)
+    log.info("server.ready", pid=os.getpid(), **timings)
+
+
+def begin_drain():
+    """SIGTERM получен: /readyz -> 503, ответы с Connection: close; запросы еще обслуживаются."""
+    global draining
+    if not draining:
+        draining = True
+        log.info("server.draining", pid=os.getpid(), in_flight=in_flight)
+
+
+async def readiness(ping, timeout=READYZ_DB_TIMEOUT):
+    """(готов, тело ответа /readyz); ping() - корутина с SELECT 1 к primary."""
+    body = {"pid": os.getpid(), "in_flight": in_flight, "startup": timings}
+    if draining:
+        return False, {"status": "draining", **body}
+    if not ready:
+        return False, {"status": "starting", **body}
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(ping(), timeout)
+    except Exception as e:
+        return False, {"status": "db_unavailable", "error": type(e).__name__, **body}
+    return True, {"status": "ready", "db_ms": _ms(started), **body}
@@ -0,0 +1,158 @@
+# backend/app/log.py
+"""
+Структурированное логирование приложения.
+
+    log = get_logger(__name__)
+    log.info("cart.item_added", user_id=user.id, product_id=product_id)
+
+- событие - короткое имя, данные - отдельными полями, а не f-строкой:
+  ничего не форматируется, если уровень выключен;
+- горячие пути можно сэмплировать: LOG_SAMPLING="app.routers.cart=0.01"
+  оставляет 1% debug/info-записей этого логгера (warning и выше - всегда);
+- запись в поток/файл идет в отдельном потоке через очередь (QueueHandler),
+  запрос только кладет запись в очередь; при переполнении запись
+  отбрасывается и учитывается в dropped, а не блокирует запрос.
+
+Настройки: LOG_LEVEL (INFO), LOG_FORMAT (json | text), LOG_QUEUE_SIZE, LOG_SAMPLING.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+
+def _parse_sampling(value):
+    rates = {}
+    for part in value.split(","):
+        name, _, rate = part.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+LOG_SAMPLING = _parse_sampling(os.getenv("LOG_SAMPLING", ""))
+
+# Стандартные атрибуты LogRecord - все остальное в записи считаем полями события
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+def _fields(record):
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join("%s=%s" % item for item in fields.items())
+        return line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, который не ждет места в очереди, а отбрасывает запись."""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Очередь в том же процессе: запись не нужно сериализовать,
+        # сообщение форматируется уже в потоке QueueListener
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+class EventLogger:
+    """Обертка над logging.Logger: событие + поля, проверка уровня и сэмплирование до создания записи."""
+
+    __slots__ = ("logger", "sample_rate")
+
+    def __init__(self, name):
+        self.logger = logging.getLogger(name)
+        self.sample_rate = LOG_SAMPLING.get(name, 1.0)
+
+    def _log(self, level, event, fields, sampled):
+        if not self.logger.isEnabledFor(level):
+            return
+        if sampled and self.sample_rate < 1.0:
+            if random.random() >= self.sample_rate:
+                return
+            fields["sample_rate"] = self.sample_rate
+        self.logger._log(level, event, (), extra=fields, stacklevel=3)
+
+    def debug(self, event, **fields):
+        self._log(logging.DEBUG, event, fields, True)
+
+    def info(self, event, **fields):
+        self._log(logging.INFO, event, fields, True)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, fields, False)
+
+    def error(self, event, **fields):
+        self._log(logging.ERROR, event, fields, False)
+
+
+def get_logger(name):
+    return EventLogger(name)
+
+
+_listener = None
+
+
+def configure(stream=None):
+    """Подключает асинхронный (через очередь) вывод для логгеров app.*; повторный вызов ничего не делает."""
+    global _listener
+    if _listener is not None:
+        return
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+
+    app_logger = logging.getLogger("app")
+    app_logger.handlers = [DroppingQueueHandler(log_queue)]
+    app_logger.setLevel(LOG_LEVEL)
+    app_logger.propagate = False
+
+
+def shutdown():
+    """Дописывает очередь и останавливает поток записи."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def snapshot():
+    return {"level": LOG_LEVEL, "format": LOG_FORMAT, "sampling": LOG_SAMPLING, "dropped": DroppingQueueHandler.dropped}
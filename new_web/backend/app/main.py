@@ -1,9 +1,35 @@
 # backend/app/main.py
+from . import lifecycle  # первым: отсчет времени импорта приложения
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import importlib
+import os
+import sys
+from . import log, database
+from .compression import CompressionMiddleware
+from .metrics import RequestMetricsMiddleware
 
-app = FastAPI(title="Мебельный магазин API")
+try:
+    import orjson
+except ImportError:  # orjson - необязательная зависимость
+    orjson = None
+
+# JSON_RENDERER=orjson (по умолчанию, если пакет установлен) кодирует ответы через orjson,
+# JSON_RENDERER=std - стандартный json.dumps
+JSON_RENDERER = os.getenv("JSON_RENDERER", "orjson" if orjson is not None else "std").lower()
+if JSON_RENDERER == "orjson" and orjson is None:
+    raise RuntimeError("JSON_RENDERER=orjson, но пакет orjson не установлен")
+DefaultResponse = ORJSONResponse if JSON_RENDERER == "orjson" else JSONResponse
+
+# Сверка рейтингов и пополнение сводок аналитики в этом процессе. app/server.py
+# оставляет их одному воркеру: N копий спорили бы за один водяной знак
+BACKGROUND_JOBS = os.getenv("BACKGROUND_JOBS", "true").lower() in ("1", "true", "yes")
+
+log.configure()
+app = FastAPI(title="Мебельный магазин API", default_response_class=DefaultResponse)
 
 # Правильные настройки CORS
 app.add_middleware(
@@ -18,22 +44,186 @@ app.add_middleware(
     allow_methods=["*"],  # Разрешить все методы
     allow_headers=["*"],  # Разрешить все заголовки
 )
+# brotli/gzip для ответов от COMPRESSION_MIN_SIZE байт
+app.add_middleware(CompressionMiddleware)
+# Время запроса, число SQL и время в БД по маршрутам: /metrics и заголовок Server-Timing
+app.add_middleware(RequestMetricsMiddleware)
 
 # Добавьте обработчик для OPTIONS запросов
 @app.options("/api/{path:path}")
 async def options_handler():
     return JSONResponse(status_code=200, content={})
 
-from .routers import users, products, cart, reviews, auth, orders
+from .database import ASYNC_DB, SessionLocal, replicas, async_replicas
+from .stickiness import ReadYourWritesMiddleware
+from . import metrics
+
+# С репликами (DATABASE_REPLICA_URLS) клиент после записи читает с primary - см. stickiness.py
+if replicas:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# DB_MODE=async подключает async-версии эндпоинтов (AsyncSession), иначе - обычные sync
+def _pick(module):
+    return module.async_router if ASYNC_DB else module.router
+
+def _include(name, module):
+    app.include_router(_pick(module), prefix="/api", tags=[name])
+
+# Роутеры импортируются лениво - при первом запросе к префиксу или при прогреве (lifecycle.py).
+# Новый роутер - сюда, с префиксами всех его путей
+routers = lifecycle.LazyRouters(__package__ + ".routers", {
+    "auth": ("/api/auth",),
+    "users": ("/api/register", "/api/login"),
+    "products": ("/api/products", "/api/seed-products"),
+    "cart": ("/api/cart",),
+    "reviews": ("/api/reviews",),
+    "orders": ("/api/orders",),
+    "analytics": ("/api/analytics",),
+}, _include)
+app.add_middleware(lifecycle.LazyRouterMiddleware, routers=routers)
+# Снаружи всех: запросы в обработке и Connection: close во время drain
+app.add_middleware(lifecycle.InFlightMiddleware)
+
+
+@app.get("/healthz", tags=["system"], include_in_schema=False)
+async def healthz():
+    """Liveness: процесс жив и event loop отвечает. Зависимости не проверяются."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz", tags=["system"], include_in_schema=False)
+async def readyz():
+    """Readiness: воркер прогрет, не в drain и primary отвечает на SELECT 1; иначе 503."""
+    ping = database.ping_async if ASYNC_DB else (lambda: run_in_threadpool(database.ping))
+    ok, body = await lifecycle.readiness(ping)
+    return DefaultResponse(body, status_code=200 if ok else 503)
+
+
+@app.get("/api/db/pool-metrics", tags=["system"])
+def db_pool_metrics():
+    """Состояние пулов соединений: занятость, ожидание checkout, overflow, время жизни соединений."""
+    return metrics.pool_snapshot()
+
+
+@app.get("/api/db/replicas", tags=["system"])
+def db_replicas():
+    """Чтения по репликам и primary, реплики, временно исключенные после ошибки подключения."""
+    return (async_replicas if ASYNC_DB else replicas).snapshot()
+
+
+@app.get("/metrics", tags=["system"], include_in_schema=False)
+def prometheus_metrics():
+    """Метрики в текстовом формате Prometheus."""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+# Модули, которые нужны только прогреву, фоновым задачам или служебным эндпоинтам
+# (passlib у hashing, numpy у analytics), импортируются в потоке по требованию:
+# import app.main за них не платит, а event loop не стоит на импорте
+async def _import(name):
+    return await run_in_threadpool(importlib.import_module, "%s.%s" % (__package__, name))
+
+
+async def _warm_pools():
+    hashing = await _import("hashing")
+    await run_in_threadpool(hashing.warm_up)
+    if ASYNC_DB:
+        return await database.warm_up_async_pools()
+    return await run_in_threadpool(database.warm_up_pools)
 
-app.include_router(auth.router, prefix="/api", tags=["auth"])
-app.include_router(users.router, prefix="/api", tags=["users"])
-app.include_router(products.router, prefix="/api", tags=["products"])
-app.include_router(cart.router, prefix="/api", tags=["cart"])
-app.include_router(reviews.router, prefix="/api", tags=["reviews"])
-app.include_router(orders.router, prefix="/api", tags=["orders"])
+
+@app.on_event("startup")
+async def warm_up():
+    # uvicorn начинает принимать соединения только после startup - воркер получает трафик прогретым
+    if lifecycle.SERVER_WARMUP:
+        await lifecycle.warm_up(app, routers, _warm_pools)
+    lifecycle.mark_ready()
+
+
+async def _reconcile_ratings_forever():
+    ratings = await _import("ratings")
+    if ratings.RATING_RECONCILE_INTERVAL <= 0:
+        return
+    # Сверка идет синхронной сессией в потоке, чтобы не занимать event loop
+    while True:
+        await asyncio.sleep(ratings.RATING_RECONCILE_INTERVAL)
+        try:
+            fixed = await run_in_threadpool(_reconcile_ratings, ratings)
+            if fixed:
+                from .routers import products
+                products.invalidate_catalog()
+        except Exception as e:
+            ratings.log.error("ratings.reconcile_failed", error=e)
+
+
+def _reconcile_ratings(ratings):
+    with SessionLocal() as db:
+        return ratings.reconcile(db)
+
+
+async def _refresh_analytics_forever():
+    analytics = await _import("analytics")
+    if analytics.ANALYTICS_REFRESH_INTERVAL <= 0:
+        return
+    # Сводки пополняет воркер с фоновыми задачами; остальные только перечитывают
+    # свой снимок в памяти, когда сдвинулся водяной знак. Первый проход сразу
+    step = analytics.run_refresh if BACKGROUND_JOBS else analytics.run_reload_columns
+    while True:
+        try:
+            await run_in_threadpool(step)
+        except Exception as e:
+            analytics.log.error("analytics.refresh_failed", error=e)
+        await asyncio.sleep(analytics.ANALYTICS_REFRESH_INTERVAL)
+
+
+# Объявлены после warm_up: задачи стартуют, когда воркер уже прогрет
+@app.on_event("startup")
+async def start_background_jobs():
+    jobs = [_refresh_analytics_forever()]
+    if BACKGROUND_JOBS:
+        jobs.append(_reconcile_ratings_forever())
+    app.state.background_jobs = [asyncio.create_task(job) for job in jobs]
+    lifecycle.log.info("server.background_jobs", pid=os.getpid(), enabled=BACKGROUND_JOBS)
+
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    for task in getattr(app.state, "background_jobs", ()):
+        task.cancel()
+
+
+@app.on_event("shutdown")
+def shutdown_password_hashing():
+    # Не импортирован - значит, и пула хэширования нет
+    hashing = sys.modules.get(__package__ + ".hashing")
+    if hashing is not None:
+        hashing.shutdown()
+
+
+@app.on_event("shutdown")
+async def close_db_pools():
+    # Сюда uvicorn доходит, когда запросы уже обслужены (или истек SHUTDOWN_TIMEOUT)
+    if ASYNC_DB:
+        await database.dispose_async_pools()
+    database.dispose_pools()
+    lifecycle.log.info("server.stopped", pid=os.getpid(), in_flight=lifecycle.in_flight)
+
+
+@app.on_event("shutdown")
+def flush_logs():
+    log.shutdown()
+
+
+@app.get("/api/hashing/metrics", tags=["system"])
+def password_hashing_metrics():
+    """Пул хэширования паролей: занятость, отказы 429, время bcrypt и ожидания в очереди."""
+    from . import hashing
+    return hashing.snapshot()
 
 
 @app.get("/")
 def read_root():
-    return {"message": "Мебельный магазин API"}
\ No newline at end of file
+    return {"message": "Мебельный магазин API"}
+
+
+lifecycle.mark_imported()
@@ -0,0 +1,319 @@
+# backend/app/metrics.py
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from .log import DroppingQueueHandler, get_logger
+
+log = get_logger(__name__)
+
+# Границы корзин гистограмм в миллисекундах
+DEFAULT_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    """Простая потокобезопасная гистограмма с фиксированными корзинами."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # последняя корзина - "+Inf"
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def cumulative(self):
+        """(границы корзин, накопленные счетчики по ним, count, sum) - для формата Prometheus."""
+        with self._lock:
+            counts, running = [], 0
+            for n in self.counts:
+                running += n
+                counts.append(running)
+            return self.buckets, counts, self.count, self.total
+
+    def snapshot(self):
+        with self._lock:
+            buckets = {str(bound): n for bound, n in zip(self.buckets, self.counts)}
+            buckets["+Inf"] = self.counts[-1]
+            return {
+                "count": self.count,
+                "sum": round(self.total, 3),
+                "avg": round(self.total / self.count, 3) if self.count else 0.0,
+                "max": round(self.max, 3),
+                "buckets": buckets,
+            }
+
+
+class PoolMetrics:
+    """Телеметрия пула соединений SQLAlchemy: занятость, ожидание, overflow, время жизни."""
+
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.checkout_wait_ms = Histogram()
+        self.connection_lifetime_s = Histogram(buckets=(1, 10, 60, 300, 900, 1800, 3600, 7200))
+        self.checkouts = 0
+        self.overflow_events = 0
+        self.connects = 0
+        self.disconnects = 0
+        self.invalidations = 0
+        self.times_checkouts = False
+        self._lock = threading.Lock()
+
+        pool = engine.pool
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "close", self._on_close)
+        event.listen(pool, "invalidate", self._on_invalidate)
+        self._time_checkouts(pool)
+        # dispose() заменяет пул новым: слушатели событий переносятся, обертка - нет
+        event.listen(engine, "engine_disposed", lambda disposed: self._time_checkouts(disposed.pool))
+
+    def _time_checkouts(self, pool):
+        # Событий "до выдачи соединения" у пула нет (checkout - уже после), а по
+        # checkedout()/overflow() видно, что пул занят, но не сколько ждали. Поэтому
+        # ожидание меряем вокруг приватного Pool._do_get: очередь свободных соединений
+        # плюс открытие нового. Меряется только реальный checkout - сессия, которая так
+        # и не обратилась к БД (кэш, 304), пул не трогает. Версия SQLAlchemy под это
+        # закреплена в requirements.txt; без _do_get гистограммы ожидания просто нет
+        do_get = getattr(pool, "_do_get", None)
+        if not callable(do_get):
+            self.times_checkouts = False
+            log.warning("metrics.checkout_wait_unavailable", pool=self.name, pool_class=type(pool).__name__)
+            return
+
+        def timed_do_get(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return do_get(*args, **kwargs)
+            finally:
+                self.checkout_wait_ms.observe((time.perf_counter() - started) * 1000)
+
+        pool._do_get = timed_do_get
+        self.times_checkouts = True
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        connection_record.info["created_at"] = time.monotonic()
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        pool = self.engine.pool
+        overflow = isinstance(pool, QueuePool) and pool.checkedout() > pool.size()
+        with self._lock:
+            self.checkouts += 1
+            if overflow:
+                self.overflow_events += 1
+
+    def _on_close(self, dbapi_connection, connection_record):
+        created_at = connection_record.info.pop("created_at", None)
+        if created_at is not None:
+            self.connection_lifetime_s.observe(time.monotonic() - created_at)
+        with self._lock:
+            self.disconnects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self):
+        pool = self.engine.pool
+        data = {
+            "pool_class": type(pool).__name__,
+            "status": pool.status(),
+            "checkouts": self.checkouts,
+            "overflow_events": self.overflow_events,
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+            "invalidations": self.invalidations,
+            "checkout_wait_ms": self.checkout_wait_ms.snapshot() if self.times_checkouts else None,
+            "connection_lifetime_s": self.connection_lifetime_s.snapshot(),
+        }
+        # У QueuePool есть счетчики размера/overflow, у SQLite-пулов - нет
+        if isinstance(pool, QueuePool):
+            for attr in ("size", "checkedin", "checkedout", "overflow"):
+                data[attr] = getattr(pool, attr)()
+        return data
+
+
+pools = {}
+
+
+def instrument_pool(name, engine):
+    pools[name] = PoolMetrics(name, engine)
+    return pools[name]
+
+
+def pool_snapshot():
+    return {name: metrics.snapshot() for name, metrics in pools.items()}
+
+
+# ---------- Время запросов и SQL на запрос ----------
+
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class SqlStats:
+    """SQL одного HTTP-запроса: число выполненных statement-ов и суммарное время в БД."""
+    __slots__ = ("count", "time_ms")
+
+    def __init__(self):
+        self.count = 0
+        self.time_ms = 0.0
+
+
+# Middleware кладет сюда SqlStats на время запроса, события движка (database.py) его пополняют.
+# Sync-эндпоинты работают в threadpool с копией контекста, но объект в ней тот же.
+request_sql = ContextVar("request_sql", default=None)
+
+sql_duration_ms = Histogram()
+_routes = {}  # (method, route) -> {"latency": Histogram, "sql_count": ..., "sql_ms": ..., "status": {code: n}}
+_routes_lock = threading.Lock()
+
+
+def observe_sql(elapsed_ms):
+    sql_duration_ms.observe(elapsed_ms)
+    stats = request_sql.get()
+    if stats is not None:
+        stats.count += 1
+        stats.time_ms += elapsed_ms
+
+
+def observe_request(method, route, status, elapsed_ms, sql):
+    key = (method, route)
+    entry = _routes.get(key)
+    if entry is None:
+        with _routes_lock:
+            entry = _routes.setdefault(key, {
+                "latency": Histogram(),
+                "sql_count": Histogram(buckets=SQL_COUNT_BUCKETS),
+                "sql_ms": Histogram(),
+                "status": {},
+            })
+    entry["latency"].observe(elapsed_ms)
+    entry["sql_count"].observe(sql.count)
+    entry["sql_ms"].observe(sql.time_ms)
+    with _routes_lock:
+        entry["status"][status] = entry["status"].get(status, 0) + 1
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _prometheus_histogram(lines, name, histogram, labels, scale=1.0):
+    bounds, counts, count, total = histogram.cumulative()
+    prefix = ",".join('%s="%s"' % (k, _label(v)) for k, v in labels)
+    sep = "," if prefix else ""
+    for bound, n in zip(bounds, counts):
+        lines.append('%s_bucket{%s%sle="%g"} %d' % (name, prefix, sep, bound * scale, n))
+    lines.append('%s_bucket{%s%sle="+Inf"} %d' % (name, prefix, sep, counts[-1]))
+    braces = "{%s}" % prefix if prefix else ""
+    lines.append("%s_sum%s %g" % (name, braces, total * scale))
+    lines.append("%s_count%s %d" % (name, braces, count))
+
+
+def render_prometheus():
+    """Все метрики в текстовом формате Prometheus (время - в секундах, как принято в Prometheus)."""
+    lines = []
+    with _routes_lock:
+        routes = sorted(_routes.items())
+        statuses = [(key, dict(entry["status"])) for key, entry in routes]
+
+    lines.append("# HELP http_requests_total HTTP-запросы по маршруту и коду ответа")
+    lines.append("# TYPE http_requests_total counter")
+    for (method, route), by_status in statuses:
+        for code, n in sorted(by_status.items()):
+            lines.append('http_requests_total{method="%s",route="%s",status="%s"} %d' % (method, _label(route), code, n))
+
+    for name, field, scale, help_text in (
+        ("http_request_duration_seconds", "latency", 0.001, "Время обработки запроса"),
+        ("http_request_sql_statements", "sql_count", 1.0, "SQL-запросов на один HTTP-запрос"),
+        ("http_request_db_seconds", "sql_ms", 0.001, "Суммарное время в БД на один HTTP-запрос"),
+    ):
+        lines.append("# HELP %s %s" % (name, help_text))
+        lines.append("# TYPE %s histogram" % name)
+        for (method, route), entry in routes:
+            _prometheus_histogram(lines, name, entry[field], (("method", method), ("route", route)), scale)
+
+    lines.append("# HELP db_statement_duration_seconds Время выполнения одного SQL-запроса")
+    lines.append("# TYPE db_statement_duration_seconds histogram")
+    _prometheus_histogram(lines, "db_statement_duration_seconds", sql_duration_ms, (), 0.001)
+
+    lines.append("# HELP db_pool_checkout_wait_seconds Ожидание соединения из пула")
+    lines.append("# TYPE db_pool_checkout_wait_seconds histogram")
+    for name, pool in pools.items():
+        if pool.times_checkouts:
+            _prometheus_histogram(lines, "db_pool_checkout_wait_seconds", pool.checkout_wait_ms, (("pool", name),), 0.001)
+    lines.append("# TYPE db_pool_checkouts_total counter")
+    for name, pool in pools.items():
+        lines.append('db_pool_checkouts_total{pool="%s"} %d' % (_label(name), pool.checkouts))
+    lines.append("# TYPE app_log_records_dropped_total counter")
+    lines.append("app_log_records_dropped_total %d" % DroppingQueueHandler.dropped)
+    return "\n".join(lines) + "\n"
+
+
+class RequestMetricsMiddleware:
+    """
+    Меряет каждый HTTP-запрос: время, число SQL и время в БД по шаблону маршрута
+    (/api/products/{product_id}, а не конкретный id) и добавляет заголовок
+    Server-Timing: app;dur=..., db;dur=...;desc="N sql".
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._paths = {}  # endpoint -> шаблон пути; перестраивается, когда появляются новые маршруты
+
+    def _route(self, scope):
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"  # 404 и т.п. - одна метка, чтобы не плодить серии по произвольным URL
+        path = self._paths.get(endpoint)
+        if path is None:
+            # Роутеры подключаются лениво (lifecycle.LazyRouters) - новый endpoint значит новые маршруты
+            app = scope.get("app")
+            self._paths = {
+                getattr(r, "endpoint", None): r.path for r in getattr(app, "routes", []) if hasattr(r, "path")
+            }
+            path = self._paths.get(endpoint, "unmatched")
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        sql = SqlStats()
+        token = request_sql.set(sql)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed = (time.perf_counter() - started) * 1000
+                server_timing = 'app;dur=%.1f, db;dur=%.1f;desc="%d sql"' % (elapsed, sql.time_ms, sql.count)
+                message = {**message, "headers": list(message["headers"]) + [(b"server-timing", server_timing.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_sql.reset(token)
+            observe_request(
+                scope["method"], self._route(scope), status_code, (time.perf_counter() - started) * 1000, sql
+            )
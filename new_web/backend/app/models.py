@@ -1,8 +1,10 @@
 # backend/app/models.py
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, Date, DateTime, Text, ForeignKey, Index, UniqueConstraint, literal_column
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects import postgresql  # noqa: F401 - регистрирует to_tsvector/to_tsquery для PostgreSQL
 from sqlalchemy.sql import func
 from .database import Base
+from .money import Kopecks
 
 class User(Base):
     __tablename__ = "users"
@@ -14,40 +16,86 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     phone_number = Column(String, nullable=True)
+    # Растет с каждым изменением корзины; по нему воркеры сверяют кэш итогов (routers/cart.py)
+    cart_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Связи
     cart_items = relationship("CartItem", back_populates="user")
     reviews = relationship("Review", back_populates="user")
 
+# Полнотекстовый поиск по товарам (PostgreSQL). Константы - literal_column, чтобы
+# выражение в запросах (app/search.py) совпадало с выражением индекса при любом драйвере.
+SEARCH_CONFIG = "russian"
+
+def search_document(name, description):
+    return func.to_tsvector(
+        literal_column("'%s'" % SEARCH_CONFIG),
+        func.coalesce(name, literal_column("''"))
+        .concat(literal_column("' '"))
+        .concat(func.coalesce(description, literal_column("''"))),
+    )
+
 class Product(Base):
     __tablename__ = "products"
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(Text)
-    price = Column(Float, nullable=False)
-    category = Column(String, nullable=False)  # 'bed', 'sofa', 'wardrobe'
+    price = Column(Kopecks, nullable=False)  # в БД - копейки, в Python - Decimal в рублях
+    category = Column(String, nullable=False, index=True)  # 'bed', 'sofa', 'wardrobe'
     image_url = Column(String)
     in_stock = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Сводка одобренных отзывов о товаре; поддерживается app/ratings.py
+    # при каждом flush отзывов, расхождения чинит периодическая сверка
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    stars_1 = Column(Integer, nullable=False, default=0, server_default="0")
+    stars_2 = Column(Integer, nullable=False, default=0, server_default="0")
+    stars_3 = Column(Integer, nullable=False, default=0, server_default="0")
+    stars_4 = Column(Integer, nullable=False, default=0, server_default="0")
+    stars_5 = Column(Integer, nullable=False, default=0, server_default="0")
+    
+    @property
+    def rating_average(self):
+        return round(self.rating_sum / self.rating_count, 2) if self.rating_count else None
+    
+    @property
+    def rating_histogram(self):
+        """Число отзывов с 1..5 звездами."""
+        return [self.stars_1 or 0, self.stars_2 or 0, self.stars_3 or 0, self.stars_4 or 0, self.stars_5 or 0]
+    
+    # GIN-индекс для полнотекстового поиска (только PostgreSQL)
+    __table_args__ = (
+        Index("ix_products_search", search_document(name, description), postgresql_using="gin")
+        .ddl_if(dialect="postgresql"),
+    )
 
 class CartItem(Base):
     __tablename__ = "cart_items"
     
     id = Column(Integer, primary_key=True, index=True)
+    # По user_id ищет uq_cart_items_user_product (user_id - первая колонка)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
     quantity = Column(Integer, default=1)
     
     # Связи
     user = relationship("User", back_populates="cart_items")
     product = relationship("Product")
+    
+    # Один товар - одна строка корзины; на это ограничение опирается upsert в add_to_cart
+    __table_args__ = (
+        UniqueConstraint("user_id", "product_id", name="uq_cart_items_user_product"),
+    )
 
 class Review(Base):
     __tablename__ = "reviews"
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=True, index=True)  # None - отзыв о магазине
     user_name = Column(String, nullable=False)  # Кэшируем имя для отображения
     rating = Column(Integer, nullable=False)  # 1-5
     text = Column(Text, nullable=False)
@@ -56,6 +104,12 @@ class Review(Base):
     
     # Связи
     user = relationship("User", back_populates="reviews")
+    product = relationship("Product")
+    
+    # Под keyset-пагинацию ленты одобренных отзывов (created_at DESC, id DESC)
+    __table_args__ = (
+        Index("ix_reviews_approved_created_id", "is_approved", "created_at", "id"),
+    )
     
 # backend/app/models.py
 # Добавьте после модели Review
@@ -65,7 +119,7 @@ class Order(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    total_amount = Column(Float, nullable=False)
+    total_amount = Column(Kopecks, nullable=False)
     status = Column(String, default="pending")  # pending, confirmed, shipped, delivered, cancelled
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -73,16 +127,61 @@ class Order(Base):
     # Связи
     user = relationship("User")
     items = relationship("OrderItem", back_populates="order")
+    
+    # История заказов пользователя с keyset-пагинацией (created_at DESC, id DESC)
+    __table_args__ = (
+        Index("ix_orders_user_created_id", "user_id", "created_at", "id"),
+    )
 
 class OrderItem(Base):
     __tablename__ = "order_items"
     
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
     quantity = Column(Integer, nullable=False)
-    price = Column(Float, nullable=False)  # Сохраняем цену на момент заказа
+    price = Column(Kopecks, nullable=False)  # Сохраняем цену на момент заказа
     
     # Связи
     order = relationship("Order", back_populates="items")
-    product = relationship("Product")
\ No newline at end of file
+    product = relationship("Product")
+    
+    @property
+    def product_name(self):
+        # Для OrderItemResponse; в списках заказов product загружается заранее (selectinload)
+        return self.product.name if self.product is not None else ""
+
+
+# Сводки для /api/analytics; пополняются app/analytics.py по заказам с id > watermark.
+# Внешних ключей нет намеренно: сводка - история продаж, она переживает удаление товаров.
+class SalesDaily(Base):
+    __tablename__ = "analytics_sales_daily"
+    
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+    category = Column(String, nullable=False)  # категория товара на момент пересчета
+    quantity = Column(BigInteger, nullable=False)
+    revenue = Column(Kopecks, nullable=False)
+    lines = Column(Integer, nullable=False)  # строк заказов
+
+class OrdersDaily(Base):
+    __tablename__ = "analytics_orders_daily"
+    
+    day = Column(Date, primary_key=True)
+    orders = Column(Integer, nullable=False)
+    revenue = Column(Kopecks, nullable=False)
+
+class UserActivityDaily(Base):
+    # Кто за день клал товары в корзину и кто оформлял заказ - для конверсии корзина -> заказ
+    __tablename__ = "analytics_user_activity"
+    
+    day = Column(Date, primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    carted = Column(Boolean, nullable=False, default=False)
+    ordered = Column(Boolean, nullable=False, default=False)
+
+class AnalyticsState(Base):
+    __tablename__ = "analytics_state"
+    
+    name = Column(String, primary_key=True)
+    value = Column(BigInteger, nullable=False)
@@ -0,0 +1,81 @@
+# backend/app/money.py
+"""
+Денежные суммы без float.
+
+В БД - целые копейки (BIGINT, тип Kopecks): сравнения, SUM и умножение на
+количество в SQL точные на любой СУБД, включая SQLite, где NUMERIC хранится
+как REAL. В Python - Decimal в рублях с двумя знаками (89900.00), в API -
+обычное JSON-число (89900.0), так что клиенты ничего не замечают.
+
+    price = Column(Kopecks, nullable=False)         # models.py
+    price: Money                                    # schemas.py
+    total = sum_kopecks((p.price, q) for ...)       # точная сумма строк
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Annotated
+from pydantic import BeforeValidator, PlainSerializer
+from sqlalchemy import BigInteger
+from sqlalchemy.types import TypeDecorator
+
+CENT = Decimal("0.01")
+
+
+def to_decimal(value):
+    """Рубли (Decimal / int / float / строка) -> Decimal с двумя знаками."""
+    if isinstance(value, Decimal):
+        return value.quantize(CENT, ROUND_HALF_UP)
+    if isinstance(value, float):
+        # repr - кратчайшая запись float: 0.1 -> "0.1", а не 0.1000000000000000055...
+        value = repr(value)
+    return Decimal(value).quantize(CENT, ROUND_HALF_UP)
+
+
+def to_kopecks(value):
+    """Рубли -> целые копейки."""
+    return int(to_decimal(value).scaleb(2))
+
+
+def from_kopecks(kopecks):
+    """Целые копейки -> Decimal в рублях."""
+    return Decimal(int(kopecks)).scaleb(-2)
+
+
+def sum_kopecks(lines):
+    """Точная сумма (цена, количество) в копейках: целочисленная, без накопления ошибки."""
+    return sum(to_kopecks(price) * quantity for price, quantity in lines)
+
+
+class Kopecks(TypeDecorator):
+    """Колонка BIGINT с копейками; в Python - Decimal в рублях."""
+
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else to_kopecks(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else from_kopecks(value)
+
+
+def _parse(value):
+    if isinstance(value, bool) or not isinstance(value, (str, int, float, Decimal)):
+        return value  # остальное отклонит валидация Decimal
+    try:
+        # Без округления: 10.005 должно быть ошибкой, а не 10.01
+        amount = Decimal(repr(value) if isinstance(value, float) else value.strip() if isinstance(value, str) else value)
+        exact = amount.is_finite() and amount == amount.quantize(CENT)
+    except ArithmeticError:
+        raise ValueError("некорректная сумма")
+    if not exact:
+        raise ValueError("сумма - конечное число, не больше двух знаков после запятой")
+    return amount.quantize(CENT)
+
+
+# Денежное поле схем: на входе число или строка (не больше 2 знаков после запятой),
+# внутри Decimal, в JSON - число
+Money = Annotated[
+    Decimal,
+    BeforeValidator(_parse),
+    PlainSerializer(float, return_type=float, when_used="json"),
+]
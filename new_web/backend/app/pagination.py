@@ -0,0 +1,65 @@
+# backend/app/pagination.py
+"""
+Keyset (cursor) пагинация.
+
+Курсор - непрозрачная для клиента строка (base64 от JSON с ключом последней
+строки страницы). Следующая страница выбирается условием WHERE по индексу,
+а не OFFSET, поэтому глубокие страницы стоят столько же, сколько первая.
+"""
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(**values):
+    data = {k: v.isoformat() if isinstance(v, datetime) else v for k, v in values.items()}
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Возвращает dict из курсора или None для пустого курсора (первая страница)."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        if "created_at" in data:
+            data["created_at"] = datetime.fromisoformat(data["created_at"])
+        return data
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+
+def check_limit(limit):
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit должен быть от 1 до {MAX_PAGE_SIZE}")
+
+
+def paginate_by_id(stmt, id_column, cursor, limit):
+    """Страница по возрастанию id: WHERE id > :last_id ORDER BY id LIMIT n+1."""
+    data = decode_cursor(cursor)
+    if data is not None:
+        stmt = stmt.where(id_column > data["id"])
+    return stmt.order_by(id_column).limit(limit + 1)
+
+
+def paginate_by_created_desc(stmt, created_column, id_column, cursor, limit):
+    """Страница от новых к старым: WHERE (created_at, id) < (:c, :id) ORDER BY created_at DESC, id DESC."""
+    data = decode_cursor(cursor)
+    if data is not None:
+        stmt = stmt.where(tuple_(created_column, id_column) < tuple_(data["created_at"], data["id"]))
+    return stmt.order_by(created_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def split_page(rows, limit, key):
+    """Отрезает лишнюю (limit+1)-ю строку и строит next_cursor по последней строке страницы."""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(**key(rows[-1]))
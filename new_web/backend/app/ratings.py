@@ -0,0 +1,148 @@
+# backend/app/ratings.py
+"""
+Сводка рейтинга товара (rating_count, rating_sum, stars_1..stars_5 в products).
+
+Поддерживается инкрементально: после каждого flush сессии, в той же
+транзакции, вклад новых, измененных (is_approved, rating, product_id)
+и удаленных отзывов превращается в атомарные UPDATE ... SET x = x + :delta.
+Учитываются только одобренные отзывы. Так работают и sync, и async сессии
+(AsyncSession flush-ит через обычную Session).
+
+Bulk INSERT/UPDATE мимо ORM сводку не трогают - такие расхождения
+исправляет reconcile(), его периодически запускает main.py
+в воркере с фоновыми задачами (RATING_RECONCILE_INTERVAL секунд) или вручную:
+    python -m app.ratings
+"""
+import os
+from collections import defaultdict
+from sqlalchemy import event, select, update, func, case, and_, or_, literal
+from sqlalchemy.orm import Session, attributes
+from . import models
+from .log import get_logger
+
+RATING_RECONCILE_INTERVAL = float(os.getenv("RATING_RECONCILE_INTERVAL", "3600"))  # 0 - не запускать
+
+log = get_logger(__name__)
+STAR_COLUMNS = [models.Product.stars_1, models.Product.stars_2, models.Product.stars_3,
+                models.Product.stars_4, models.Product.stars_5]
+
+
+def _contribution(product_id, rating, approved):
+    """(product_id, rating), если отзыв входит в сводку, иначе None."""
+    # is_approved=None у еще не вставленного отзыва означает default=True
+    if product_id is None or approved is False or rating not in (1, 2, 3, 4, 5):
+        return None
+    return product_id, rating
+
+
+def _old_value(review, key):
+    history = attributes.get_history(review, key)
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else None
+
+
+def _collect(session):
+    deltas = defaultdict(lambda: [0, 0, [0] * 5])  # product_id -> [count, sum, stars]
+
+    def add(contribution, sign):
+        if contribution is not None:
+            product_id, rating = contribution
+            entry = deltas[product_id]
+            entry[0] += sign
+            entry[1] += sign * rating
+            entry[2][rating - 1] += sign
+
+    for obj in session.new:
+        if isinstance(obj, models.Review):
+            add(_contribution(obj.product_id, obj.rating, obj.is_approved), 1)
+    for obj in session.deleted:
+        if isinstance(obj, models.Review):
+            add(_contribution(*(_old_value(obj, k) for k in ("product_id", "rating", "is_approved"))), -1)
+    for obj in session.dirty:
+        if isinstance(obj, models.Review) and session.is_modified(obj, include_collections=False):
+            old = _contribution(*(_old_value(obj, k) for k in ("product_id", "rating", "is_approved")))
+            new = _contribution(obj.product_id, obj.rating, obj.is_approved)
+            if old != new:
+                add(old, -1)
+                add(new, 1)
+    return deltas
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_rating_deltas(session, flush_context):
+    deltas = _collect(session)
+    if not deltas:
+        return
+    connection = session.connection()
+    # Порядок по id - одинаковый порядок блокировок строк у параллельных транзакций
+    for product_id in sorted(deltas):
+        count, total, stars = deltas[product_id]
+        if count == 0 and total == 0 and not any(stars):
+            continue
+        values = {
+            models.Product.rating_count: models.Product.rating_count + count,
+            models.Product.rating_sum: models.Product.rating_sum + total,
+        }
+        for column, delta in zip(STAR_COLUMNS, stars):
+            if delta:
+                values[column] = column + delta
+        connection.execute(
+            update(models.Product).where(models.Product.id == product_id).values(values)
+        )
+
+
+def _actual():
+    """Подзапрос с фактической сводкой одобренных отзывов по товарам."""
+    review = models.Review
+    return (
+        select(
+            review.product_id.label("product_id"),
+            func.count().label("rating_count"),
+            func.sum(review.rating).label("rating_sum"),
+            *[func.sum(case((review.rating == star, 1), else_=0)).label("stars_%d" % star) for star in range(1, 6)],
+        )
+        .where(review.product_id.is_not(None), review.is_approved == True)  # noqa: E712
+        .group_by(review.product_id)
+        .subquery()
+    )
+
+
+def reconcile(db):
+    """Пересчитывает сводку там, где она разошлась с отзывами; возвращает id исправленных товаров."""
+    product = models.Product
+    actual = _actual()
+    columns = ["rating_count", "rating_sum"] + ["stars_%d" % star for star in range(1, 6)]
+    drift = or_(*[
+        getattr(product, name) != func.coalesce(getattr(actual.c, name), literal(0)) for name in columns
+    ])
+    drifted = db.execute(
+        select(product.id).outerjoin(actual, actual.c.product_id == product.id).where(drift).order_by(product.id)
+    ).scalars().all()
+    if not drifted:
+        return []
+
+    review = models.Review
+    approved = and_(review.product_id == product.id, review.is_approved == True)  # noqa: E712
+
+    def recount(*conditions):
+        return select(func.count()).where(approved, *conditions).scalar_subquery()
+
+    values = {
+        "rating_count": recount(),
+        "rating_sum": select(func.coalesce(func.sum(review.rating), 0)).where(approved).scalar_subquery(),
+        **{"stars_%d" % star: recount(review.rating == star) for star in range(1, 6)},
+    }
+    # Пересчет из отзывов в самом UPDATE, а не значениями из SELECT выше:
+    # отзывы, вставленные между двумя запросами, не потеряются
+    db.execute(update(product).where(product.id.in_(drifted)).values(values))
+    db.commit()
+    log.warning("ratings.drift_fixed", products=len(drifted), sample=drifted[:20])
+    return drifted
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+    with SessionLocal() as session:
+        fixed = reconcile(session)
+    print("Исправлено товаров: %d" % len(fixed))
@@ -0,0 +1,140 @@
+# backend/app/routers/analytics.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Literal, Optional
+import asyncio
+import math
+import os
+import time
+from ..database import get_db, get_async_db
+from .. import schemas, analytics, auth
+
+# Выручка и конверсия - данные магазина, не покупателей: все эндпоинты только для ADMIN_EMAILS (auth.py)
+router = APIRouter(prefix="/analytics", tags=["Analytics"], dependencies=[Depends(auth.get_current_admin)])
+# Асинхронные версии тех же эндпоинтов (подключаются при DB_MODE=async)
+async_router = APIRouter(prefix="/analytics", tags=["Analytics"], dependencies=[Depends(auth.get_current_admin_async)])
+
+DEFAULT_DAYS = 30
+MAX_DAYS = 3660
+
+# Ручное пополнение сводок: не чаще раза в ANALYTICS_MANUAL_REFRESH_INTERVAL секунд
+# на воркер и не параллельно с другим ручным (фоновой задаче main.py не мешает:
+# водяной знак не даст посчитать заказы дважды). Остальным - 429 с Retry-After.
+ANALYTICS_MANUAL_REFRESH_INTERVAL = float(os.getenv("ANALYTICS_MANUAL_REFRESH_INTERVAL", "10"))
+_refresh_lock = asyncio.Lock()
+_last_refresh = 0.0
+
+# Отчеты читают только сводки app/analytics.py: данные отстают от заказов
+# не больше чем на ANALYTICS_REFRESH_INTERVAL секунд (см. GET /analytics/status)
+
+def _period(start, end):
+    """Период [start, end] включительно; по умолчанию - последние DEFAULT_DAYS дней (UTC)."""
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=DEFAULT_DAYS - 1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start позже end")
+    if (end - start).days >= MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Период не длиннее {MAX_DAYS} дней")
+    return start, end
+
+async def _manual_refresh():
+    global _last_refresh
+    wait = _last_refresh + ANALYTICS_MANUAL_REFRESH_INTERVAL - time.monotonic()
+    if _refresh_lock.locked() or wait > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Сводки только что обновлялись, повторите позже",
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
+    async with _refresh_lock:
+        try:
+            return await run_in_threadpool(analytics.run_refresh)
+        finally:
+            _last_refresh = time.monotonic()
+
+@router.get("/revenue/daily", response_model=List[schemas.DailyRevenue])
+def revenue_by_day(start: Optional[date] = None, end: Optional[date] = None, db: Session = Depends(get_db)):
+    """Выручка и число заказов по дням."""
+    return analytics.revenue_by_day(db, *_period(start, end))
+
+@router.get("/revenue/categories", response_model=List[schemas.CategoryRevenue])
+def revenue_by_category(start: Optional[date] = None, end: Optional[date] = None, db: Session = Depends(get_db)):
+    """Выручка и продано штук по категориям, по убыванию выручки."""
+    return analytics.revenue_by_category(db, *_period(start, end))
+
+@router.get("/top-products", response_model=List[schemas.TopProduct])
+def top_products(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = Query(10, ge=1, le=100),
+    by: Literal["revenue", "quantity"] = "revenue",
+    db: Session = Depends(get_db)
+):
+    """Топ-N товаров за период по выручке или по числу проданных штук."""
+    return analytics.top_products(db, *_period(start, end), limit=limit, by=by)
+
+@router.get("/average-order-value", response_model=schemas.AverageOrderValue)
+def average_order_value(start: Optional[date] = None, end: Optional[date] = None, db: Session = Depends(get_db)):
+    return analytics.average_order_value(db, *_period(start, end))
+
+@router.get("/conversion", response_model=schemas.CartConversion)
+def cart_conversion(start: Optional[date] = None, end: Optional[date] = None, db: Session = Depends(get_db)):
+    """Конверсия корзина -> заказ: из пользователей, клавших товары в корзину за период, доля оформивших заказ."""
+    return analytics.conversion(db, *_period(start, end))
+
+@router.get("/status")
+def analytics_status(db: Session = Depends(get_db)):
+    """Водяной знак сводок (id последнего учтенного заказа) и состояние снимка в памяти."""
+    return analytics.status(db)
+
+@router.post("/refresh")
+async def refresh_analytics():
+    """Пополнить сводки сейчас, не дожидаясь фоновой задачи."""
+    return await _manual_refresh()
+
+
+# ===== Async версии (DB_MODE=async) =====
+# Отчеты синхронные; run_sync выполняет их на async-соединении запроса
+
+@async_router.get("/revenue/daily", response_model=List[schemas.DailyRevenue])
+async def revenue_by_day_async(start: Optional[date] = None, end: Optional[date] = None, db: AsyncSession = Depends(get_async_db)):
+    """Выручка и число заказов по дням."""
+    return await db.run_sync(analytics.revenue_by_day, *_period(start, end))
+
+@async_router.get("/revenue/categories", response_model=List[schemas.CategoryRevenue])
+async def revenue_by_category_async(start: Optional[date] = None, end: Optional[date] = None, db: AsyncSession = Depends(get_async_db)):
+    """Выручка и продано штук по категориям, по убыванию выручки."""
+    return await db.run_sync(analytics.revenue_by_category, *_period(start, end))
+
+@async_router.get("/top-products", response_model=List[schemas.TopProduct])
+async def top_products_async(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = Query(10, ge=1, le=100),
+    by: Literal["revenue", "quantity"] = "revenue",
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Топ-N товаров за период по выручке или по числу проданных штук."""
+    return await db.run_sync(analytics.top_products, *_period(start, end), limit, by)
+
+@async_router.get("/average-order-value", response_model=schemas.AverageOrderValue)
+async def average_order_value_async(start: Optional[date] = None, end: Optional[date] = None, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(analytics.average_order_value, *_period(start, end))
+
+@async_router.get("/conversion", response_model=schemas.CartConversion)
+async def cart_conversion_async(start: Optional[date] = None, end: Optional[date] = None, db: AsyncSession = Depends(get_async_db)):
+    """Конверсия корзина -> заказ: из пользователей, клавших товары в корзину за период, доля оформивших заказ."""
+    return await db.run_sync(analytics.conversion, *_period(start, end))
+
+@async_router.get("/status")
+async def analytics_status_async(db: AsyncSession = Depends(get_async_db)):
+    """Водяной знак сводок (id последнего учтенного заказа) и состояние снимка в памяти."""
+    return await db.run_sync(analytics.status)
+
+@async_router.post("/refresh")
+async def refresh_analytics_async():
+    """Пополнить сводки сейчас, не дожидаясь фоновой задачи."""
+    return await _manual_refresh()
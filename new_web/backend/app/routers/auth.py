@@ -1,25 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from ..database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_db, get_async_db
 from .. import models, schemas, auth
 
 router = APIRouter(prefix="/auth", tags=["auth"])
+# Асинхронные версии тех же эндпоинтов (подключаются при DB_MODE=async)
+async_router = APIRouter(prefix="/auth", tags=["auth"])
 
+# async def: ожидание bcrypt не занимает поток Starlette, БД - в потоке, соединение
+# отпускается до хэширования (см. auth.find_credentials)
 @router.post("/register", response_model=schemas.UserResponse)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(models.User).filter(models.User.email == user.email).first()
-    if existing:
+async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    if await run_in_threadpool(auth.find_credentials, db, user.email):
+        raise HTTPException(status_code=400, detail="User already exists")
+    hashed = await auth.get_password_hash_async(user.password)
+    db_user = await run_in_threadpool(auth.create_user, db, user.email, hashed, user.full_name)
+    if db_user is None:
         raise HTTPException(status_code=400, detail="User already exists")
-    hashed = auth.get_password_hash(user.password)
-    db_user = models.User(email=user.email, hashed_password=hashed, full_name=user.full_name)
-    db.add(db_user); db.commit(); db.refresh(db_user)
     return db_user
 
 # В router/auth.py убедитесь, что возвращается правильная структура
 @router.post("/login")
-def login(data: schemas.UserLogin, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == data.email).first()
-    if not user or not auth.verify_password(data.password, user.hashed_password):
+async def login(data: schemas.UserLogin, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(auth.find_credentials, db, data.email)
+    if not user or not await auth.verify_password_async(data.password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     
     token = auth.create_access_token({"sub": user.email})
@@ -36,4 +42,38 @@ def login(data: schemas.UserLogin, db: Session = Depends(get_db)):
     
 @router.get("/me", response_model=schemas.UserResponse)
 def get_current_user_info(current_user: models.User = Depends(auth.get_current_user)):
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+# ---------- Асинхронный режим (DB_MODE=async) ----------
+
+@async_router.post("/register", response_model=schemas.UserResponse)
+async def register_async(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if await auth.find_credentials_async(db, user.email):
+        raise HTTPException(status_code=400, detail="User already exists")
+    hashed = await auth.get_password_hash_async(user.password)
+    db_user = await auth.create_user_async(db, user.email, hashed, user.full_name)
+    if db_user is None:
+        raise HTTPException(status_code=400, detail="User already exists")
+    return db_user
+
+@async_router.post("/login")
+async def login_async(data: schemas.UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = await auth.find_credentials_async(db, data.email)
+    if not user or not await auth.verify_password_async(data.password, user.hashed_password):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    
+    token = auth.create_access_token({"sub": user.email})
+    
+    return {
+        "access_token": token, 
+        "token_type": "bearer", 
+        "user": {
+            "email": user.email, 
+            "name": user.full_name
+        }
+    }
+
+@async_router.get("/me", response_model=schemas.UserResponse)
+async def get_current_user_info_async(current_user: models.User = Depends(auth.get_current_user_async)):
+    return current_user
@@ -1,49 +1,190 @@
 # backend/app/routers/cart.py
 from fastapi import APIRouter, Depends, HTTPException, Header
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, update, func, type_coerce
+from sqlalchemy.dialects import postgresql, sqlite
 from typing import List
-from ..database import get_db
-from .. import models, schemas, auth
-import logging
+import os
+from ..database import get_db, get_async_db
+from ..cache import TTLCache
+from .. import models, schemas, auth, analytics
+from ..log import get_logger
+from ..money import Kopecks
+from .products import invalidate_catalog
 from typing import List, Optional
 
-logger = logging.getLogger(__name__)
+# Токены и payload не логируем; детали по каждому запросу - на уровне debug
+log = get_logger(__name__)
 router = APIRouter()
+# Асинхронные версии тех же эндпоинтов (подключаются при DB_MODE=async)
+async_router = APIRouter()
+
+# Итоги корзины по user_id (бейдж корзины в шапке на каждой странице): user_id -> (cart_version, итоги).
+# Кэш у каждого воркера свой, поэтому запись отдается, только если users.cart_version
+# не изменился: любое изменение корзины в любом воркере увеличивает версию в своей
+# транзакции. Проверка - один запрос по первичному ключу вместо агрегата по корзине.
+# Смену цен товаров TTL ограничивает сверху.
+summary_cache = TTLCache(
+    maxsize=int(os.getenv("CART_SUMMARY_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("CART_SUMMARY_CACHE_TTL", "60")),
+)
+
+def _cart_version_query(user_id):
+    return select(models.User.cart_version).where(models.User.id == user_id)
+
+def _touch_cart_stmt(user_id):
+    # Выполняется в той же транзакции, что и изменение корзины
+    return (
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(cart_version=models.User.cart_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+def _cached_summary(user_id, version):
+    entry = summary_cache.get(user_id)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    return None
+
+def _summary_query(user_id):
+    # Один агрегирующий запрос; JOIN отбрасывает позиции без товара, как и GET /cart
+    return (
+        select(
+            func.count(models.CartItem.id),
+            func.coalesce(func.sum(models.CartItem.quantity), 0),
+            # Цены - целые копейки: SUM(quantity * price) в SQL точный, Kopecks вернет Decimal в рублях
+            type_coerce(func.coalesce(func.sum(models.CartItem.quantity * models.Product.price), 0), Kopecks),
+        )
+        .join(models.CartItem.product)
+        .where(models.CartItem.user_id == user_id)
+    )
+
+# INSERT ... ON CONFLICT (user_id, product_id) DO UPDATE: одна атомарная операция
+# вместо SELECT + UPDATE в Python, параллельные добавления не теряют количество
+_UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+def _upsert_stmt(dialect_name, rows, increment=True):
+    """rows - список {user_id, product_id, quantity}; increment=False задает количество, а не прибавляет."""
+    stmt = _UPSERT_DIALECTS[dialect_name](models.CartItem).values(rows)
+    quantity = models.CartItem.quantity + stmt.excluded.quantity if increment else stmt.excluded.quantity
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.CartItem.user_id, models.CartItem.product_id],
+        set_={"quantity": quantity},
+    )
+    return stmt.returning(models.CartItem.id, models.CartItem.quantity)
+
+MAX_BATCH_SIZE = int(os.getenv("CART_MAX_BATCH_SIZE", "500"))
+
+def _plan_batch(operations):
+    """
+    Сворачивает операции по товарам в итоговое действие с сохранением порядка:
+    add копит прибавку, set/remove задают количество (следующие add прибавляются к нему).
+    Возвращает (прибавить {product_id: n}, установить {product_id: n}, удалить {product_id}).
+    """
+    if len(operations) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Не больше {MAX_BATCH_SIZE} операций за раз")
+    plan = {}  # product_id -> ("add" | "set", n)
+    for operation in operations:
+        if operation.op == "add" and operation.quantity <= 0:
+            raise HTTPException(status_code=400, detail="Количество для add должно быть больше нуля")
+        if operation.op == "set" and operation.quantity < 0:
+            raise HTTPException(status_code=400, detail="Количество не может быть отрицательным")
+        kind, n = plan.get(operation.product_id, ("add", 0))
+        if operation.op == "add":
+            plan[operation.product_id] = (kind, n + operation.quantity)
+        else:
+            plan[operation.product_id] = ("set", operation.quantity if operation.op == "set" else 0)
+    adds = {pid: n for pid, (kind, n) in plan.items() if kind == "add"}
+    sets = {pid: n for pid, (kind, n) in plan.items() if kind == "set" and n > 0}
+    removes = {pid for pid, (kind, n) in plan.items() if kind == "set" and n == 0}
+    return adds, sets, removes
+
+def _existing_products_query(product_ids):
+    return select(models.Product.id).where(models.Product.id.in_(product_ids))
+
+def _check_products(product_ids, found):
+    missing = sorted(set(product_ids) - set(found))
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Товары не найдены: {missing}")
+
+def _batch_statements(dialect_name, user_id, adds, sets, removes, replace=False):
+    """Не больше трех statement-ов на весь пакет, независимо от его размера."""
+    statements = []
+    if replace:
+        keep = set(adds) | set(sets)
+        stmt = delete(models.CartItem).where(models.CartItem.user_id == user_id)
+        if keep:
+            stmt = stmt.where(models.CartItem.product_id.not_in(keep))
+        statements.append(stmt)
+    elif removes:
+        statements.append(delete(models.CartItem).where(
+            models.CartItem.user_id == user_id, models.CartItem.product_id.in_(removes)
+        ))
+    for quantities, increment in ((adds, True), (sets, False)):
+        if quantities:
+            rows = [{"user_id": user_id, "product_id": pid, "quantity": n} for pid, n in sorted(quantities.items())]
+            statements.append(_upsert_stmt(dialect_name, rows, increment))
+    return statements
+
+def _activity_statements(db, user_id, plan=None):
+    # Отметка для конверсии корзина -> заказ (/api/analytics/conversion); remove не считается
+    if plan is not None and not (plan[0] or plan[1]):
+        return []
+    stmt = analytics.cart_activity_stmt(db, user_id)
+    return [stmt] if stmt is not None else []
+
+def _cart_query(user_id):
+    return (
+        select(models.CartItem)
+        .join(models.CartItem.product)
+        .options(contains_eager(models.CartItem.product))
+        .where(models.CartItem.user_id == user_id)
+        .order_by(models.CartItem.id)
+    )
+
+def _replace_plan(items):
+    if any(item.quantity < 0 for item in items):
+        raise HTTPException(status_code=400, detail="Количество не может быть отрицательным")
+    operations = [schemas.CartOperation(op="set", product_id=i.product_id, quantity=i.quantity) for i in items]
+    return _plan_batch(operations)
+
+def _to_cart_item(row, product):
+    item_id, quantity = row
+    return schemas.CartItemResponse(
+        id=item_id, quantity=quantity, product=schemas.ProductResponse.model_validate(product)
+    )
+
+def _to_summary(row):
+    positions, quantity, total = row
+    return schemas.CartSummary(positions=positions, quantity=quantity, total=total)
 
 def get_current_user(token: Optional[str] = None, authorization: Optional[str] = Header(None), db: Session = Depends(get_db)):
-    logger.info(f"🔐 Получен token: {token}")
-    logger.info(f"🔐 Получен authorization header: {authorization}")
-    
     # Пробуем получить токен из разных источников
     actual_token = None
     
     if token:
         # Токен из query параметра
         actual_token = token
-        logger.info("🔐 Используем токен из query параметра")
     elif authorization and authorization.startswith("Bearer "):
         # Токен из заголовка Authorization
         actual_token = authorization[7:]
-        logger.info("🔐 Используем токен из заголовка Authorization")
     else:
-        logger.error("❌ Токен не предоставлен")
+        log.info("cart.auth.no_token")
         raise HTTPException(status_code=401, detail="Токен не предоставлен")
     
     try:
         # Верифицируем токен
         payload = auth.verify_token(actual_token)
-        logger.info(f"🔐 Декодированный payload: {payload}")
         
         email = payload.get("sub")
         if not email:
-            logger.error("❌ В токене отсутствует email (sub)")
+            log.warning("cart.auth.no_subject")
             raise HTTPException(status_code=401, detail="Invalid token")
         
-        logger.info(f"🔐 Извлечен email: {email}")
-        
-        user = db.query(models.User).filter(models.User.email == email).first()
+        user = auth.load_principal(db, email)
         if not user:
-            logger.error(f"❌ Пользователь с email {email} не найден")
             # Создаем временного пользователя для тестирования
             user = models.User(
                 email=email,
@@ -53,25 +194,38 @@ def get_current_user(token: Optional[str] = None, authorization: Optional[str] =
             db.add(user)
             db.commit()
             db.refresh(user)
-            logger.info(f"🔐 Создан временный пользователь: {user.email}")
+            user = auth.remember_principal(user)
+            log.info("cart.auth.temp_user_created", user_id=user.id)
         
-        logger.info(f"🔐 Найден пользователь: {user.email}")
+        log.debug("cart.auth.ok", user_id=user.id)
         return user
         
     except Exception as e:
-        logger.error(f"❌ Ошибка аутентификации: {e}")
+        log.warning("cart.auth.failed", error=e)
         raise HTTPException(status_code=401, detail=f"Ошибка аутентификации: {str(e)}")
 
+@router.get("/cart/summary", response_model=schemas.CartSummary)
+def get_cart_summary(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Число позиций, товаров и сумма корзины без выдачи самих позиций."""
+    # Версия читается до агрегата: итоги не старее версии, под которой их сохраним
+    version = db.execute(_cart_version_query(current_user.id)).scalar()
+    summary = _cached_summary(current_user.id, version)
+    if summary is None:
+        summary = _to_summary(db.execute(_summary_query(current_user.id)).one())
+        summary_cache.set(current_user.id, (version, summary))
+    return summary
+
 @router.get("/cart", response_model=List[schemas.CartItemResponse])
 def get_cart_items(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    logger.info(f"🛒 Получение корзины для пользователя: {current_user.email}")
-    
-    # Используем join чтобы загрузить связанные товары и отфильтровать невалидные
-    cart_items = db.query(models.CartItem).join(models.Product).filter(
+    # Используем join чтобы загрузить связанные товары и отфильтровать невалидные;
+    # contains_eager заполняет item.product из того же JOIN (без запроса на каждую позицию)
+    cart_items = db.query(models.CartItem).join(models.CartItem.product).options(
+        contains_eager(models.CartItem.product)
+    ).filter(
         models.CartItem.user_id == current_user.id
     ).all()
     
-    logger.info(f"🛒 Найдено элементов в корзине: {len(cart_items)}")
+    log.debug("cart.listed", user_id=current_user.id, items=len(cart_items))
     return cart_items
 
 @router.post("/cart", response_model=schemas.CartItemResponse)
@@ -80,13 +234,9 @@ def add_to_cart(
     current_user: models.User = Depends(get_current_user), 
     db: Session = Depends(get_db)
 ):
-    logger.info(f"🛒 Добавление в корзину: product_id={cart_item.product_id}, quantity={cart_item.quantity}")
-    logger.info(f"🛒 Пользователь: {current_user.email}")
-    
     # ВРЕМЕННО: Создаем товар если его нет (для тестирования)
     product = db.query(models.Product).filter(models.Product.id == cart_item.product_id).first()
     if not product:
-        logger.info(f"🛒 Товар с ID {cart_item.product_id} не найден, создаем временный")
         product = models.Product(
             id=cart_item.product_id,
             name=f"Товар {cart_item.product_id}",
@@ -97,35 +247,57 @@ def add_to_cart(
         db.add(product)
         db.commit()
         db.refresh(product)
-        logger.info(f"🛒 Создан временный товар: {product.name}")
+        invalidate_catalog()
+        log.info("cart.temp_product_created", product_id=product.id)
     
-    logger.info(f"🛒 Найден товар: {product.name}")
-    
-    # Проверяем, есть ли уже этот товар в корзине
-    existing_item = db.query(models.CartItem).filter(
-        models.CartItem.user_id == current_user.id,
-        models.CartItem.product_id == cart_item.product_id
-    ).first()
-    
-    if existing_item:
-        # Обновляем количество
-        existing_item.quantity += cart_item.quantity
-        db.commit()
-        db.refresh(existing_item)
-        logger.info(f"🛒 Обновлен существующий элемент: id={existing_item.id}, quantity={existing_item.quantity}")
-        return existing_item
-    else:
-        # Создаем новую запись
-        db_cart_item = models.CartItem(
-            user_id=current_user.id,
-            product_id=cart_item.product_id,
-            quantity=cart_item.quantity
-        )
-        db.add(db_cart_item)
-        db.commit()
-        db.refresh(db_cart_item)
-        logger.info(f"🛒 Создан новый элемент корзины: id={db_cart_item.id}")
-        return db_cart_item
+    row = db.execute(_upsert_stmt(db.bind.dialect.name, [
+        {"user_id": current_user.id, "product_id": cart_item.product_id, "quantity": cart_item.quantity}
+    ])).one()
+    response = _to_cart_item(row, product)  # до commit: после него product был бы expired
+    for stmt in _activity_statements(db, current_user.id):
+        db.execute(stmt)
+    db.execute(_touch_cart_stmt(current_user.id))
+    db.commit()
+    summary_cache.pop(current_user.id)
+    log.debug("cart.item_added", user_id=current_user.id, item_id=response.id, quantity=response.quantity)
+    return response
+
+def _run_batch(db, user_id, plan, replace=False):
+    adds, sets, removes = plan
+    product_ids = list(adds) + list(sets)
+    if product_ids:
+        _check_products(product_ids, db.execute(_existing_products_query(product_ids)).scalars().all())
+    for stmt in _batch_statements(db.bind.dialect.name, user_id, adds, sets, removes, replace):
+        db.execute(stmt)
+    for stmt in _activity_statements(db, user_id, plan):
+        db.execute(stmt)
+    db.execute(_touch_cart_stmt(user_id))
+    db.commit()
+    summary_cache.pop(user_id)
+    return db.execute(_cart_query(user_id)).scalars().all()
+
+# /cart/batch объявлены до /cart/{item_id}, иначе "batch" попадет в item_id
+@router.post("/cart/batch", response_model=List[schemas.CartItemResponse])
+def apply_cart_batch(batch: schemas.CartBatch, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """
+    Пакет операций add/set/remove одной транзакцией; возвращает корзину целиком.
+    set с quantity=0 и remove удаляют позицию.
+    """
+    return _run_batch(db, current_user.id, _plan_batch(batch.operations))
+
+@router.put("/cart/batch", response_model=List[schemas.CartItemResponse])
+def replace_cart(cart: schemas.CartReplace, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Заменяет корзину переданным списком (перенос гостевой корзины после входа)."""
+    return _run_batch(db, current_user.id, _replace_plan(cart.items), replace=True)
+
+# Объявлен до /cart/{item_id}, иначе "clear" попадет в item_id (422)
+@router.delete("/cart/clear")
+def clear_cart(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    db.query(models.CartItem).filter(models.CartItem.user_id == current_user.id).delete()
+    db.execute(_touch_cart_stmt(current_user.id))
+    db.commit()
+    summary_cache.pop(current_user.id)
+    return {"message": "Корзина очищена"}
 
 @router.put("/cart/{item_id}", response_model=schemas.CartItemResponse)
 def update_cart_item(item_id: int, quantity: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -139,11 +311,15 @@ def update_cart_item(item_id: int, quantity: int, current_user: models.User = De
     
     if quantity <= 0:
         db.delete(cart_item)
+        db.execute(_touch_cart_stmt(current_user.id))
         db.commit()
+        summary_cache.pop(current_user.id)
         raise HTTPException(status_code=200, detail="Элемент удален из корзины")
     
     cart_item.quantity = quantity
+    db.execute(_touch_cart_stmt(current_user.id))
     db.commit()
+    summary_cache.pop(current_user.id)
     db.refresh(cart_item)
     return cart_item
 
@@ -158,11 +334,177 @@ def remove_from_cart(item_id: int, current_user: models.User = Depends(get_curre
         raise HTTPException(status_code=404, detail="Элемент корзины не найден")
     
     db.delete(cart_item)
+    db.execute(_touch_cart_stmt(current_user.id))
     db.commit()
+    summary_cache.pop(current_user.id)
     return {"message": "Товар удален из корзины"}
 
-@router.delete("/cart/clear")
-def clear_cart(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    db.query(models.CartItem).filter(models.CartItem.user_id == current_user.id).delete()
-    db.commit()
-    return {"message": "Корзина очищена"}
\ No newline at end of file
+
+# ---------- Асинхронный режим (DB_MODE=async) ----------
+
+async def get_current_user_async(token: Optional[str] = None, authorization: Optional[str] = Header(None), db: AsyncSession = Depends(get_async_db)):
+    if token:
+        actual_token = token
+    elif authorization and authorization.startswith("Bearer "):
+        actual_token = authorization[7:]
+    else:
+        log.info("cart.auth.no_token")
+        raise HTTPException(status_code=401, detail="Токен не предоставлен")
+    
+    try:
+        payload = auth.verify_token(actual_token)
+        email = payload.get("sub")
+        if not email:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        
+        user = await auth.load_principal_async(db, email)
+        if not user:
+            # Создаем временного пользователя для тестирования (как в синхронной версии)
+            user = models.User(
+                email=email,
+                hashed_password="temp",
+                full_name="Temp User"
+            )
+            db.add(user)
+            await db.commit()
+            await db.refresh(user)
+            user = auth.remember_principal(user)
+            log.info("cart.auth.temp_user_created", user_id=user.id)
+        
+        log.debug("cart.auth.ok", user_id=user.id)
+        return user
+        
+    except Exception as e:
+        log.warning("cart.auth.failed", error=e)
+        raise HTTPException(status_code=401, detail=f"Ошибка аутентификации: {str(e)}")
+
+@async_router.get("/cart/summary", response_model=schemas.CartSummary)
+async def get_cart_summary_async(current_user: models.User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    version = (await db.execute(_cart_version_query(current_user.id))).scalar()
+    summary = _cached_summary(current_user.id, version)
+    if summary is None:
+        summary = _to_summary((await db.execute(_summary_query(current_user.id))).one())
+        summary_cache.set(current_user.id, (version, summary))
+    return summary
+
+@async_router.get("/cart", response_model=List[schemas.CartItemResponse])
+async def get_cart_items_async(current_user: models.User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    # contains_eager: товар приходит тем же JOIN, ленивой загрузки в async быть не должно
+    result = await db.execute(
+        select(models.CartItem)
+        .join(models.CartItem.product)
+        .options(contains_eager(models.CartItem.product))
+        .where(models.CartItem.user_id == current_user.id)
+    )
+    return result.scalars().all()
+
+@async_router.post("/cart", response_model=schemas.CartItemResponse)
+async def add_to_cart_async(
+    cart_item: schemas.CartItemCreate, 
+    current_user: models.User = Depends(get_current_user_async), 
+    db: AsyncSession = Depends(get_async_db)
+):
+    # ВРЕМЕННО: Создаем товар если его нет (для тестирования)
+    product = await db.get(models.Product, cart_item.product_id)
+    if not product:
+        product = models.Product(
+            id=cart_item.product_id,
+            name=f"Товар {cart_item.product_id}",
+            price=10000.0,
+            category="sofa",
+            description="Временный товар для тестирования"
+        )
+        db.add(product)
+        await db.commit()
+        await db.refresh(product)  # created_at и сводка рейтинга - серверные значения
+        invalidate_catalog()
+        log.info("cart.temp_product_created", product_id=product.id)
+    
+    stmt = _upsert_stmt(db.bind.dialect.name, [
+        {"user_id": current_user.id, "product_id": cart_item.product_id, "quantity": cart_item.quantity}
+    ])
+    response = _to_cart_item((await db.execute(stmt)).one(), product)
+    for stmt in _activity_statements(db, current_user.id):
+        await db.execute(stmt)
+    await db.execute(_touch_cart_stmt(current_user.id))
+    await db.commit()
+    summary_cache.pop(current_user.id)
+    log.debug("cart.item_added", user_id=current_user.id, item_id=response.id, quantity=response.quantity)
+    return response
+
+async def _run_batch_async(db, user_id, plan, replace=False):
+    adds, sets, removes = plan
+    product_ids = list(adds) + list(sets)
+    if product_ids:
+        found = (await db.execute(_existing_products_query(product_ids))).scalars().all()
+        _check_products(product_ids, found)
+    for stmt in _batch_statements(db.bind.dialect.name, user_id, adds, sets, removes, replace):
+        await db.execute(stmt)
+    for stmt in _activity_statements(db, user_id, plan):
+        await db.execute(stmt)
+    await db.execute(_touch_cart_stmt(user_id))
+    await db.commit()
+    summary_cache.pop(user_id)
+    return (await db.execute(_cart_query(user_id))).scalars().all()
+
+@async_router.post("/cart/batch", response_model=List[schemas.CartItemResponse])
+async def apply_cart_batch_async(batch: schemas.CartBatch, current_user: models.User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    return await _run_batch_async(db, current_user.id, _plan_batch(batch.operations))
+
+@async_router.put("/cart/batch", response_model=List[schemas.CartItemResponse])
+async def replace_cart_async(cart: schemas.CartReplace, current_user: models.User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    return await _run_batch_async(db, current_user.id, _replace_plan(cart.items), replace=True)
+
+@async_router.delete("/cart/clear")
+async def clear_cart_async(current_user: models.User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    await db.execute(delete(models.CartItem).where(models.CartItem.user_id == current_user.id))
+    await db.execute(_touch_cart_stmt(current_user.id))
+    await db.commit()
+    summary_cache.pop(current_user.id)
+    return {"message": "Корзина очищена"}
+
+@async_router.put("/cart/{item_id}", response_model=schemas.CartItemResponse)
+async def update_cart_item_async(item_id: int, quantity: int, current_user: models.User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(
+        select(models.CartItem).where(
+            models.CartItem.id == item_id,
+            models.CartItem.user_id == current_user.id
+        )
+    )
+    cart_item = result.scalars().first()
+    
+    if not cart_item:
+        raise HTTPException(status_code=404, detail="Элемент корзины не найден")
+    
+    if quantity <= 0:
+        await db.delete(cart_item)
+        await db.execute(_touch_cart_stmt(current_user.id))
+        await db.commit()
+        summary_cache.pop(current_user.id)
+        raise HTTPException(status_code=200, detail="Элемент удален из корзины")
+    
+    cart_item.quantity = quantity
+    await db.execute(_touch_cart_stmt(current_user.id))
+    await db.commit()
+    summary_cache.pop(current_user.id)
+    await db.refresh(cart_item, ["product"])
+    return cart_item
+
+@async_router.delete("/cart/{item_id}")
+async def remove_from_cart_async(item_id: int, current_user: models.User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(
+        select(models.CartItem).where(
+            models.CartItem.id == item_id,
+            models.CartItem.user_id == current_user.id
+        )
+    )
+    cart_item = result.scalars().first()
+    
+    if not cart_item:
+        raise HTTPException(status_code=404, detail="Элемент корзины не найден")
+    
+    await db.delete(cart_item)
+    await db.execute(_touch_cart_stmt(current_user.id))
+    await db.commit()
+    summary_cache.pop(current_user.id)
+    return {"message": "Товар удален из корзины"}
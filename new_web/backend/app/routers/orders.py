@@ -1,26 +1,57 @@
 # backend/app/routers/orders.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from ..database import get_db
-from .. import models, schemas, auth
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert
+from typing import List, Optional, Union
+from ..database import get_db, get_async_db, get_read_db, get_read_async_db, read_sessionmaker
+from ..pagination import paginate_by_created_desc, split_page, check_limit
+from .. import models, schemas, auth, streaming, money
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
+# Асинхронные версии тех же эндпоинтов (подключаются при DB_MODE=async)
+async_router = APIRouter(prefix="/orders", tags=["Orders"])
 
-# backend/app/routers/orders.py - обновите create_order
-@router.post("/", response_model=schemas.OrderResponse)
-def create_order(
-    order_data: schemas.OrderCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
-):
-    # Рассчитываем общую сумму и создаем элементы заказа
-    total_amount = 0
-    order_items = []
+# Позиции заказов и их товары (для product_name) грузим отдельными SELECT ... IN
+# на всю выборку, а не ленивым запросом на каждый заказ/позицию (N+1).
+# Итого любой список заказов - 3 запроса независимо от числа позиций.
+ORDER_ITEMS_LOADER = selectinload(models.Order.items).selectinload(models.OrderItem.product)
+
+def _order_with_items():
+    return select(models.Order).options(ORDER_ITEMS_LOADER)
+
+def _page_query(stmt, cursor, limit):
+    return paginate_by_created_desc(stmt, models.Order.created_at, models.Order.id, cursor, limit)
+
+def _stream_query(user_id):
+    return (
+        _order_with_items()
+        .where(models.Order.user_id == user_id)
+        .order_by(models.Order.created_at.desc(), models.Order.id.desc())
+    )
+
+def _to_page(rows, limit):
+    items, next_cursor = split_page(rows, limit, lambda o: {"created_at": o.created_at, "id": o.id})
+    return schemas.OrderPage(items=items, next_cursor=next_cursor)
+
+def _locked_products_query(order_data):
+    # Все товары заказа одним SELECT ... WHERE id IN (...) FOR UPDATE;
+    # блокировка строк держится до commit, порядок по id - чтобы не ловить дедлоки
+    product_ids = {item.product_id for item in order_data.items}
+    return (
+        select(models.Product)
+        .where(models.Product.id.in_(product_ids))
+        .order_by(models.Product.id)
+        .with_for_update()
+    )
+
+def _build_order_lines(order_data, products):
+    """Проверяет наличие товаров и считает сумму; возвращает (total_amount, строки для bulk insert)."""
+    products_by_id = {p.id: p for p in products}
+    lines = []
     
     for item in order_data.items:
-        # Получаем продукт из базы
-        product = db.query(models.Product).filter(models.Product.id == item.product_id).first()
+        product = products_by_id.get(item.product_id)
         if not product:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -34,47 +65,74 @@ def create_order(
             )
         
         # Используем цену из базы данных, а не из запроса
-        item_price = item.price if item.price is not None else product.price
-        item_total = item_price * item.quantity
-        total_amount += item_total
-        
-        # Создаем OrderItem
-        order_item = models.OrderItem(
-            product_id=item.product_id,
-            quantity=item.quantity,
-            price=item_price  # Используем вычисленную цену
-        )
-        order_items.append(order_item)
+        lines.append({
+            "product_id": item.product_id,
+            "quantity": item.quantity,
+            "price": product.price
+        })
+    
+    # Сумма в целых копейках - точно равна сумме строк, как бы много их ни было
+    total_amount = money.from_kopecks(money.sum_kopecks((line["price"], line["quantity"]) for line in lines))
+    return total_amount, lines
+
+@router.post("/", response_model=schemas.OrderResponse)
+def create_order(
+    order_data: schemas.OrderCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    # Одна транзакция: товары одним запросом с блокировкой, заказ, позиции одним bulk insert
+    products = db.execute(_locked_products_query(order_data)).scalars().all()
+    total_amount, lines = _build_order_lines(order_data, products)
     
-    # Создаем заказ
     order = models.Order(
         user_id=current_user.id,
         total_amount=total_amount,
-        status="pending",
-        items=order_items
+        status="pending"
     )
-    
     db.add(order)
+    db.flush()  # нужен order.id для позиций
+    
+    if lines:
+        db.execute(insert(models.OrderItem), [dict(line, order_id=order.id) for line in lines])
     db.commit()
-    db.refresh(order)
     
-    return order
+    # Перечитываем заказ вместе с позициями и товарами одним заходом
+    return db.query(models.Order).options(ORDER_ITEMS_LOADER).populate_existing().filter(
+        models.Order.id == order.id
+    ).first()
 
-@router.get("/", response_model=List[schemas.OrderResponse])
+@router.get("/", response_model=Union[schemas.OrderPage, List[schemas.OrderResponse]])
 def get_user_orders(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+    stream: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(auth.get_current_reader)
 ):
-    orders = db.query(models.Order).filter(models.Order.user_id == current_user.id).order_by(models.Order.created_at.desc()).all()
+    """
+    Без cursor - все заказы, как раньше. С cursor (пустой ?cursor= для первой страницы) - страница {items, next_cursor}.
+    С stream=ndjson|json - все заказы потоком; позиции догружаются selectin-запросом на каждую пачку.
+    """
+    fmt = streaming.stream_format(request, stream)
+    if fmt is not None:
+        return streaming.respond(streaming.iter_rows(_stream_query(current_user.id), schemas.OrderResponse, fmt, read_sessionmaker(request)), fmt)
+    if cursor is not None:
+        check_limit(limit)
+        stmt = _order_with_items().where(models.Order.user_id == current_user.id)
+        return _to_page(db.execute(_page_query(stmt, cursor, limit)).scalars().all(), limit)
+    
+    orders = db.query(models.Order).options(ORDER_ITEMS_LOADER).filter(models.Order.user_id == current_user.id).order_by(models.Order.created_at.desc()).all()
     return orders
 
 @router.get("/{order_id}", response_model=schemas.OrderResponse)
 def get_order(
     order_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(auth.get_current_reader)
 ):
-    order = db.query(models.Order).filter(
+    order = db.query(models.Order).options(ORDER_ITEMS_LOADER).filter(
         models.Order.id == order_id,
         models.Order.user_id == current_user.id
     ).first()
@@ -85,4 +143,83 @@ def get_order(
             detail="Order not found"
         )
     
-    return order
\ No newline at end of file
+    return order
+
+
+# ---------- Асинхронный режим (DB_MODE=async) ----------
+
+@async_router.post("/", response_model=schemas.OrderResponse)
+async def create_order_async(
+    order_data: schemas.OrderCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(auth.get_current_user_async)
+):
+    products = (await db.execute(_locked_products_query(order_data))).scalars().all()
+    total_amount, lines = _build_order_lines(order_data, products)
+    
+    order = models.Order(
+        user_id=current_user.id,
+        total_amount=total_amount,
+        status="pending"
+    )
+    db.add(order)
+    await db.flush()
+    
+    if lines:
+        await db.execute(insert(models.OrderItem), [dict(line, order_id=order.id) for line in lines])
+    await db.commit()
+    
+    # populate_existing перечитывает created_at и товары позиций уже в этой сессии
+    result = await db.execute(
+        _order_with_items()
+        .where(models.Order.id == order.id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+@async_router.get("/", response_model=Union[schemas.OrderPage, List[schemas.OrderResponse]])
+async def get_user_orders_async(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+    stream: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_async_db),
+    current_user: models.User = Depends(auth.get_current_reader_async)
+):
+    fmt = streaming.stream_format(request, stream)
+    if fmt is not None:
+        return streaming.respond(streaming.iter_rows_async(_stream_query(current_user.id), schemas.OrderResponse, fmt, read_sessionmaker(request)), fmt)
+    if cursor is not None:
+        check_limit(limit)
+        stmt = _order_with_items().where(models.Order.user_id == current_user.id)
+        result = await db.execute(_page_query(stmt, cursor, limit))
+        return _to_page(result.scalars().all(), limit)
+    
+    result = await db.execute(
+        _order_with_items()
+        .where(models.Order.user_id == current_user.id)
+        .order_by(models.Order.created_at.desc())
+    )
+    return result.scalars().all()
+
+@async_router.get("/{order_id}", response_model=schemas.OrderResponse)
+async def get_order_async(
+    order_id: int,
+    db: AsyncSession = Depends(get_read_async_db),
+    current_user: models.User = Depends(auth.get_current_reader_async)
+):
+    result = await db.execute(
+        _order_with_items().where(
+            models.Order.id == order_id,
+            models.Order.user_id == current_user.id
+        )
+    )
+    order = result.scalars().first()
+    
+    if not order:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order not found"
+        )
+    
+    return order
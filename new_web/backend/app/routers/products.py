@@ -1,24 +1,272 @@
 # backend/app/routers/products.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from typing import List
-from ..database import get_db
-from .. import models, schemas
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text, select, func
+from typing import List, Optional, Union
+import io
+import os
+import tempfile
+from ..database import get_db, get_async_db, get_read_db, get_read_async_db, read_sessionmaker, engine
+from ..stickiness import cached
+from ..cache import TTLCache
+from ..pagination import paginate_by_id, split_page, check_limit
+from .. import auth, models, schemas, search, http_cache, catalog_io, streaming
 
 router = APIRouter()
+# Асинхронные версии тех же эндпоинтов (подключаются при DB_MODE=async)
+async_router = APIRouter()
 
-@router.get("/products", response_model=List[schemas.ProductResponse])
-def get_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    products = db.query(models.Product).offset(skip).limit(limit).all()
-    return products
+# Кэш каталога в памяти процесса: каталог меняется редко, а читается чаще всего.
+# Ключи: ("list", skip, limit), ("item", id), ("category", category), ("search", ...).
+# Любое изменение товаров сбрасывает кэш целиком и увеличивает catalog_version
+# (по версии перестраивается поисковый индекс в памяти).
+catalog_cache = TTLCache(
+    maxsize=int(os.getenv("CATALOG_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("CATALOG_CACHE_TTL", "60")),
+)
+catalog_version = 0
+# Сколько браузер/CDN может не перепроверять каталог; дальше - условный GET с ETag
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "60"))
+
+def invalidate_catalog():
+    global catalog_version
+    catalog_version += 1
+    catalog_cache.clear()
+
+def _store(key, payload):
+    # В кэше лежит уже сериализованный JSON + ETag, чтобы ответ 304/200 не требовал сериализации
+    entry = http_cache.build(payload)
+    catalog_cache.set(key, entry)
+    return entry
+
+def _respond(request, entry):
+    return http_cache.respond(request, entry, CATALOG_MAX_AGE)
+
+def _to_response(products):
+    return [schemas.ProductResponse.model_validate(p) for p in products]
+
+def _page_query(cursor, limit):
+    return paginate_by_id(select(models.Product), models.Product.id, cursor, limit)
+
+def _stream_query():
+    return select(models.Product).order_by(models.Product.id)
+
+def _to_page(rows, limit):
+    items, next_cursor = split_page(rows, limit, lambda p: {"id": p.id})
+    return schemas.ProductPage(items=_to_response(items), next_cursor=next_cursor)
+
+def _check_search_params(q, limit):
+    if not search.words(q):
+        raise HTTPException(status_code=400, detail="Пустой поисковый запрос")
+    if limit < 1 or limit > 100:
+        raise HTTPException(status_code=400, detail="limit должен быть от 1 до 100")
+
+# Тело импорта больше этого размера спулится на диск, а не держится в памяти
+IMPORT_SPOOL_SIZE = int(os.getenv("CATALOG_IMPORT_SPOOL", str(8 * 1024 * 1024)))
+
+def _import_format(request, format):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    guessed = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/jsonl": "ndjson"}.get(content_type)
+    try:
+        return catalog_io.detect_format(explicit=format or guessed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _import_body(request, format):
+    """Принимает файл телом запроса (не multipart), пишет во временный файл и импортирует в threadpool."""
+    fmt = _import_format(request, format)
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_SIZE) as body:
+        async for chunk in request.stream():
+            body.write(chunk)
+        body.seek(0)
+        stream = io.TextIOWrapper(body, encoding="utf-8-sig", newline="")
+        try:
+            report = await run_in_threadpool(catalog_io.import_products, engine, stream, fmt)
+        finally:
+            stream.detach()
+            invalidate_catalog()
+    return report
+
+def _export_response(format):
+    try:
+        fmt = catalog_io.detect_format(explicit=format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        catalog_io.export_products(engine, fmt),
+        media_type=catalog_io.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": 'attachment; filename="products.%s"' % fmt},
+    )
+
+# Тестовые товары с фиксированными ID
+SEED_PRODUCTS = [
+    {
+        "id": 1,
+        "name": "Диван Aurora",
+        "description": "Современный угловой диван с механизмом трансформации 'еврокнижка'. Изготовлен из высококачественной экокожи, имеет просторные спальные места. Каркас - массив березы, наполнитель - высокоэластичный ППУ. Размер: 220x160 см.",
+        "price": 89900.0,
+        "category": "sofa",
+        "image_url": "/img/sofa1.png",
+        "in_stock": True
+    },
+    {
+        "id": 2,
+        "name": "Диван Luna",
+        "description": "Элегантный прямой дисан с деревянными ножками из массива дуба. Идеально подходит для гостиной в классическом стиле. Механизм трансформации 'аккордеон', наполнитель - ортопедический латекс. Размер: 200x90 см.",
+        "price": 124500.0,
+        "category": "sofa",
+        "image_url": "/img/sofa2.png",
+        "in_stock": True
+    },
+    {
+        "id": 3,
+        "name": "Диван Cosmo",
+        "description": "Компактный диван для небольших помещений. Имеет вместительный ящик для белья и регулируемые подушки. Механизм 'дельфин', каркас - ЛДСП. Идеален для малогабаритных квартир. Размер: 180x120 см.",
+        "price": 76300.0,
+        "category": "sofa",
+        "image_url": "/img/sofa3.png",
+        "in_stock": True
+    },
+    {
+        "id": 4,
+        "name": "Шкаф-купе Milano",
+        "description": "Вместительный шкаф-купе с зеркальными дверями. Внутреннее наполнение включает полки, штанги для вешалок и выдвижные ящики. Каркас - ЛДСП 16мм, фурнитура - Blum. Размер: 240x60x220 см.",
+        "price": 45200.0,
+        "category": "wardrobe",
+        "image_url": "/img/wardrobe1.png",
+        "in_stock": True
+    },
+    {
+        "id": 5,
+        "name": "Шкаф классический Vienna",
+        "description": "Классический распашной шкаф из массива дерева. Солидный и долговечный вариант для спальни. Ручная обработка, натуральные материалы. Размер: 200x55x210 см.",
+        "price": 38700.0,
+        "category": "wardrobe",
+        "image_url": "/img/wardrobe2.png",
+        "in_stock": True
+    },
+    {
+        "id": 6,
+        "name": "Шкаф-гардеробная Modern",
+        "description": "Система гардеробной с раздвижными дверями. Возможность кастомизации внутреннего наполнения под ваши потребности. В комплекте: штанги, полки, корзины. Размер: 300x65x230 см.",
+        "price": 67900.0,
+        "category": "wardrobe",
+        "image_url": "/img/wardrobe3.png",
+        "in_stock": False  # Нет в наличии
+    },
+    {
+        "id": 7,
+        "name": "Кровать Valencia",
+        "description": "Роскошная двуспальная кровать с высокой спинкой и мягкой обивкой из велюра. Оснащена подъемным механизмом для дополнительного хранения. Размер спального места: 200x160 см.",
+        "price": 68700.0,
+        "category": "bed",
+        "image_url": "/img/bed1.png",
+        "in_stock": True
+    },
+    {
+        "id": 8,
+        "name": "Кровать Oslo",
+        "description": "Скандинавская кровать с минималистичным дизайном. Изготовлена из натурального дерева (сосна), покрыта экологичным лаком. Размер спального места: 200x140 см.",
+        "price": 52400.0,
+        "category": "bed",
+        "image_url": "/img/bed2.png",
+        "in_stock": True
+    },
+    {
+        "id": 9,
+        "name": "Кровать Imperial",
+        "description": "Кровать премиум-класса с декоративной резьбой по дереву. Идеальный выбор для просторной спальни. Основание - реечное, ортопедическое. Размер спального места: 200x180 см.",
+        "price": 95800.0,
+        "category": "bed",
+        "image_url": "/img/bed3.png",
+        "in_stock": True
+    }
+]
+
+def _seed_rows():
+    return [catalog_io.clean(product) for product in SEED_PRODUCTS]
+
+@router.get("/products", response_model=Union[schemas.ProductPage, List[schemas.ProductResponse]])
+def get_products(request: Request, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, stream: Optional[str] = None, db: Session = Depends(get_read_db)):
+    """
+    Без cursor - прежний список (skip/limit).
+    С cursor (пустой ?cursor= для первой страницы) - страница {items, next_cursor} по id.
+    С stream=ndjson|json - весь каталог по id потоком, без кэша (skip/limit не действуют).
+    """
+    fmt = streaming.stream_format(request, stream)
+    if fmt is not None:
+        return streaming.respond(streaming.iter_rows(_stream_query(), schemas.ProductResponse, fmt, read_sessionmaker(request)), fmt)
+    if cursor is not None:
+        check_limit(limit)
+        key = ("page", cursor, limit)
+        entry = cached(catalog_cache, request, key)
+        if entry is None:
+            entry = _store(key, _to_page(db.execute(_page_query(cursor, limit)).scalars().all(), limit))
+        return _respond(request, entry)
+    
+    key = ("list", skip, limit)
+    entry = cached(catalog_cache, request, key)
+    if entry is None:
+        entry = _store(key, _to_response(db.query(models.Product).offset(skip).limit(limit).all()))
+    return _respond(request, entry)
+
+@router.get("/products/cache/stats", summary="Статистика кэша каталога")
+def get_catalog_cache_stats():
+    return catalog_cache.stats()
+
+# Объявлен до /products/{product_id}, иначе "search" попадет в product_id
+@router.get("/products/search", response_model=List[schemas.ProductResponse])
+def search_products(
+    request: Request,
+    q: str,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    in_stock: Optional[bool] = None,
+    limit: int = 20,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Полнотекстовый поиск по названию и описанию, самые релевантные первыми.
+    Все слова обязательны, последнее ищется как префикс (поиск по мере ввода).
+    """
+    _check_search_params(q, limit)
+    filters = dict(category=category, min_price=min_price, max_price=max_price, in_stock=in_stock)
+    key = ("search", q.lower(), limit, tuple(sorted(filters.items())))
+    entry = cached(catalog_cache, request, key)
+    if entry is None:
+        rows = search.find_products(db, q, limit, catalog_version, **filters)
+        entry = _store(key, _to_response(rows))
+    return _respond(request, entry)
+
+# Импорт/экспорт объявлены до /products/{product_id}. Импорт перезаписывает товары - только ADMIN_EMAILS
+@router.post("/products/import", summary="Потоковый импорт каталога (CSV / NDJSON)",
+             dependencies=[Depends(auth.get_current_admin)])
+async def import_products(request: Request, format: Optional[str] = None):
+    """
+    Файл передается телом запроса: Content-Type text/csv или application/x-ndjson
+    (или ?format=csv|ndjson). Товары с id обновляются, без id - добавляются.
+    Тело читается асинхронно, разбор и запись идут в threadpool пачками.
+    """
+    return await _import_body(request, format)
+
+@router.get("/products/export", summary="Потоковая выгрузка каталога (CSV / NDJSON)")
+def export_products(format: str = "csv"):
+    return _export_response(format)
 
 @router.get("/products/{product_id}", response_model=schemas.ProductResponse)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(models.Product).filter(models.Product.id == product_id).first()
-    if product is None:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return product
+def get_product(request: Request, product_id: int, db: Session = Depends(get_read_db)):
+    key = ("item", product_id)
+    entry = cached(catalog_cache, request, key)
+    if entry is None:
+        product = db.query(models.Product).filter(models.Product.id == product_id).first()
+        if product is None:
+            raise HTTPException(status_code=404, detail="Товар не найден")
+        entry = _store(key, schemas.ProductResponse.model_validate(product))
+    return _respond(request, entry)
 
 @router.post("/products", response_model=schemas.ProductResponse)
 def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)):
@@ -26,39 +274,16 @@ def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
+    invalidate_catalog()
     return db_product
 
 @router.get("/products/category/{category}", response_model=List[schemas.ProductResponse])
-def get_products_by_category(category: str, db: Session = Depends(get_db)):
-    products = db.query(models.Product).filter(models.Product.category == category).all()
-    return products
-
-# backend/app/routers/products.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from ..database import get_db
-from .. import models, schemas
-
-router = APIRouter()
-
-# Ваши существующие эндпоинты
-@router.get("/products", response_model=List[schemas.ProductResponse])
-def get_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    products = db.query(models.Product).offset(skip).limit(limit).all()
-    return products
-
-@router.get("/products/{product_id}", response_model=schemas.ProductResponse)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(models.Product).filter(models.Product.id == product_id).first()
-    if product is None:
-        raise HTTPException(status_code=404, detail="Товар не найден")
-    return product
-
-@router.get("/products/category/{category}", response_model=List[schemas.ProductResponse])
-def get_products_by_category(category: str, db: Session = Depends(get_db)):
-    products = db.query(models.Product).filter(models.Product.category == category).all()
-    return products
+def get_products_by_category(request: Request, category: str, db: Session = Depends(get_read_db)):
+    key = ("category", category)
+    entry = cached(catalog_cache, request, key)
+    if entry is None:
+        entry = _store(key, _to_response(db.query(models.Product).filter(models.Product.category == category).all()))
+    return _respond(request, entry)
 
 # Новый эндпоинт для заполнения БД
 @router.post("/seed-products", summary="Заполнить базу тестовыми товарами")
@@ -67,92 +292,6 @@ def seed_products(db: Session = Depends(get_db)):
     Заполняет базу данных тестовыми товарами с фиксированными ID.
     ВАЖНО: Используется только для разработки!
     """
-    
-    # Тестовые товары с фиксированными ID
-    products_data = [
-        {
-            "id": 1,
-            "name": "Диван Aurora",
-            "description": "Современный угловой диван с механизмом трансформации 'еврокнижка'. Изготовлен из высококачественной экокожи, имеет просторные спальные места. Каркас - массив березы, наполнитель - высокоэластичный ППУ. Размер: 220x160 см.",
-            "price": 89900.0,
-            "category": "sofa",
-            "image_url": "/img/sofa1.png",
-            "in_stock": True
-        },
-        {
-            "id": 2,
-            "name": "Диван Luna", 
-            "description": "Элегантный прямой дисан с деревянными ножками из массива дуба. Идеально подходит для гостиной в классическом стиле. Механизм трансформации 'аккордеон', наполнитель - ортопедический латекс. Размер: 200x90 см.",
-            "price": 124500.0,
-            "category": "sofa",
-            "image_url": "/img/sofa2.png",
-            "in_stock": True
-        },
-        {
-            "id": 3,
-            "name": "Диван Cosmo",
-            "description": "Компактный диван для небольших помещений. Имеет вместительный ящик для белья и регулируемые подушки. Механизм 'дельфин', каркас - ЛДСП. Идеален для малогабаритных квартир. Размер: 180x120 см.",
-            "price": 76300.0,
-            "category": "sofa", 
-            "image_url": "/img/sofa3.png",
-            "in_stock": True
-        },
-        {
-            "id": 4,
-            "name": "Шкаф-купе Milano",
-            "description": "Вместительный шкаф-купе с зеркальными дверями. Внутреннее наполнение включает полки, штанги для вешалок и выдвижные ящики. Каркас - ЛДСП 16мм, фурнитура - Blum. Размер: 240x60x220 см.",
-            "price": 45200.0,
-            "category": "wardrobe",
-            "image_url": "/img/wardrobe1.png",
-            "in_stock": True
-        },
-        {
-            "id": 5,
-            "name": "Шкаф классический Vienna",
-            "description": "Классический распашной шкаф из массива дерева. Солидный и долговечный вариант для спальни. Ручная обработка, натуральные материалы. Размер: 200x55x210 см.",
-            "price": 38700.0,
-            "category": "wardrobe",
-            "image_url": "/img/wardrobe2.png",
-            "in_stock": True
-        },
-        {
-            "id": 6,
-            "name": "Шкаф-гардеробная Modern",
-            "description": "Система гардеробной с раздвижными дверями. Возможность кастомизации внутреннего наполнения под ваши потребности. В комплекте: штанги, полки, корзины. Размер: 300x65x230 см.",
-            "price": 67900.0,
-            "category": "wardrobe", 
-            "image_url": "/img/wardrobe3.png",
-            "in_stock": False  # Нет в наличии
-        },
-        {
-            "id": 7,
-            "name": "Кровать Valencia",
-            "description": "Роскошная двуспальная кровать с высокой спинкой и мягкой обивкой из велюра. Оснащена подъемным механизмом для дополнительного хранения. Размер спального места: 200x160 см.",
-            "price": 68700.0,
-            "category": "bed",
-            "image_url": "/img/bed1.png",
-            "in_stock": True
-        },
-        {
-            "id": 8,
-            "name": "Кровать Oslo",
-            "description": "Скандинавская кровать с минималистичным дизайном. Изготовлена из натурального дерева (сосна), покрыта экологичным лаком. Размер спального места: 200x140 см.",
-            "price": 52400.0,
-            "category": "bed",
-            "image_url": "/img/bed2.png",
-            "in_stock": True
-        },
-        {
-            "id": 9,
-            "name": "Кровать Imperial",
-            "description": "Кровать премиум-класса с декоративной резьбой по дереву. Идеальный выбор для просторной спальни. Основание - реечное, ортопедическое. Размер спального места: 200x180 см.",
-            "price": 95800.0,
-            "category": "bed",
-            "image_url": "/img/bed3.png",
-            "in_stock": True
-        }
-    ]
-    
     try:
         # Проверяем, есть ли уже товары
         existing_count = db.query(models.Product).count()
@@ -163,23 +302,17 @@ def seed_products(db: Session = Depends(get_db)):
                 "existing_count": existing_count
             }
         
-        # Добавляем товары с фиксированными ID
-        added_count = 0
-        for product_data in products_data:
-            # Проверяем, существует ли товар с таким ID
-            existing_product = db.query(models.Product).filter(models.Product.id == product_data["id"]).first()
-            if not existing_product:
-                product = models.Product(**product_data)
-                db.add(product)
-                added_count += 1
-        
+        # Добавляем товары с фиксированными ID одной пачкой (upsert по id)
+        added_count = catalog_io.write_chunk(db.connection(), _seed_rows())
+        catalog_io.sync_sequence(db.connection())
         db.commit()
+        invalidate_catalog()
         
         return {
             "message": "База успешно заполнена тестовыми товарами",
             "action": "Добавлено",
             "added_count": added_count,
-            "total_products": len(products_data)
+            "total_products": len(SEED_PRODUCTS)
         }
         
     except Exception as e:
@@ -204,6 +337,7 @@ def clear_all_products(
         # Используем TRUNCATE с CASCADE для удаления связанных записей
         db.execute(text("TRUNCATE TABLE products RESTART IDENTITY CASCADE"))
         db.commit()
+        invalidate_catalog()
         
         return {
             "message": "Таблица products и связанные cart_items очищены",
@@ -211,4 +345,147 @@ def clear_all_products(
         }
     except Exception as e:
         db.rollback()
-        raise HTTPException(status_code=500, detail=f"Ошибка: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Ошибка: {str(e)}")
+
+
+# ---------- Асинхронный режим (DB_MODE=async) ----------
+
+@async_router.get("/products", response_model=Union[schemas.ProductPage, List[schemas.ProductResponse]])
+async def get_products_async(request: Request, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, stream: Optional[str] = None, db: AsyncSession = Depends(get_read_async_db)):
+    fmt = streaming.stream_format(request, stream)
+    if fmt is not None:
+        return streaming.respond(streaming.iter_rows_async(_stream_query(), schemas.ProductResponse, fmt, read_sessionmaker(request)), fmt)
+    if cursor is not None:
+        check_limit(limit)
+        key = ("page", cursor, limit)
+        entry = cached(catalog_cache, request, key)
+        if entry is None:
+            result = await db.execute(_page_query(cursor, limit))
+            entry = _store(key, _to_page(result.scalars().all(), limit))
+        return _respond(request, entry)
+    
+    key = ("list", skip, limit)
+    entry = cached(catalog_cache, request, key)
+    if entry is None:
+        result = await db.execute(select(models.Product).offset(skip).limit(limit))
+        entry = _store(key, _to_response(result.scalars().all()))
+    return _respond(request, entry)
+
+@async_router.get("/products/cache/stats", summary="Статистика кэша каталога")
+async def get_catalog_cache_stats_async():
+    return catalog_cache.stats()
+
+@async_router.get("/products/search", response_model=List[schemas.ProductResponse])
+async def search_products_async(
+    request: Request,
+    q: str,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    in_stock: Optional[bool] = None,
+    limit: int = 20,
+    db: AsyncSession = Depends(get_read_async_db)
+):
+    _check_search_params(q, limit)
+    filters = dict(category=category, min_price=min_price, max_price=max_price, in_stock=in_stock)
+    key = ("search", q.lower(), limit, tuple(sorted(filters.items())))
+    entry = cached(catalog_cache, request, key)
+    if entry is None:
+        # find_products синхронный; run_sync выполняет его на этом же async-соединении
+        rows = await db.run_sync(search.find_products, q, limit, catalog_version, **filters)
+        entry = _store(key, _to_response(rows))
+    return _respond(request, entry)
+
+@async_router.post("/products/import", summary="Потоковый импорт каталога (CSV / NDJSON)",
+                   dependencies=[Depends(auth.get_current_admin_async)])
+async def import_products_async(request: Request, format: Optional[str] = None):
+    return await _import_body(request, format)
+
+@async_router.get("/products/export", summary="Потоковая выгрузка каталога (CSV / NDJSON)")
+async def export_products_async(format: str = "csv"):
+    # Генератор синхронный - StreamingResponse сам гоняет его в threadpool
+    return _export_response(format)
+
+@async_router.get("/products/{product_id}", response_model=schemas.ProductResponse)
+async def get_product_async(request: Request, product_id: int, db: AsyncSession = Depends(get_read_async_db)):
+    key = ("item", product_id)
+    entry = cached(catalog_cache, request, key)
+    if entry is None:
+        product = await db.get(models.Product, product_id)
+        if product is None:
+            raise HTTPException(status_code=404, detail="Товар не найден")
+        entry = _store(key, schemas.ProductResponse.model_validate(product))
+    return _respond(request, entry)
+
+@async_router.post("/products", response_model=schemas.ProductResponse)
+async def create_product_async(product: schemas.ProductCreate, db: AsyncSession = Depends(get_async_db)):
+    db_product = models.Product(**product.dict())
+    db.add(db_product)
+    await db.commit()
+    await db.refresh(db_product)
+    invalidate_catalog()
+    return db_product
+
+@async_router.get("/products/category/{category}", response_model=List[schemas.ProductResponse])
+async def get_products_by_category_async(request: Request, category: str, db: AsyncSession = Depends(get_read_async_db)):
+    key = ("category", category)
+    entry = cached(catalog_cache, request, key)
+    if entry is None:
+        result = await db.execute(select(models.Product).where(models.Product.category == category))
+        entry = _store(key, _to_response(result.scalars().all()))
+    return _respond(request, entry)
+
+@async_router.post("/seed-products", summary="Заполнить базу тестовыми товарами")
+async def seed_products_async(db: AsyncSession = Depends(get_async_db)):
+    try:
+        existing_count = await db.scalar(select(func.count()).select_from(models.Product))
+        if existing_count > 0:
+            return {
+                "message": f"В базе уже есть {existing_count} товаров",
+                "action": "Пропущено",
+                "existing_count": existing_count
+            }
+        
+        conn = await db.connection()
+        added_count = await conn.run_sync(catalog_io.write_chunk, _seed_rows())
+        await conn.run_sync(catalog_io.sync_sequence)
+        await db.commit()
+        invalidate_catalog()
+        
+        return {
+            "message": "База успешно заполнена тестовыми товарами",
+            "action": "Добавлено",
+            "added_count": added_count,
+            "total_products": len(SEED_PRODUCTS)
+        }
+        
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Ошибка при заполнении базы: {str(e)}"
+        )
+
+@async_router.delete("/products/clear-all", summary="Очистить все товары (ТОЛЬКО ДЛЯ РАЗРАБОТКИ)")
+async def clear_all_products_async(
+    db: AsyncSession = Depends(get_async_db),
+    confirm: bool = False
+):
+    if not confirm:
+        raise HTTPException(
+            status_code=400, 
+            detail="Требуется подтверждение: добавьте ?confirm=true к URL"
+        )
+    
+    try:
+        await db.execute(text("TRUNCATE TABLE products RESTART IDENTITY CASCADE"))
+        await db.commit()
+        invalidate_catalog()
+        
+        return {
+            "message": "Таблица products и связанные cart_items очищены",
+            "reset_identity": "ID сброшены к 1"
+        }
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Ошибка: {str(e)}")
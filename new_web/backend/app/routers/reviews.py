@@ -1,11 +1,56 @@
 # backend/app/routers/reviews.py
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from ..database import get_db
-from .. import models, schemas, auth
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import List, Optional, Union
+import os
+from ..database import get_db, get_async_db, get_read_db, get_read_async_db, read_sessionmaker
+from ..cache import TTLCache
+from ..stickiness import cached
+from ..pagination import paginate_by_created_desc, split_page, check_limit
+from .. import models, schemas, auth, http_cache, streaming
+from .. import ratings  # noqa: F401 - слушатель after_flush ведет сводку рейтинга по отзывам этого роутера
+from ..log import get_logger
+from .products import invalidate_catalog
 
 router = APIRouter()
+# Асинхронные версии тех же эндпоинтов (подключаются при DB_MODE=async)
+async_router = APIRouter()
+log = get_logger(__name__)
+
+# Готовые (сериализованные, с ETag) ответы списка отзывов; новый отзыв сбрасывает кэш
+reviews_cache = TTLCache(
+    maxsize=int(os.getenv("REVIEWS_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("REVIEWS_CACHE_TTL", "30")),
+)
+REVIEWS_MAX_AGE = int(os.getenv("REVIEWS_MAX_AGE", "30"))
+
+def _store(key, payload):
+    entry = http_cache.build(payload)
+    reviews_cache.set(key, entry)
+    return entry
+
+def _respond(request, entry):
+    return http_cache.respond(request, entry, REVIEWS_MAX_AGE)
+
+def _to_response(reviews):
+    return [schemas.ReviewResponse.model_validate(r) for r in reviews]
+
+def _page_query(cursor, limit):
+    stmt = select(models.Review).where(models.Review.is_approved == True)
+    return paginate_by_created_desc(stmt, models.Review.created_at, models.Review.id, cursor, limit)
+
+def _stream_query():
+    return (
+        select(models.Review)
+        .where(models.Review.is_approved == True)
+        .order_by(models.Review.created_at.desc(), models.Review.id.desc())
+    )
+
+def _to_page(rows, limit):
+    items, next_cursor = split_page(rows, limit, lambda r: {"created_at": r.created_at, "id": r.id})
+    return schemas.ReviewPage(items=_to_response(items), next_cursor=next_cursor)
 
 def get_current_user_from_header(
     authorization: Optional[str] = Header(None),
@@ -25,16 +70,34 @@ def get_current_user_from_header(
         if email is None:
             return None
             
-        user = db.query(models.User).filter(models.User.email == email).first()
-        return user
+        return auth.load_principal(db, email)
     except Exception as e:
-        print(f"Auth error: {e}")
+        log.info("reviews.auth.failed", error=e)
         return None
 
-@router.get("/reviews", response_model=List[schemas.ReviewResponse])
-def get_reviews(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    reviews = db.query(models.Review).filter(models.Review.is_approved == True).offset(skip).limit(limit).all()
-    return reviews
+@router.get("/reviews", response_model=Union[schemas.ReviewPage, List[schemas.ReviewResponse]])
+def get_reviews(request: Request, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, stream: Optional[str] = None, db: Session = Depends(get_read_db)):
+    """
+    С cursor (пустой ?cursor= для первой страницы) отдает {items, next_cursor}, новые отзывы первыми.
+    С stream=ndjson|json - все одобренные отзывы потоком (skip/limit не действуют).
+    """
+    fmt = streaming.stream_format(request, stream)
+    if fmt is not None:
+        return streaming.respond(streaming.iter_rows(_stream_query(), schemas.ReviewResponse, fmt, read_sessionmaker(request)), fmt)
+    if cursor is not None:
+        check_limit(limit)
+        key = ("page", cursor, limit)
+        entry = cached(reviews_cache, request, key)
+        if entry is None:
+            entry = _store(key, _to_page(db.execute(_page_query(cursor, limit)).scalars().all(), limit))
+        return _respond(request, entry)
+    
+    key = ("list", skip, limit)
+    entry = cached(reviews_cache, request, key)
+    if entry is None:
+        reviews = db.query(models.Review).filter(models.Review.is_approved == True).offset(skip).limit(limit).all()
+        entry = _store(key, _to_response(reviews))
+    return _respond(request, entry)
 
 @router.post("/reviews", response_model=schemas.ReviewResponse)
 def create_review(
@@ -48,8 +111,13 @@ def create_review(
     if review.rating < 1 or review.rating > 5:
         raise HTTPException(status_code=400, detail="Рейтинг должен быть от 1 до 5")
     
+    if review.product_id is not None and db.get(models.Product, review.product_id) is None:
+        raise HTTPException(status_code=404, detail="Товар не найден")
+    
+    # Сводку рейтинга товара обновляет app/ratings.py при flush, в этой же транзакции
     db_review = models.Review(
         user_id=current_user.id,
+        product_id=review.product_id,
         user_name=current_user.full_name,
         rating=review.rating,
         text=review.text
@@ -57,4 +125,85 @@ def create_review(
     db.add(db_review)
     db.commit()
     db.refresh(db_review)
-    return db_review
\ No newline at end of file
+    reviews_cache.clear()
+    if review.product_id is not None:
+        invalidate_catalog()  # в ответах каталога есть рейтинг
+    return db_review
+
+
+# ---------- Асинхронный режим (DB_MODE=async) ----------
+
+async def get_current_user_from_header_async(
+    authorization: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not authorization:
+        return None
+    
+    try:
+        scheme, token = authorization.split()
+        if scheme.lower() != "bearer":
+            return None
+            
+        payload = auth.verify_token(token)
+        email: str = payload.get("sub")
+        if email is None:
+            return None
+            
+        return await auth.load_principal_async(db, email)
+    except Exception as e:
+        log.info("reviews.auth.failed", error=e)
+        return None
+
+@async_router.get("/reviews", response_model=Union[schemas.ReviewPage, List[schemas.ReviewResponse]])
+async def get_reviews_async(request: Request, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, stream: Optional[str] = None, db: AsyncSession = Depends(get_read_async_db)):
+    fmt = streaming.stream_format(request, stream)
+    if fmt is not None:
+        return streaming.respond(streaming.iter_rows_async(_stream_query(), schemas.ReviewResponse, fmt, read_sessionmaker(request)), fmt)
+    if cursor is not None:
+        check_limit(limit)
+        key = ("page", cursor, limit)
+        entry = cached(reviews_cache, request, key)
+        if entry is None:
+            result = await db.execute(_page_query(cursor, limit))
+            entry = _store(key, _to_page(result.scalars().all(), limit))
+        return _respond(request, entry)
+    
+    key = ("list", skip, limit)
+    entry = cached(reviews_cache, request, key)
+    if entry is None:
+        result = await db.execute(
+            select(models.Review).where(models.Review.is_approved == True).offset(skip).limit(limit)
+        )
+        entry = _store(key, _to_response(result.scalars().all()))
+    return _respond(request, entry)
+
+@async_router.post("/reviews", response_model=schemas.ReviewResponse)
+async def create_review_async(
+    review: schemas.ReviewCreate, 
+    current_user: models.User = Depends(get_current_user_from_header_async), 
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Необходима авторизация")
+    
+    if review.rating < 1 or review.rating > 5:
+        raise HTTPException(status_code=400, detail="Рейтинг должен быть от 1 до 5")
+    
+    if review.product_id is not None and await db.get(models.Product, review.product_id) is None:
+        raise HTTPException(status_code=404, detail="Товар не найден")
+    
+    db_review = models.Review(
+        user_id=current_user.id,
+        product_id=review.product_id,
+        user_name=current_user.full_name,
+        rating=review.rating,
+        text=review.text
+    )
+    db.add(db_review)
+    await db.commit()
+    await db.refresh(db_review)
+    reviews_cache.clear()
+    if review.product_id is not None:
+        invalidate_catalog()
+    return db_review
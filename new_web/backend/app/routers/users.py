@@ -1,11 +1,15 @@
 # backend/app/routers/users.py
 from fastapi import APIRouter, Depends, HTTPException, status
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr
-from ..database import get_db
-from .. import models, auth
+from ..database import get_db, get_async_db
+from .. import auth
 
 router = APIRouter()
+# Асинхронные версии тех же эндпоинтов (подключаются при DB_MODE=async)
+async_router = APIRouter()
 
 # Схемы Pydantic
 class UserCreate(BaseModel):
@@ -27,26 +31,25 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# Эндпоинты async def: ожидание bcrypt не занимает поток Starlette, а запросы
+# к БД (sync-сессия) идут в потоке и отпускают соединение до хэширования
 @router.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: Session = Depends(get_db)):
     # Проверяем, нет ли уже пользователя с таким email
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
-    if db_user:
+    if await run_in_threadpool(auth.find_credentials, db, user.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail="Email уже зарегистрирован"
         )
     
     # Создаем пользователя
-    hashed_password = auth.get_password_hash(user.password)
-    db_user = models.User(
-        email=user.email,
-        hashed_password=hashed_password,
-        full_name=user.full_name
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    hashed_password = await auth.get_password_hash_async(user.password)
+    db_user = await run_in_threadpool(auth.create_user, db, user.email, hashed_password, user.full_name)
+    if db_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, 
+            detail="Email уже зарегистрирован"
+        )
     
     # Создаем токен
     access_token = auth.create_access_token(data={"sub": user.email})
@@ -60,9 +63,9 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     )
 
 @router.post("/login", response_model=UserResponse)
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
-    if not db_user or not auth.verify_password(user.password, db_user.hashed_password):
+async def login(user: UserLogin, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(auth.find_credentials, db, user.email)
+    if not db_user or not await auth.verify_password_async(user.password, db_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверные учетные данные"
@@ -77,5 +80,51 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
         access_token=access_token,
         token_type="bearer"
     )
+
+
+# ---------- Асинхронный режим (DB_MODE=async) ----------
+
+@async_router.post("/register", response_model=UserResponse)
+async def register_async(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if await auth.find_credentials_async(db, user.email):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, 
+            detail="Email уже зарегистрирован"
+        )
+    
+    hashed_password = await auth.get_password_hash_async(user.password)
+    db_user = await auth.create_user_async(db, user.email, hashed_password, user.full_name)
+    if db_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, 
+            detail="Email уже зарегистрирован"
+        )
+    
+    access_token = auth.create_access_token(data={"sub": user.email})
     
-    
\ No newline at end of file
+    return UserResponse(
+        id=db_user.id,
+        email=db_user.email,
+        full_name=db_user.full_name,
+        access_token=access_token,
+        token_type="bearer"
+    )
+
+@async_router.post("/login", response_model=UserResponse)
+async def login_async(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    db_user = await auth.find_credentials_async(db, user.email)
+    if not db_user or not await auth.verify_password_async(user.password, db_user.hashed_password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Неверные учетные данные"
+        )
+    
+    access_token = auth.create_access_token(data={"sub": user.email})
+    
+    return UserResponse(
+        id=db_user.id,
+        email=db_user.email,
+        full_name=db_user.full_name,
+        access_token=access_token,
+        token_type="bearer"
+    )
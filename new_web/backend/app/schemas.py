@@ -1,7 +1,8 @@
 # backend/app/schemas.py
 from pydantic import BaseModel, EmailStr
-from typing import List, Optional
-from datetime import datetime
+from typing import List, Literal, Optional
+from datetime import date, datetime
+from .money import Money
 
 # User Schemas
 class UserBase(BaseModel):
@@ -31,7 +32,7 @@ class UserAuthResponse(UserResponse):
 class ProductBase(BaseModel):
     name: str
     description: Optional[str] = None
-    price: float
+    price: Money
     category: str
     image_url: Optional[str] = None
 
@@ -42,10 +43,17 @@ class ProductResponse(ProductBase):
     id: int
     in_stock: bool
     created_at: datetime
+    rating_count: int = 0
+    rating_average: Optional[float] = None
+    rating_histogram: List[int] = [0, 0, 0, 0, 0]  # отзывы с 1..5 звездами
     
     class Config:
         from_attributes = True
 
+class ProductPage(BaseModel):
+    items: List[ProductResponse]
+    next_cursor: Optional[str] = None  # None - это последняя страница
+
 # Cart Schemas
 class CartItemBase(BaseModel):
     product_id: int
@@ -62,17 +70,34 @@ class CartItemResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class CartOperation(BaseModel):
+    op: Literal["add", "set", "remove"] = "add"
+    product_id: int
+    quantity: int = 1  # для remove не используется
+
+class CartBatch(BaseModel):
+    operations: List[CartOperation]
+
+class CartReplace(BaseModel):
+    items: List[CartItemCreate]
+
+class CartSummary(BaseModel):
+    positions: int  # разных товаров в корзине
+    quantity: int   # штук всего
+    total: Money
+
 # Review Schemas
 class ReviewBase(BaseModel):
     rating: int
     text: str
 
 class ReviewCreate(ReviewBase):
-    pass
+    product_id: Optional[int] = None
 
 class ReviewResponse(ReviewBase):
     id: int
     user_id: int
+    product_id: Optional[int] = None
     user_name: str
     is_approved: bool
     created_at: datetime
@@ -80,6 +105,10 @@ class ReviewResponse(ReviewBase):
     class Config:
         from_attributes = True
 
+class ReviewPage(BaseModel):
+    items: List[ReviewResponse]
+    next_cursor: Optional[str] = None
+
 # Token Schemas
 class Token(BaseModel):
     access_token: str
@@ -96,7 +125,7 @@ class TokenData(BaseModel):
 class OrderItemBase(BaseModel):
     product_id: int
     quantity: int
-    price: float
+    price: Money
 
 class OrderItemCreate(BaseModel):
     product_id: int
@@ -111,7 +140,7 @@ class OrderItemResponse(OrderItemBase):
         from_attributes = True
 
 class OrderBase(BaseModel):
-    total_amount: float
+    total_amount: Money
     status: str = "pending"
 
 class OrderCreate(BaseModel):
@@ -125,4 +154,39 @@ class OrderResponse(OrderBase):
     items: List[OrderItemResponse]
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class OrderPage(BaseModel):
+    items: List[OrderResponse]
+    next_cursor: Optional[str] = None
+
+# Analytics Schemas
+class DailyRevenue(BaseModel):
+    day: date
+    orders: int
+    revenue: Money
+
+class CategoryRevenue(BaseModel):
+    category: str
+    quantity: int
+    revenue: Money
+
+class TopProduct(BaseModel):
+    product_id: int
+    name: str
+    quantity: int
+    revenue: Money
+
+class AverageOrderValue(BaseModel):
+    start: date
+    end: date
+    orders: int
+    revenue: Money
+    average: Money
+
+class CartConversion(BaseModel):
+    start: date
+    end: date
+    cart_users: int     # клали товары в корзину за период
+    ordered_users: int  # из них оформили заказ за период
+    rate: float
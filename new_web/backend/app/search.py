@@ -0,0 +1,187 @@
+# backend/app/search.py
+"""
+Полнотекстовый поиск по товарам (name + description, русский текст).
+
+PostgreSQL: to_tsvector('russian', ...) с GIN-индексом ix_products_search
+и ранжированием ts_rank_cd. Остальные БД (SQLite в разработке и тестах):
+инвертированный индекс в памяти процесса с тем же поведением - все слова
+запроса обязательны, последнее слово ищется как префикс ("дива" -> "диван").
+"""
+import heapq
+import math
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from sqlalchemy import select, func, literal_column
+from . import models
+
+NAME_WEIGHT = 3.0  # совпадение в названии весит больше, чем в описании
+# Индекс в памяти перестраивается при изменении каталога в этом процессе,
+# а изменения из других воркеров подхватывает не позже чем через SEARCH_INDEX_TTL секунд
+SEARCH_INDEX_TTL = float(os.getenv("SEARCH_INDEX_TTL", "300"))
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+# Окончания для упрощенного стемминга (длинные первыми)
+_ENDINGS = sorted(
+    ["ами", "ями", "ого", "его", "ому", "ему", "ыми", "ими", "ов", "ев", "ей", "ий", "ый", "ой",
+     "ая", "яя", "ое", "ее", "ые", "ие", "ых", "их", "ом", "ем", "ах", "ях", "ам", "ям", "ую",
+     "юю", "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й"],
+    key=len, reverse=True,
+)
+_STOP_WORDS = {"и", "в", "во", "на", "с", "со", "для", "из", "по", "к", "о", "от", "до", "а", "но", "или", "не"}
+
+
+def stem(word):
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 3:
+            return word[:-len(ending)]
+    return word
+
+
+def words(text):
+    return [w for w in _WORD_RE.findall((text or "").lower().replace("ё", "е")) if w not in _STOP_WORDS]
+
+
+def tokenize(text):
+    return [stem(w) for w in words(text)]
+
+
+# ---------- PostgreSQL ----------
+
+def pg_search_query(q, limit, category=None, min_price=None, max_price=None, in_stock=None):
+    query_words = words(q)
+    if not query_words:
+        return None
+    # Только \w-слова, так что спецсимволы tsquery в запрос не попадут; стемминг делает сам PostgreSQL
+    tsquery = func.to_tsquery(
+        literal_column("'%s'" % models.SEARCH_CONFIG),
+        " & ".join(query_words[:-1] + [query_words[-1] + ":*"]),
+    )
+    document = models.search_document(models.Product.name, models.Product.description)
+    stmt = (
+        select(models.Product)
+        .where(document.op("@@")(tsquery))
+        .order_by(func.ts_rank_cd(document, tsquery).desc(), models.Product.id)
+        .limit(limit)
+    )
+    return apply_filters(stmt, category, min_price, max_price, in_stock)
+
+
+def apply_filters(stmt, category, min_price, max_price, in_stock):
+    if category is not None:
+        stmt = stmt.where(models.Product.category == category)
+    if min_price is not None:
+        stmt = stmt.where(models.Product.price >= min_price)
+    if max_price is not None:
+        stmt = stmt.where(models.Product.price <= max_price)
+    if in_stock is not None:
+        stmt = stmt.where(models.Product.in_stock == in_stock)
+    return stmt
+
+
+# ---------- Инвертированный индекс в памяти (не PostgreSQL) ----------
+
+class InvertedIndex:
+    """Индекс term -> {product_id: вес}; хранит только id и поля для фильтров."""
+
+    def __init__(self):
+        self.version = None
+        self.built_at = 0.0
+        self.postings = {}
+        self.terms = []  # отсортированные термы для префиксного поиска
+        self.docs = {}   # product_id -> (price, category, in_stock)
+        self._lock = threading.Lock()
+
+    def ensure(self, db, version):
+        """Перестраивает индекс, если каталог изменился (версия из products.catalog_version)."""
+        if self.version == version and time.monotonic() - self.built_at < SEARCH_INDEX_TTL:
+            return
+        with self._lock:
+            if self.version != version or time.monotonic() - self.built_at >= SEARCH_INDEX_TTL:
+                self._build(db)
+                self.version = version
+                self.built_at = time.monotonic()
+
+    def _build(self, db):
+        postings = defaultdict(dict)
+        docs = {}
+        rows = db.execute(
+            select(
+                models.Product.id, models.Product.name, models.Product.description,
+                models.Product.price, models.Product.category, models.Product.in_stock,
+            ).execution_options(yield_per=2000)
+        )
+        for product_id, name, description, price, category, in_stock in rows:
+            docs[product_id] = (price, category, in_stock)
+            weights = defaultdict(float)
+            for term in tokenize(name):
+                weights[term] += NAME_WEIGHT
+            for term in tokenize(description):
+                weights[term] += 1.0
+            for term, weight in weights.items():
+                postings[term][product_id] = weight
+        self.postings = dict(postings)
+        self.terms = sorted(self.postings)
+        self.docs = docs
+
+    def _prefix_postings(self, prefix):
+        merged = {}
+        i = bisect_left(self.terms, prefix)
+        while i < len(self.terms) and self.terms[i].startswith(prefix):
+            for product_id, weight in self.postings[self.terms[i]].items():
+                if weight > merged.get(product_id, 0.0):
+                    merged[product_id] = weight
+            i += 1
+        return merged
+
+    def search(self, q, limit, category=None, min_price=None, max_price=None, in_stock=None):
+        """Возвращает id товаров по убыванию релевантности (tf * idf)."""
+        query_words = words(q)
+        if not query_words:
+            return []
+        lists = [self.postings.get(stem(w), {}) for w in query_words[:-1]]
+        lists.append(self._prefix_postings(stem(query_words[-1])))
+        if not all(lists):
+            return []
+
+        total = len(self.docs) or 1
+        lists.sort(key=len)  # пересечение начинаем с самого редкого терма
+        scores = {}
+        for product_id, weight in lists[0].items():
+            price, cat, stock = self.docs[product_id]
+            if category is not None and cat != category:
+                continue
+            if min_price is not None and price < min_price:
+                continue
+            if max_price is not None and price > max_price:
+                continue
+            if in_stock is not None and stock != in_stock:
+                continue
+            score = 0.0
+            for postings in lists:
+                w = postings.get(product_id)
+                if w is None:
+                    break
+                score += w * math.log(1 + total / len(postings))
+            else:
+                scores[product_id] = score
+
+        return heapq.nsmallest(limit, scores, key=lambda pid: (-scores[pid], pid))
+
+
+memory_index = InvertedIndex()
+
+
+def find_products(db, q, limit, catalog_version, **filters):
+    """Товары по запросу в порядке релевантности: PostgreSQL - tsvector, иначе - индекс в памяти."""
+    if db.get_bind().dialect.name == "postgresql":
+        return db.execute(pg_search_query(q, limit, **filters)).scalars().all()
+    memory_index.ensure(db, catalog_version)
+    ids = memory_index.search(q, limit, **filters)
+    if not ids:
+        return []
+    by_id = {p.id: p for p in db.execute(select(models.Product).where(models.Product.id.in_(ids))).scalars()}
+    return [by_id[i] for i in ids if i in by_id]
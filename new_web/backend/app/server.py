@@ -0,0 +1,188 @@
+# backend/app/server.py
+"""
+Production-запуск API (из папки backend):
+
+    python -m app.server
+    WEB_CONCURRENCY=8 PORT=8080 python -m app.server
+
+- WEB_CONCURRENCY воркеров uvicorn, по умолчанию - по числу доступных ядер
+  (с учетом taskset и квоты CPU контейнера); сокет открывает мастер,
+  воркеры принимают соединения с него. При WEB_CONCURRENCY=1 мастера нет;
+- каждый воркер перед приемом соединений прогревается (app/lifecycle.py);
+- фоновые задачи (сверка рейтингов, пополнение сводок аналитики) идут только
+  в воркере 0: мастер передает остальным BACKGROUND_JOBS=false. При
+  BACKGROUND_JOBS=false у самого сервера их нет ни в одном воркере - тогда
+  их запускают отдельно (python -m app.analytics, python -m app.ratings);
+- мастер перезапускает упавший воркер. Если воркер завершился, не проработав
+  WORKER_MIN_UPTIME секунд (ошибка конфигурации, БД недоступна на старте),
+  сервер останавливается с кодом 1 - без бесконечного цикла перезапусков;
+- SIGTERM/SIGINT: все воркеры получают SIGTERM одновременно, каждый
+  SHUTDOWN_DRAIN_DELAY секунд работает в drain (/readyz = 503), затем
+  перестает принимать соединения и ждет запросы в обработке не дольше
+  SHUTDOWN_TIMEOUT секунд. Повторный сигнал воркеру - без ожидания drain.
+
+Настройки: HOST (0.0.0.0), PORT (8000), WEB_CONCURRENCY, SHUTDOWN_DRAIN_DELAY (5),
+SHUTDOWN_TIMEOUT (30), WORKER_MIN_UPTIME (10), KEEP_ALIVE_TIMEOUT (5),
+FORWARDED_ALLOW_IPS (127.0.0.1), ACCESS_LOG (false), BACKGROUND_JOBS (true).
+"""
+import math
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+from . import lifecycle, log
+
+APP = "app.main:app"
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+SHUTDOWN_DRAIN_DELAY = float(os.getenv("SHUTDOWN_DRAIN_DELAY", "5"))
+SHUTDOWN_TIMEOUT = int(os.getenv("SHUTDOWN_TIMEOUT", "30"))
+WORKER_MIN_UPTIME = float(os.getenv("WORKER_MIN_UPTIME", "10"))
+KEEP_ALIVE_TIMEOUT = int(os.getenv("KEEP_ALIVE_TIMEOUT", "5"))
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+ACCESS_LOG = os.getenv("ACCESS_LOG", "false").lower() in ("1", "true", "yes")
+BACKGROUND_JOBS = os.getenv("BACKGROUND_JOBS", "true").lower() in ("1", "true", "yes")
+
+server_log = log.get_logger("app.server")
+
+
+def available_cpus():
+    """Ядра, на которых процессу разрешено работать: affinity и квота cgroup v2 (cpu.max)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # не Linux
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0")) or available_cpus()
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn.Server, который по первому SIGTERM/SIGINT сначала SHUTDOWN_DRAIN_DELAY секунд в drain, потом останавливается."""
+
+    drain_until = None
+
+    def handle_exit(self, sig, frame):
+        if self.drain_until is None and SHUTDOWN_DRAIN_DELAY > 0 and not self.should_exit:
+            self.drain_until = time.monotonic() + SHUTDOWN_DRAIN_DELAY
+            lifecycle.begin_drain()
+            return
+        super().handle_exit(sig, frame)
+
+    async def on_tick(self, counter):
+        if self.drain_until is not None and time.monotonic() >= self.drain_until:
+            self.should_exit = True
+        return await super().on_tick(counter)
+
+
+def _run_worker(config, sockets, background_jobs):
+    """Точка входа воркера (spawn): логирование uvicorn как в обычном запуске, затем сервер на сокете мастера."""
+    # До импорта app.main (его грузит Server.run): main.py читает флаг при импорте
+    os.environ["BACKGROUND_JOBS"] = "true" if background_jobs else "false"
+    config.configure_logging()
+    DrainingServer(config).run(sockets=sockets)
+
+
+class Supervisor(Multiprocess):
+    """
+    Мастер-процесс на основе uvicorn.supervisors.Multiprocess (signal_handler,
+    should_exit, processes). Multiprocess из uvicorn 0.24 не перезапускает упавшие
+    воркеры и останавливает их по одному (terminate + join), поэтому startup/run/shutdown
+    свои; воркеры запускаются через multiprocessing (spawn), как и в самом uvicorn,
+    но без его приватного uvicorn._subprocess.
+    """
+
+    def __init__(self, config):
+        super().__init__(config, target=None, sockets=[config.bind_socket()])
+        self.started = []
+        self.exit_code = 0
+
+    def _spawn(self, index):
+        # Фоновые задачи - в воркере 0 (и в том, что заменит его после падения)
+        process = multiprocessing.get_context("spawn").Process(
+            target=_run_worker,
+            kwargs={"config": self.config, "sockets": self.sockets, "background_jobs": BACKGROUND_JOBS and index == 0},
+        )
+        process.start()
+        return process
+
+    def startup(self):
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self.signal_handler)
+        self.processes = [self._spawn(index) for index in range(self.config.workers)]
+        server_log.info("server.started", pid=self.pid, workers=self.config.workers, host=HOST, port=PORT)
+
+    def run(self):
+        self.startup()
+        self.started = [time.monotonic()] * len(self.processes)
+        while not self.should_exit.wait(0.5):
+            for index, process in enumerate(self.processes):
+                if process.is_alive():
+                    continue
+                uptime = time.monotonic() - self.started[index]
+                server_log.warning("server.worker_exited", pid=process.pid, exitcode=process.exitcode, uptime_s=round(uptime, 1))
+                if uptime < WORKER_MIN_UPTIME:
+                    server_log.error("server.worker_start_failed", min_uptime_s=WORKER_MIN_UPTIME)
+                    self.exit_code = 1
+                    self.should_exit.set()
+                    break
+                self.processes[index] = self._spawn(index)
+                self.started[index] = time.monotonic()
+        self.shutdown()
+        return self.exit_code
+
+    def shutdown(self):
+        # Сигнал всем сразу: воркеры уходят в drain параллельно, а не по очереди
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + SHUTDOWN_DRAIN_DELAY + SHUTDOWN_TIMEOUT + 5
+        for process in self.processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                server_log.warning("server.worker_killed", pid=process.pid)
+                process.kill()
+                process.join()
+        for sock in self.sockets:
+            sock.close()
+        server_log.info("server.stopped", pid=self.pid)
+
+
+def main():
+    log.configure()
+    config = uvicorn.Config(
+        APP,
+        host=HOST,
+        port=PORT,
+        workers=WEB_CONCURRENCY,
+        lifespan="on",
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+        timeout_keep_alive=KEEP_ALIVE_TIMEOUT,
+        timeout_graceful_shutdown=SHUTDOWN_TIMEOUT,
+        access_log=ACCESS_LOG,
+        log_level=log.LOG_LEVEL.lower(),
+    )
+    if WEB_CONCURRENCY > 1:
+        exit_code = Supervisor(config).run()
+    else:
+        server = DrainingServer(config)
+        server.run()
+        exit_code = 0 if server.started else 1
+    log.shutdown()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
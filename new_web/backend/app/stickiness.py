@@ -0,0 +1,88 @@
+# backend/app/stickiness.py
+"""
+Read-your-writes при чтении с реплик (database.get_read_db).
+
+Реплика отстает от primary, поэтому клиент, который только что что-то
+изменил (успешный POST/PUT/PATCH/DELETE), следующие DB_STICKY_SECONDS
+читает с primary и видит свою запись. Клиент запоминается двумя способами:
+
+- cookie db_primary со временем окончания - работает, в какой бы воркер
+  ни попал следующий запрос;
+- по токену (Authorization / ?token=) в памяти процесса - для клиентов API,
+  которые не хранят cookie.
+
+Пока клиент "прилип", серверные кэши каталога и отзывов для него
+не читаются: их мог заполнить запрос, обслуженный отстающей репликой.
+Middleware подключается в main.py, только если реплики настроены.
+"""
+import os
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+from .cache import TTLCache
+
+DB_STICKY_SECONDS = float(os.getenv("DB_STICKY_SECONDS", "5"))
+STICKY_COOKIE = "db_primary"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+_recent_writers = TTLCache(maxsize=100_000, ttl=DB_STICKY_SECONDS)
+
+
+def _client_key(headers, query_string):
+    authorization = headers.get("authorization")
+    if authorization:
+        return authorization
+    token = parse_qs(query_string).get("token")
+    return "Bearer " + token[0] if token else None
+
+
+def _cookie_until(cookie_header):
+    morsel = SimpleCookie(cookie_header).get(STICKY_COOKIE) if cookie_header else None
+    try:
+        return float(morsel.value) if morsel is not None else 0.0
+    except ValueError:
+        return 0.0
+
+
+def is_sticky(request):
+    """True, если клиент недавно писал и его чтения должны идти в primary."""
+    sticky = getattr(request.state, "db_sticky", None)
+    if sticky is None:
+        if _cookie_until(request.headers.get("cookie")) > time.time():
+            sticky = True
+        else:
+            key = _client_key(request.headers, request.url.query)
+            sticky = key is not None and _recent_writers.get(key) is not None
+        request.state.db_sticky = sticky
+    return sticky
+
+
+def cached(cache, request, key):
+    """cache.get(key), но для "прилипшего" клиента всегда промах."""
+    return None if is_sticky(request) else cache.get(key)
+
+
+class ReadYourWritesMiddleware:
+    """После успешного изменяющего запроса прикрепляет клиента к primary на DB_STICKY_SECONDS."""
+
+    def __init__(self, app, seconds=DB_STICKY_SECONDS):
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_marked(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+                key = _client_key(headers, scope.get("query_string", b"").decode("latin-1"))
+                if key is not None:
+                    _recent_writers.set(key, True)
+                cookie = "%s=%.3f; Max-Age=%d; Path=/; HttpOnly; SameSite=Lax" % (
+                    STICKY_COOKIE, time.time() + self.seconds, max(1, round(self.seconds)))
+                message = {**message, "headers": list(message["headers"]) + [(b"set-cookie", cookie.encode("latin-1"))]}
+            await send(message)
+
+        await self.app(scope, receive, send_marked)
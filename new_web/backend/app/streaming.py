@@ -0,0 +1,80 @@
+# backend/app/streaming.py
+"""
+Потоковая выдача больших списков: ?stream=ndjson (объект на строку)
+или ?stream=json (обычный JSON-массив, но частями). Заголовок
+Accept: application/x-ndjson без параметра тоже включает ndjson.
+
+Строки читаются с курсора БД пачками по STREAM_YIELD_PER (yield_per), каждая
+пачка сериализуется и сразу уходит клиенту; identity map сессии держит
+объекты по слабым ссылкам, так что отправленная пачка освобождается -
+память не растет с размером выборки, первый байт уходит после первой
+пачки, а не после всей выборки.
+
+Генераторы открывают собственную сессию: сессия запроса (get_db) к моменту
+отправки тела уже может быть закрыта. Фабрику сессий (реплика или primary)
+эндпоинт выбирает заранее - database.read_sessionmaker(request).
+"""
+import os
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+from .database import SessionLocal, AsyncSessionLocal
+from .log import get_logger
+
+STREAM_YIELD_PER = int(os.getenv("STREAM_YIELD_PER", "500"))
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "json": "application/json"}
+
+log = get_logger(__name__)
+
+
+def stream_format(request, stream):
+    """ndjson / json, если клиент просит потоковый ответ, иначе None."""
+    if stream is None:
+        accept = request.headers.get("accept", "")
+        return "ndjson" if MEDIA_TYPES["ndjson"] in accept else None
+    if stream not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="stream должен быть ndjson или json")
+    return stream
+
+
+def _encode(rows, schema, fmt, first):
+    items = [to_json(schema.model_validate(row)) for row in rows]
+    if fmt == "ndjson":
+        return b"".join(item + b"\n" for item in items)
+    body = b",".join(items)
+    return body if first or not body else b"," + body
+
+
+def iter_rows(stmt, schema, fmt, session_factory=SessionLocal):
+    """Синхронный генератор тела ответа (StreamingResponse гоняет его в threadpool)."""
+    with session_factory() as db:
+        result = db.execute(stmt.execution_options(yield_per=STREAM_YIELD_PER))
+        if fmt == "json":
+            yield b"["
+        first, count = True, 0
+        for rows in result.scalars().partitions():
+            yield _encode(rows, schema, fmt, first)
+            first, count = False, count + len(rows)
+        if fmt == "json":
+            yield b"]"
+    log.debug("stream.done", schema=schema.__name__, rows=count)
+
+
+async def iter_rows_async(stmt, schema, fmt, session_factory=None):
+    """То же для DB_MODE=async: серверный курсор через AsyncSession.stream()."""
+    async with (session_factory or AsyncSessionLocal)() as db:
+        result = await db.stream(stmt.execution_options(yield_per=STREAM_YIELD_PER))
+        if fmt == "json":
+            yield b"["
+        first, count = True, 0
+        async for rows in result.scalars().partitions():
+            yield _encode(rows, schema, fmt, first)
+            first, count = False, count + len(rows)
+        if fmt == "json":
+            yield b"]"
+    log.debug("stream.done", schema=schema.__name__, rows=count)
+
+
+def respond(body, fmt):
+    # X-Accel-Buffering: nginx не копит ответ целиком перед отправкой клиенту
+    return StreamingResponse(body, media_type=MEDIA_TYPES[fmt], headers={"X-Accel-Buffering": "no"})
@@ -0,0 +1,107 @@
+# backend/benchmarks/cart_batch.py
+"""
+Пакетные операции корзины против поштучных: N вызовов POST /api/cart
+и один POST /api/cart/batch на N товаров (плюс PUT /api/cart/batch -
+перенос гостевой корзины). Печатает время и число SQL-запросов.
+
+Запуск из папки backend (по умолчанию временная SQLite-база):
+    python -m benchmarks.cart_batch
+    DB_MODE=async python -m benchmarks.cart_batch --sizes 20,200 --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "cart_batch.db"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app import models, auth  # noqa: E402
+from app.database import Base, engine, SessionLocal, count_queries  # noqa: E402
+from app.main import app  # noqa: E402
+
+EMAIL = "batch@bench-shop.ru"
+
+
+def prepare(n_products):
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Product), [
+            {"id": i, "name": "Товар %d" % i, "price": 1000.0 + i, "category": "sofa"} for i in range(1, n_products + 1)
+        ])
+    with SessionLocal() as db:
+        db.add(models.User(email=EMAIL, hashed_password="x", full_name="Batch"))
+        db.commit()
+
+
+def clear_cart():
+    with SessionLocal() as db:
+        db.query(models.CartItem).delete()
+        db.commit()
+
+
+def measure(fn, repeat):
+    samples, queries = [], 0
+    for _ in range(repeat):
+        clear_cart()
+        with count_queries() as counted:
+            started = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - started) * 1000)
+        queries = counted["count"]
+    return {"median_ms": round(statistics.median(samples), 2), "sql": queries}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="20,200")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    sizes = [int(n) for n in args.sizes.split(",")]
+
+    prepare(max(sizes))
+    headers = {"Authorization": "Bearer " + auth.create_access_token({"sub": EMAIL})}
+    report = {}
+    with TestClient(app) as client:
+        for n in sizes:
+            ids = list(range(1, n + 1))
+
+            def one_by_one():
+                for pid in ids:
+                    assert client.post("/api/cart", json={"product_id": pid, "quantity": 1}, headers=headers).status_code == 200
+
+            def batch_add():
+                body = {"operations": [{"op": "add", "product_id": pid, "quantity": 1} for pid in ids]}
+                response = client.post("/api/cart/batch", json=body, headers=headers)
+                assert response.status_code == 200 and len(response.json()) == n, response.text
+
+            def batch_replace():
+                body = {"items": [{"product_id": pid, "quantity": 2} for pid in ids]}
+                response = client.put("/api/cart/batch", json=body, headers=headers)
+                assert response.status_code == 200 and len(response.json()) == n, response.text
+
+            single = measure(one_by_one, args.repeat)
+            batch = measure(batch_add, args.repeat)
+            replace = measure(batch_replace, args.repeat)
+            report[n] = {
+                "POST /api/cart x N": single,
+                "POST /api/cart/batch": batch,
+                "PUT /api/cart/batch": replace,
+                "speedup": round(single["median_ms"] / batch["median_ms"], 1),
+            }
+            print("%4d товаров: по одному %8.1f ms (%4d sql)   batch %7.1f ms (%d sql)   x%.1f" % (
+                n, single["median_ms"], single["sql"], batch["median_ms"], batch["sql"], report[n]["speedup"]))
+
+    print(json.dumps(report, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
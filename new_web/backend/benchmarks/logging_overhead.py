@@ -0,0 +1,139 @@
+# backend/benchmarks/logging_overhead.py
+"""
+Цена логирования на один запрос корзины: было / стало.
+
+"было" - те же 8 вызовов logger.info(f"...") с JWT payload, что раньше делали
+get_current_user + add_to_cart, синхронный StreamHandler в файл.
+"стало" - события app.log (как сейчас в cart.py) через очередь, при LOG_LEVEL
+INFO и DEBUG, с сэмплированием 1% и без.
+Плюс сквозной замер POST /api/cart + GET /api/cart через приложение.
+
+Запуск из папки backend:
+    python -m benchmarks.logging_overhead
+    python -m benchmarks.logging_overhead --iterations 50000 --requests 500
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+TMP_DIR = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(TMP_DIR, "logging.db"))
+os.environ.setdefault("LOG_LEVEL", "INFO")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import log as app_log  # noqa: E402
+from app import auth  # noqa: E402
+from app.database import Base, engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+PAYLOAD = {"sub": "bench@shop.ru", "exp": 1893456000}
+TOKEN = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJzdWIiOiJiZW5jaEBzaG9wLnJ1In0.signature"
+
+
+class FakeUser:
+    id = 1
+    email = "bench@shop.ru"
+
+
+class FakeItem:
+    id = 10
+    product_id = 3
+    quantity = 2
+    name = "Диван Aurora"
+
+
+def legacy_request(logger, user=FakeUser, item=FakeItem):
+    # Вызовы в том виде, в каком они были в cart.py до перехода на app.log
+    logger.info(f"🔐 Получен token: {None}")
+    logger.info(f"🔐 Получен authorization header: Bearer {TOKEN}")
+    logger.info("🔐 Используем токен из заголовка Authorization")
+    logger.info(f"🔐 Декодированный payload: {PAYLOAD}")
+    logger.info(f"🔐 Извлечен email: {PAYLOAD['sub']}")
+    logger.info(f"🔐 Найден пользователь: {user.email}")
+    logger.info(f"🛒 Добавление в корзину: product_id={item.product_id}, quantity={item.quantity}")
+    logger.info(f"🛒 Пользователь: {user.email}")
+    logger.info(f"🛒 Найден товар: {item.name}")
+    logger.info(f"🛒 Создан новый элемент корзины: id={item.id}")
+
+
+def structured_request(log, user=FakeUser, item=FakeItem):
+    # Вызовы в том виде, в каком они сейчас в cart.py
+    log.debug("cart.auth.ok", user_id=user.id)
+    log.debug("cart.item_added", user_id=user.id, item_id=item.id, quantity=item.quantity)
+
+
+def per_call_us(fn, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return round((time.perf_counter() - started) / iterations * 1e6, 2)
+
+
+def micro(iterations):
+    results = {}
+    legacy = logging.getLogger("bench.legacy")
+    legacy.propagate = False
+    handler = logging.FileHandler(os.path.join(TMP_DIR, "legacy.log"), encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    legacy.addHandler(handler)
+    for level in ("INFO", "WARNING"):
+        legacy.setLevel(level)
+        results["before/%s" % level] = per_call_us(lambda: legacy_request(legacy), iterations)
+
+    # app.* уже пишет через очередь (app.log.configure() вызван в main)
+    log = app_log.get_logger("app.bench")
+    app_logger = logging.getLogger("app")
+    for level, rate in (("INFO", 1.0), ("DEBUG", 1.0), ("DEBUG", 0.01)):
+        app_logger.setLevel(level)
+        log.sample_rate = rate
+        name = "after/%s" % level + ("/sampled %g" % rate if rate < 1 else "")
+        results[name] = per_call_us(lambda: structured_request(log), iterations)
+    app_logger.setLevel(app_log.LOG_LEVEL)
+    return results
+
+
+def end_to_end(requests):
+    Base.metadata.create_all(bind=engine)
+    token = auth.create_access_token({"sub": "bench@shop.ru"})
+    headers = {"Authorization": "Bearer " + token}
+    results = {}
+    with TestClient(app) as client:
+        client.post("/api/seed-products")
+        for level in ("WARNING", "INFO", "DEBUG"):
+            logging.getLogger("app").setLevel(level)
+            started = time.perf_counter()
+            for i in range(requests):
+                client.post("/api/cart", json={"product_id": 1 + i % 9, "quantity": 1}, headers=headers)
+                client.get("/api/cart", headers=headers)
+            results["cart add+list/%s" % level] = round((time.perf_counter() - started) / requests * 1000, 3)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000, help="итераций микробенчмарка")
+    parser.add_argument("--requests", type=int, default=200, help="пар запросов корзины для сквозного замера")
+    args = parser.parse_args()
+
+    # Вывод app.* - в файл, чтобы не мешать отчету
+    app_log.shutdown()
+    with open(os.path.join(TMP_DIR, "app.log"), "w", encoding="utf-8") as stream:
+        app_log.configure(stream)
+        report = {
+            "logging_us_per_cart_request": micro(args.iterations),
+            "end_to_end_ms_per_request_pair": end_to_end(args.requests),
+        }
+        app_log.shutdown()
+    report["dropped_records"] = app_log.DroppingQueueHandler.dropped
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
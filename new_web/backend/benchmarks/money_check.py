@@ -0,0 +1,150 @@
+# backend/benchmarks/money_check.py
+"""
+Проверка свойств денежной арифметики (app/money.py) на случайных данных:
+
+1. sum_kopecks(строки) == точная сумма Decimal цена * количество, для
+   заказов от 1 до --max-lines строк; для сравнения считается, как часто
+   прежнее накопление во float давало не ту сумму (123.45000000000002);
+2. Money: число -> Decimal -> JSON -> число возвращает ту же сумму;
+3. через API: total_amount каждого созданного заказа равен сумме его строк
+   (в ответе и в БД: SUM(price * quantity) по order_items в SQL),
+   итог корзины (/api/cart/summary) равен сумме ее позиций.
+
+Запуск из папки backend (по умолчанию временная SQLite-база):
+    python -m benchmarks.money_check
+    DB_MODE=async python -m benchmarks.money_check --cases 2000 --orders 50
+Код возврата 1 при первом же расхождении.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from decimal import Decimal
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "money.db"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import insert, select, func  # noqa: E402
+
+from app import models, auth, money  # noqa: E402
+from app.database import Base, engine, SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+
+EMAIL = "money@bench-shop.ru"
+
+
+def random_price(rng):
+    # Смесь "круглых" и копеечных цен, от 0.01 до 10^6 рублей
+    return Decimal(rng.choice([rng.randint(1, 100), rng.randint(1, 10 ** 8)])).scaleb(-2)
+
+
+def fail(message, **details):
+    print("FAIL: %s %s" % (message, json.dumps(details, ensure_ascii=False, default=str)))
+    sys.exit(1)
+
+
+def check_sums(rng, cases, max_lines):
+    float_mismatches = 0
+    for _ in range(cases):
+        lines = [(random_price(rng), rng.randint(1, 100)) for _ in range(rng.randint(1, max_lines))]
+        exact = sum(price * quantity for price, quantity in lines)
+        total = money.from_kopecks(money.sum_kopecks(lines))
+        if total != exact:
+            fail("sum_kopecks != точной суммы", lines=lines[:5], total=total, exact=exact)
+        float_total = 0.0
+        for price, quantity in lines:
+            float_total += float(price) * quantity
+        if float_total != float(exact):
+            float_mismatches += 1
+    return float_mismatches
+
+
+def check_serialization(rng, cases):
+    adapter = TypeAdapter(money.Money)
+    for _ in range(cases):
+        price = random_price(rng)
+        parsed = adapter.validate_python(float(price))
+        back = adapter.validate_json(adapter.dump_json(parsed))
+        if parsed != price or back != price:
+            fail("Money не сохраняет сумму", price=price, parsed=parsed, back=back)
+
+
+def check_api(rng, orders, max_lines):
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    n_products = 2000
+    with engine.begin() as conn:
+        conn.execute(insert(models.Product), [
+            {"id": i, "name": "Товар %d" % i, "price": random_price(rng), "category": "sofa", "in_stock": True}
+            for i in range(1, n_products + 1)
+        ])
+    with SessionLocal() as db:
+        db.add(models.User(email=EMAIL, hashed_password="x", full_name="Money"))
+        db.commit()
+
+    headers = {"Authorization": "Bearer " + auth.create_access_token({"sub": EMAIL})}
+    with TestClient(app) as client:
+        for _ in range(orders):
+            product_ids = rng.sample(range(1, n_products + 1), rng.randint(1, min(max_lines, n_products)))
+            body = {"items": [{"product_id": pid, "quantity": rng.randint(1, 20)} for pid in product_ids]}
+            response = client.post("/api/orders/", json=body, headers=headers)
+            if response.status_code != 200:
+                fail("заказ не создан", status=response.status_code, body=response.text[:300])
+            order = json.loads(response.text, parse_float=Decimal)
+            line_sum = sum(Decimal(item["price"]) * item["quantity"] for item in order["items"])
+            if Decimal(order["total_amount"]) != line_sum:
+                fail("total_amount заказа != сумме строк", order_id=order["id"], total=order["total_amount"], lines=line_sum)
+
+        cart = [{"op": "set", "product_id": pid, "quantity": rng.randint(1, 20)} for pid in rng.sample(range(1, n_products + 1), 50)]
+        client.post("/api/cart/batch", json={"operations": cart}, headers=headers)
+        items = json.loads(client.get("/api/cart", headers=headers).text, parse_float=Decimal)
+        summary = json.loads(client.get("/api/cart/summary", headers=headers).text, parse_float=Decimal)
+        expected = sum(Decimal(item["product"]["price"]) * item["quantity"] for item in items)
+        if Decimal(summary["total"]) != expected:
+            fail("итог корзины != сумме позиций", summary=summary["total"], expected=expected)
+
+    # То же в SQL: целочисленная сумма строк против сохраненного total_amount
+    line_sums = (
+        select(models.OrderItem.order_id, func.sum(models.OrderItem.price * models.OrderItem.quantity).label("lines"))
+        .group_by(models.OrderItem.order_id)
+        .subquery()
+    )
+    with SessionLocal() as db:
+        mismatched = db.execute(
+            select(models.Order.id)
+            .join(line_sums, line_sums.c.order_id == models.Order.id)
+            .where(models.Order.total_amount != line_sums.c.lines)
+        ).scalars().all()
+        count = db.scalar(select(func.count()).select_from(models.Order))
+    if mismatched:
+        fail("в БД total_amount != SUM(price * quantity)", orders=mismatched[:10])
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=int, default=1000, help="случайных наборов строк")
+    parser.add_argument("--orders", type=int, default=30, help="заказов через API")
+    parser.add_argument("--max-lines", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=22)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    float_mismatches = check_sums(rng, args.cases, args.max_lines)
+    check_serialization(rng, args.cases)
+    orders = check_api(rng, args.orders, args.max_lines)
+    print(json.dumps({
+        "sum_cases": args.cases,
+        "float_sum_inexact": float_mismatches,
+        "orders_checked": orders,
+    }, ensure_ascii=False))
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
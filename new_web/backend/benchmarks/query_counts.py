@@ -0,0 +1,77 @@
+# backend/benchmarks/query_counts.py
+"""
+Проверка на N+1: число SQL-запросов на список корзины и заказов не должно
+зависеть от числа позиций.
+
+Запуск из папки backend (по умолчанию временная SQLite-база):
+    python -m benchmarks.query_counts
+    DB_MODE=async python -m benchmarks.query_counts
+Код возврата 1, если количество запросов растет вместе с числом позиций.
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "queries.db"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import models, auth  # noqa: E402
+from app.database import Base, engine, SessionLocal, count_queries  # noqa: E402
+from app.main import app  # noqa: E402
+
+SIZES = (1, 10, 50)
+
+
+def seed_user(db, email, n_items):
+    user = models.User(email=email, hashed_password="x", full_name="Bench")
+    db.add(user)
+    db.flush()
+    products = [
+        models.Product(name=f"Товар {email} {i}", price=100.0 + i, category="sofa")
+        for i in range(n_items)
+    ]
+    db.add_all(products)
+    db.flush()
+    for p in products:
+        db.add(models.CartItem(user_id=user.id, product_id=p.id, quantity=1))
+    for _ in range(3):
+        db.add(models.Order(
+            user_id=user.id,
+            total_amount=sum(p.price for p in products),
+            items=[models.OrderItem(product_id=p.id, quantity=1, price=p.price) for p in products],
+        ))
+    db.commit()
+    return auth.create_access_token({"sub": email})
+
+
+def main():
+    Base.metadata.create_all(engine)
+    client = TestClient(app)
+    db = SessionLocal()
+    tokens = {n: seed_user(db, f"bench{n}@example.com", n) for n in SIZES}
+    db.close()
+
+    results = {}
+    for path in ("/api/cart", "/api/orders/"):
+        counts = []
+        for n in SIZES:
+            headers = {"Authorization": f"Bearer {tokens[n]}"}
+            client.get(path, headers=headers)  # прогрев
+            with count_queries() as queries:
+                resp = client.get(path, headers=headers)
+            assert resp.status_code == 200, resp.text
+            counts.append(queries["count"])
+        results[path] = counts
+        print("%-14s items %s -> queries %s" % (path, list(SIZES), counts))
+
+    if any(len(set(counts)) != 1 for counts in results.values()):
+        print("FAIL: число запросов зависит от числа позиций (N+1)")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
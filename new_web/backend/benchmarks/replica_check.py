@@ -0,0 +1,135 @@
+# backend/benchmarks/replica_check.py
+"""
+Проверка маршрутизации чтений на реплики на двух локальных SQLite-базах.
+
+"Реплика" - отдельный файл, который нарочно не догоняет primary: товары
+в нем с другими названиями, новых отзывов и заказов нет. По ответам видно,
+откуда пришло чтение. Третий URL реплики указывает в несуществующий
+каталог и проверяет исключение упавшей реплики.
+
+Проверяется:
+1. анонимные GET каталога, отзывов и потоковая выгрузка идут на реплику;
+2. недоступная реплика исключается (DB_REPLICA_RETRY), запросы не падают;
+3. после записи клиент DB_STICKY_SECONDS читает с primary и видит свою
+   запись - и по cookie, и по токену без cookie, мимо кэша каталога;
+   другие клиенты в это время читают с реплики (кроме кэша, который
+   прилипший клиент заполнил свежими данными);
+4. по истечении окна клиент снова читает с реплики, и история заказов
+   (вместе с аутентификацией) не берет соединение у primary.
+
+Запуск из папки backend:
+    python -m benchmarks.replica_check
+    DB_MODE=async python -m benchmarks.replica_check
+Код возврата 1 при первом несоответствии.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+TMP_DIR = tempfile.mkdtemp()
+STICKY_SECONDS = 2.0  # с запасом на bcrypt и запись заказа на медленной машине
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(TMP_DIR, "primary.db")
+os.environ["DATABASE_REPLICA_URLS"] = ",".join([
+    "sqlite:///" + os.path.join(TMP_DIR, "replica.db"),
+    "sqlite:///" + os.path.join(TMP_DIR, "missing", "replica.db"),  # каталога нет - подключение падает
+])
+os.environ["DB_STICKY_SECONDS"] = str(STICKY_SECONDS)
+os.environ["ANALYTICS_REFRESH_INTERVAL"] = "0"
+os.environ["RATING_RECONCILE_INTERVAL"] = "0"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app import models  # noqa: E402
+from app import database  # noqa: E402
+from app.database import Base, engine, replicas  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+def fail(message, **details):
+    print("FAIL: %s %s" % (message, json.dumps(details, ensure_ascii=False, default=str)))
+    sys.exit(1)
+
+
+def check(condition, message, **details):
+    if not condition:
+        fail(message, **details)
+
+
+def prepare():
+    replica_engine = replicas.engines[0]
+    for bind, label in ((engine, "primary"), (replica_engine, "replica")):
+        Base.metadata.create_all(bind)
+        with bind.begin() as conn:
+            conn.execute(insert(models.Product), [
+                {"id": i, "name": "%s %d" % (label, i), "price": 1000, "category": "sofa", "in_stock": True}
+                for i in range(1, 11)
+            ])
+
+
+def source(product):
+    return product["name"].split()[0]
+
+
+def main():
+    prepare()
+    with TestClient(app) as anonymous, TestClient(app) as writer, TestClient(app) as other:
+        # 1-2. Анонимные чтения - с реплики; упавшая реплика исключается
+        for _ in range(4):
+            served = {source(p) for p in anonymous.get("/api/products?cursor=&limit=10").json()["items"]}
+            check(served == {"replica"}, "каталог читается не с реплики", served=served)
+            anonymous.get("/api/reviews?limit=5").raise_for_status()
+        stream = [json.loads(line) for line in anonymous.get("/api/products?stream=ndjson").text.splitlines()]
+        check({source(p) for p in stream} == {"replica"}, "поток читается не с реплики")
+        status = anonymous.get("/api/db/replicas").json()
+        down = status["replicas"][1]
+        check(status["failures"] >= 1 and down["down_for"] > 0 and down["reads"] == 0,
+              "недоступная реплика не исключена", status=status)
+
+        # 3. Запись -> чтения этого клиента с primary
+        token = writer.post("/api/register", json={
+            "email": "writer@bench-shop.ru", "password": "secret123", "full_name": "Writer"}).json()["access_token"]
+        headers = {"Authorization": "Bearer " + token}
+        other_token = other.post("/api/register", json={
+            "email": "other@bench-shop.ru", "password": "secret123", "full_name": "Other"}).json()["access_token"]
+        time.sleep(STICKY_SECONDS + 0.2)  # регистрация - тоже запись; ждем, пока окно other закроется
+
+        review = writer.post("/api/reviews", json={"rating": 5, "text": "Свой отзыв", "product_id": 1}, headers=headers)
+        check(review.status_code == 200, "отзыв не создан", body=review.text)
+        check("db_primary" in writer.cookies, "нет cookie db_primary после записи")
+        order = writer.post("/api/orders/", json={"items": [{"product_id": 2, "quantity": 1}]}, headers=headers)
+        check(order.status_code == 200, "заказ не создан", body=order.text)
+
+        texts = [r["text"] for r in writer.get("/api/reviews?limit=50").json()]
+        check("Свой отзыв" in texts, "автор не видит свой отзыв (cookie)", texts=texts)
+        check(source(writer.get("/api/products/1").json()) == "primary", "прилипший клиент получил кэш с реплики")
+        with TestClient(app) as no_cookies:
+            orders = no_cookies.get("/api/orders/", headers=headers).json()
+            check(len(orders) == 1, "автор не видит свой заказ (по токену)", orders=orders)
+        # Другим клиентам - реплика. Проверяем потоком: он идет мимо кэша, который
+        # прилипший клиент уже заполнил свежими данными с primary
+        other_headers = {"Authorization": "Bearer " + other_token}
+        streamed = other.get("/api/reviews?stream=ndjson", headers=other_headers).text
+        check("Свой отзыв" not in streamed, "чужой клиент читает с primary")
+        check("Свой отзыв" in writer.get("/api/reviews?stream=ndjson").text, "поток автора не с primary")
+
+        # 4. Окно закрылось - снова реплика
+        time.sleep(STICKY_SECONDS + 0.2)
+        primary_pool = database.async_pool_metrics if database.ASYNC_DB else database.pool_metrics
+        checkouts = primary_pool.checkouts
+        orders = writer.get("/api/orders/", headers=headers).json()
+        check(orders == [], "после окна чтения не вернулись на реплику", orders=orders)
+        check(primary_pool.checkouts == checkouts, "история заказов взяла соединение у primary",
+              checkouts=primary_pool.checkouts - checkouts)
+        status = writer.get("/api/db/replicas").json()
+
+    print(json.dumps(status, ensure_ascii=False))
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# backend/benchmarks/serialization.py
+"""
+Бенчмарк кодирования и размера ответа GET /api/products?limit=1000.
+
+1. Кодирование того же списка из 1000 товаров: json.dumps (JSONResponse),
+   orjson (ORJSONResponse) и pydantic_core.to_json (им заполняется кэш каталога).
+2. Запрос целиком через приложение: холодный (кэш каталога сброшен) и из кэша,
+   без сжатия, gzip и brotli - время и байты, ушедшие клиенту.
+
+Запуск из папки backend:
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --products 1000 --repeat 50
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "serialization.db"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from pydantic_core import to_json  # noqa: E402
+from sqlalchemy import insert, text  # noqa: E402
+
+from app import models, schemas, compression  # noqa: E402
+from app.database import Base, engine, SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.routers import products  # noqa: E402
+
+ENCODINGS = ["identity", "gzip"] + (["br"] if compression.brotli is not None else [])
+
+
+def seed(n):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM products"))
+        conn.execute(insert(models.Product), [
+            {
+                "id": i,
+                "name": f"Диван Aurora {i}",
+                "description": "Современный угловой диван с механизмом трансформации 'еврокнижка'. "
+                               "Каркас - массив березы, наполнитель - высокоэластичный ППУ.",
+                "price": 50000.0 + i,
+                "category": "sofa",
+                "image_url": f"/static/sofa{i % 10}.png",
+                "in_stock": i % 7 != 0,
+            }
+            for i in range(1, n + 1)
+        ])
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return result, samples
+
+
+def summary(samples):
+    samples = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    seed(args.products)
+    with SessionLocal() as db:
+        items = [schemas.ProductResponse.model_validate(p) for p in db.query(models.Product).limit(args.products)]
+    # Так ответ выглядит после response_model, до рендера в байты
+    content = jsonable_encoder(items)
+
+    report = {"products": args.products, "encode": {}, "http": {}}
+    encoders = {
+        "json.dumps": lambda: JSONResponse(content).body,
+        "orjson": lambda: ORJSONResponse(content).body,
+        "pydantic_core.to_json": lambda: to_json(items),
+    }
+    for name, fn in encoders.items():
+        body, samples = timed(fn, args.repeat)
+        report["encode"][name] = {**summary(samples), "bytes": len(body)}
+
+    url = f"/api/products?limit={args.products}"
+    with TestClient(app) as client:
+        for encoding in ENCODINGS:
+            headers = {"Accept-Encoding": encoding}
+
+            def cold():
+                products.catalog_cache.clear()
+                return client.get(url, headers=headers)
+
+            def warm():
+                return client.get(url, headers=headers)
+
+            for name, fn in (("cold", cold), ("cached", warm)):
+                response, samples = timed(fn, args.repeat)
+                assert response.status_code == 200 and len(response.json()) == args.products
+                report["http"][f"{encoding}/{name}"] = {
+                    **summary(samples),
+                    "bytes_sent": response.num_bytes_downloaded,
+                    "content_encoding": response.headers.get("content-encoding", "identity"),
+                }
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# backend/benchmarks/startup.py
+"""
+Старт и остановка production-сервера (python -m app.server, один воркер).
+
+1. Время старта: от запуска процесса до первого ответа /healthz, фазы из
+   /readyz (boot, import, routers, pools, requests) и время первого и
+   второго запроса к каждому роутеру - с прогревом (SERVER_WARMUP=true)
+   и без него (роутеры грузятся при первом запросе).
+2. Drain: SIGTERM во время медленно читаемой потоковой выгрузки каталога.
+   Ожидается: /readyz сразу 503, выгрузка дочитывается целиком, после
+   SHUTDOWN_DRAIN_DELAY новые соединения не принимаются, код выхода 0.
+
+Запуск из папки backend (по умолчанию временная SQLite-база, Linux):
+    python -m benchmarks.startup
+    DB_MODE=async python -m benchmarks.startup --repeat 5
+Код возврата 1, если проверка drain не прошла.
+"""
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "startup.db"))
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import models  # noqa: E402
+from app.database import Base, engine  # noqa: E402
+
+# По одному пути на роутер; 401/405 без токена тоже годятся - роутер уже загружен
+FIRST_REQUESTS = {
+    "products": "/api/products",
+    "reviews": "/api/reviews",
+    "orders": "/api/orders/",
+    "cart": "/api/cart",
+    "auth": "/api/auth/me",
+    "users": "/api/login",
+    "analytics": "/api/analytics/status",
+}
+
+
+def fail(message, **details):
+    print("FAIL: %s %s" % (message, json.dumps(details, ensure_ascii=False, default=str)))
+    sys.exit(1)
+
+
+def prepare(n):
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Product), [
+            {"id": i, "name": "Товар %d" % i, "description": "Описание товара %d" % i, "price": 1000 + i,
+             "category": "sofa", "in_stock": True}
+            for i in range(1, n + 1)
+        ])
+
+
+def start(port, **env):
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.server"], cwd=BACKEND_DIR,
+        env=dict(os.environ, WEB_CONCURRENCY="1", PORT=str(port), HOST="127.0.0.1", LOG_LEVEL="WARNING",
+                 RATING_RECONCILE_INTERVAL="0", ANALYTICS_REFRESH_INTERVAL="0", **env),
+    )
+    deadline = started + 60
+    # Один клиент на все попытки: новый httpx.Client на каждую - заметная нагрузка на CPU рядом со стартующим сервером
+    with httpx.Client() as client:
+        while time.perf_counter() < deadline:
+            try:
+                if client.get("http://127.0.0.1:%d/healthz" % port).status_code == 200:
+                    return server, (time.perf_counter() - started) * 1000
+            except httpx.TransportError:
+                time.sleep(0.02)
+    server.kill()
+    fail("сервер не запустился за 60 с")
+
+
+def stop(server):
+    started = time.perf_counter()
+    server.send_signal(signal.SIGTERM)
+    server.wait()
+    return (time.perf_counter() - started) * 1000
+
+
+def measure_startup(port, warmup):
+    server, accept_ms = start(port, SERVER_WARMUP=warmup, SHUTDOWN_DRAIN_DELAY="0")
+    try:
+        with httpx.Client(base_url="http://127.0.0.1:%d" % port) as client:
+            run = {"accept_ms": accept_ms, **client.get("/readyz").json()["startup"]}
+            for name, path in FIRST_REQUESTS.items():
+                for attempt in ("first", "second"):
+                    started = time.perf_counter()
+                    client.get(path)
+                    run["%s.%s_ms" % (name, attempt)] = (time.perf_counter() - started) * 1000
+    finally:
+        run["stop_ms"] = stop(server)
+    return run
+
+
+def check_drain(port, products, drain_delay):
+    server, _ = start(port, SHUTDOWN_DRAIN_DELAY=str(drain_delay))
+    base_url = "http://127.0.0.1:%d" % port
+    lines = 0
+    try:
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            with client.stream("GET", "/api/products?stream=ndjson") as response:
+                chunks = response.iter_bytes()
+                tail = next(chunks)
+                signaled = time.perf_counter()
+                server.send_signal(signal.SIGTERM)
+                time.sleep(0.3)
+                ready = httpx.get(base_url + "/readyz")
+                if ready.status_code != 503 or ready.json()["status"] != "draining":
+                    fail("/readyz не ушел в draining", status=ready.status_code, body=ready.text)
+                # Клиент "медленный": пока он не читает, запрос остается в обработке
+                time.sleep(max(0.0, drain_delay + 0.5 - (time.perf_counter() - signaled)))
+                try:
+                    httpx.get(base_url + "/healthz", timeout=1)
+                    fail("после drain сервер все еще принимает соединения")
+                except httpx.TransportError:
+                    pass
+                for chunk in chunks:
+                    tail += chunk
+                    lines += tail.count(b"\n")
+                    tail = tail[tail.rfind(b"\n") + 1:]
+        exit_code = server.wait(timeout=30)
+    finally:
+        if server.poll() is None:
+            server.kill()
+    if lines != products:
+        fail("выгрузка оборвана при остановке", lines=lines, expected=products)
+    if exit_code != 0:
+        fail("код выхода сервера", exit_code=exit_code)
+    return {"streamed_lines": lines, "drain_delay_s": drain_delay, "exit_code": exit_code}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=200_000, help="товаров для потоковой выгрузки при drain")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--drain-delay", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=8769)
+    args = parser.parse_args()
+
+    prepare(args.products)
+    report = {"db_mode": os.getenv("DB_MODE", "sync")}
+    for name, warmup in (("lazy", "false"), ("warmup", "true")):
+        runs = [measure_startup(args.port, warmup) for _ in range(args.repeat)]
+        report[name] = {key: round(statistics.median(run[key] for run in runs), 1)
+                        for key in runs[0] if isinstance(runs[0][key], (int, float))}
+        print(name, report[name], file=sys.stderr)
+    report["drain"] = check_drain(args.port, args.products, args.drain_delay)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# backend/benchmarks/streaming.py
+"""
+Обычный список против потокового (?stream=ndjson / ?stream=json) на большой
+выборке: время до первого байта, полное время и пиковая память сервера
+(VmHWM процесса uvicorn; на каждый вариант - свежий процесс).
+
+Запуск из папки backend (по умолчанию временная SQLite-база, Linux):
+    python -m benchmarks.streaming
+    DB_MODE=async python -m benchmarks.streaming --products 500000
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "streaming.db"))
+
+from benchmarks.loadtest import wait_ready  # noqa: E402
+from app import catalog_io  # noqa: E402
+from app.database import Base, engine  # noqa: E402
+
+VARIANTS = {
+    "list": "/api/products?limit={n}",
+    "stream=ndjson": "/api/products?stream=ndjson",
+    "stream=json": "/api/products?stream=json",
+}
+
+
+def prepare(n):
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    rows = ({"id": i, "name": "Товар %d" % i, "description": "Описание товара %d" % i, "price": 1000 + i,
+             "category": "sofa", "image_url": None, "in_stock": True} for i in range(1, n + 1))
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == 10000:
+            with engine.begin() as conn:
+                catalog_io.write_chunk(conn, chunk)
+            chunk = []
+    if chunk:
+        with engine.begin() as conn:
+            catalog_io.write_chunk(conn, chunk)
+    engine.dispose()
+
+
+def peak_rss_mb(pid):
+    with open("/proc/%d/status" % pid) as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    return None
+
+
+async def fetch(url):
+    # timeout=None: обычный список на большой выборке собирается долго
+    async with httpx.AsyncClient(timeout=None) as client:
+        started = time.perf_counter()
+        async with client.stream("GET", url, headers={"Accept-Encoding": "identity"}) as response:
+            first = None
+            size = 0
+            async for chunk in response.aiter_raw():
+                if first is None:
+                    first = time.perf_counter() - started
+                size += len(chunk)
+        return {
+            "status": response.status_code,
+            "ttfb_ms": round(first * 1000, 1),
+            "total_ms": round((time.perf_counter() - started) * 1000, 1),
+            "mb": round(size / 2 ** 20, 1),
+        }
+
+
+def run_variant(path, port):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=dict(os.environ, RATING_RECONCILE_INTERVAL="0"),
+    )
+    base_url = "http://127.0.0.1:%d" % port
+    try:
+        asyncio.run(wait_ready(base_url))
+        idle = peak_rss_mb(server.pid)
+        result = asyncio.run(fetch(base_url + path))
+        result["server_peak_rss_mb"] = peak_rss_mb(server.pid)
+        result["server_idle_rss_mb"] = idle
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=200000)
+    parser.add_argument("--port", type=int, default=8768)
+    args = parser.parse_args()
+
+    prepare(args.products)
+    report = {"products": args.products, "db_mode": os.getenv("DB_MODE", "sync")}
+    for name, path in VARIANTS.items():
+        report[name] = run_variant(path.format(n=args.products), args.port)
+        print(name, report[name], file=sys.stderr)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Изменения схемы до появления миграций: keyset-индексы, полнотекстовый поиск,
+сводка рейтинга и связь отзывов с товарами, уникальная строка корзины
+
+Revision ID: 0002_search_ratings_cart
+Revises: 0001_baseline
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_search_ratings_cart"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+RATING_COLUMNS = ["rating_count", "rating_sum", "stars_1", "stars_2", "stars_3", "stars_4", "stars_5"]
+# То же выражение, что models.search_document: иначе планировщик не возьмет индекс
+SEARCH_DOCUMENT = "to_tsvector('russian', coalesce(name, '') || ' ' || coalesce(description, ''))"
+
+
+def upgrade():
+    # Keyset-пагинация отзывов и истории заказов (created_at DESC, id DESC)
+    op.create_index("ix_reviews_approved_created_id", "reviews", ["is_approved", "created_at", "id"])
+    op.create_index("ix_orders_user_created_id", "orders", ["user_id", "created_at", "id"])
+
+    if op.get_bind().dialect.name == "postgresql":
+        op.create_index("ix_products_search", "products", [sa.text(SEARCH_DOCUMENT)], postgresql_using="gin")
+
+    # Сводка рейтинга: у существующих отзывов еще нет product_id, так что нули верны
+    with op.batch_alter_table("products") as batch:
+        for name in RATING_COLUMNS:
+            batch.add_column(sa.Column(name, sa.Integer(), nullable=False, server_default="0"))
+
+    with op.batch_alter_table("reviews") as batch:
+        batch.add_column(sa.Column("product_id", sa.Integer(), nullable=True))
+        batch.create_foreign_key("fk_reviews_product_id", "products", ["product_id"], ["id"])
+        batch.create_index("ix_reviews_product_id", ["product_id"])
+
+    # Повторы товара в корзине (их создавал старый add_to_cart при гонках)
+    # сливаем в строку с меньшим id, иначе уникальное ограничение не создать
+    op.execute(
+        "UPDATE cart_items SET quantity = ("
+        " SELECT SUM(other.quantity) FROM cart_items other"
+        " WHERE other.user_id = cart_items.user_id AND other.product_id = cart_items.product_id)"
+        " WHERE id IN (SELECT MIN(id) FROM cart_items GROUP BY user_id, product_id HAVING COUNT(*) > 1)"
+    )
+    op.execute(
+        "DELETE FROM cart_items WHERE id NOT IN (SELECT MIN(id) FROM cart_items GROUP BY user_id, product_id)"
+    )
+    with op.batch_alter_table("cart_items") as batch:
+        batch.create_unique_constraint("uq_cart_items_user_product", ["user_id", "product_id"])
+
+
+def downgrade():
+    with op.batch_alter_table("cart_items") as batch:
+        batch.drop_constraint("uq_cart_items_user_product", type_="unique")
+    with op.batch_alter_table("reviews") as batch:
+        batch.drop_index("ix_reviews_product_id")
+        batch.drop_constraint("fk_reviews_product_id", type_="foreignkey")
+        batch.drop_column("product_id")
+    with op.batch_alter_table("products") as batch:
+        for name in RATING_COLUMNS:
+            batch.drop_column(name)
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_products_search", table_name="products")
+    op.drop_index("ix_orders_user_created_id", table_name="orders")
+    op.drop_index("ix_reviews_approved_created_id", table_name="reviews")
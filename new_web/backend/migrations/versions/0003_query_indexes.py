@@ -0,0 +1,37 @@
+"""Индексы под фильтры горячих запросов: товары по категории, позиции заказа
+по заказу (selectinload), строки корзины и заказов по товару (FK)
+
+Revision ID: 0003_query_indexes
+Revises: 0002_search_ratings_cart
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0003_query_indexes"
+down_revision = "0002_search_ratings_cart"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_products_category", "products", ["category"]),
+    ("ix_cart_items_product_id", "cart_items", ["product_id"]),
+    ("ix_order_items_order_id", "order_items", ["order_id"]),
+    ("ix_order_items_product_id", "order_items", ["product_id"]),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        # CONCURRENTLY не блокирует запись в таблицы на время построения,
+        # но не работает внутри транзакции
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
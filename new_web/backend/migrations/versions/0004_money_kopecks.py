@@ -0,0 +1,39 @@
+"""Денежные колонки: float (рубли) -> BIGINT (копейки)
+
+Revision ID: 0004_money_kopecks
+Revises: 0003_query_indexes
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_money_kopecks"
+down_revision = "0003_query_indexes"
+branch_labels = None
+depends_on = None
+
+MONEY_COLUMNS = [("products", "price"), ("orders", "total_amount"), ("order_items", "price")]
+
+
+def upgrade():
+    postgresql = op.get_bind().dialect.name == "postgresql"
+    for table, column in MONEY_COLUMNS:
+        if postgresql:
+            op.alter_column(table, column, type_=sa.BigInteger(), existing_nullable=False,
+                            postgresql_using="round(%s * 100)::bigint" % column)
+        else:
+            op.execute("UPDATE %s SET %s = ROUND(%s * 100)" % (table, column, column))
+            with op.batch_alter_table(table) as batch:
+                batch.alter_column(column, type_=sa.BigInteger(), existing_type=sa.Float(), existing_nullable=False)
+
+
+def downgrade():
+    postgresql = op.get_bind().dialect.name == "postgresql"
+    for table, column in MONEY_COLUMNS:
+        if postgresql:
+            op.alter_column(table, column, type_=sa.Float(), existing_nullable=False,
+                            postgresql_using="%s / 100.0" % column)
+        else:
+            with op.batch_alter_table(table) as batch:
+                batch.alter_column(column, type_=sa.Float(), existing_type=sa.BigInteger(), existing_nullable=False)
+            op.execute("UPDATE %s SET %s = %s / 100.0" % (table, column, column))
@@ -0,0 +1,50 @@
+"""Сводные таблицы аналитики продаж (app/analytics.py)
+
+Таблицы создаются пустыми: первый refresh() заполнит их с нулевого водяного знака.
+
+Revision ID: 0005_analytics_summaries
+Revises: 0004_money_kopecks
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_analytics_summaries"
+down_revision = "0004_money_kopecks"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "analytics_sales_daily",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("product_id", sa.Integer(), primary_key=True),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("quantity", sa.BigInteger(), nullable=False),
+        sa.Column("revenue", sa.BigInteger(), nullable=False),
+        sa.Column("lines", sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        "analytics_orders_daily",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("orders", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.BigInteger(), nullable=False),
+    )
+    op.create_table(
+        "analytics_user_activity",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), primary_key=True),
+        sa.Column("carted", sa.Boolean(), nullable=False),
+        sa.Column("ordered", sa.Boolean(), nullable=False),
+    )
+    op.create_table(
+        "analytics_state",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("value", sa.BigInteger(), nullable=False),
+    )
+
+
+def downgrade():
+    for table in ("analytics_state", "analytics_user_activity", "analytics_orders_daily", "analytics_sales_daily"):
+        op.drop_table(table)
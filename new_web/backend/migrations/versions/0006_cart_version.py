@@ -0,0 +1,23 @@
+"""Версия корзины пользователя: сверка кэша итогов корзины между воркерами
+
+Revision ID: 0006_cart_version
+Revises: 0005_analytics_summaries
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_cart_version"
+down_revision = "0005_analytics_summaries"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("users") as batch:
+        batch.add_column(sa.Column("cart_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("cart_version")